@@ -21,24 +21,26 @@
 # appropriately sorted, in that a diff only occurs when the shared libraries
 # in the package themselves actually change too.
 
+import functools
+import hashlib
+import json
 import os
-import re
-import shutil
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
+import rpmpayload
 import util
+from elf import ELFMAG, ElfError, ElfFile, open_elf
 
 valid_dirs = ["/usr/lib", "/usr/lib64"]
 
-# For determining .so's
-reg = re.compile(r".* ELF (64|32)\-bit LSB shared object,")
+# files are scanned by a process pool from this many on
+PARALLEL_SCAN_MIN = 16
 
-# All dynamic binaries
-valid_dyn = re.compile(r".* ELF (64|32)\-bit LSB (shared object|executable),")
-
-# shared-lib matcher
-shared_lib = re.compile(r".*Shared library: \[(.*)\].*")
+# symbols of the libraries of the previous report, by size and sha256sum
+ABI_CACHE = "symbols.cache"
+ABI_CACHE_VERSION = 1
 
 wanted_symbol_types = ["A", "T"]
 
@@ -51,146 +53,255 @@ ignored_symbols = [
 ]
 
 
-def get_output(cmd):
-    """Return output from subprocess.getoutput."""
-    try:
-        o = subprocess.getoutput(cmd)
-        return o
-    except Exception as e:
-        print("Error: %s" % e)
-
-
 def get_soname(path):
-    """Use objdump to find the SONAME of a file."""
-    cmd = "objdump -p \"{}\"|grep SONAME".format(path)
-    try:
-        line = get_output(cmd)
-        if "SONAME" not in line:
-            return None
-        line = line.strip()
-        spl = line.split()[1]
-        return spl
-    except Exception:
+    """Return the SONAME of a file."""
+    elf_file = open_elf(path)
+    if not elf_file:
         return None
+    with elf_file:
+        return elf_file.soname
 
 
 def get_shared_dependencies(path):
     """Return the shared dependencies for a given path."""
-    ret = set()
-    cmd = "readelf -d {}".format(path)
+    elf_file = open_elf(path)
+    if not elf_file:
+        return set()
+    with elf_file:
+        return set(elf_file.needed)
+
+
+def scan_map(fn, paths):
+    """Return [fn(path) for path in paths], spreading the calls over a process pool for many paths."""
+    cpus = os.cpu_count() or 1
+    if len(paths) < PARALLEL_SCAN_MIN or cpus < 2:
+        return [fn(path) for path in paths]
+    chunksize = max(1, len(paths) // (4 * cpus))
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(fn, paths, chunksize=chunksize))
+
+
+def get_dependency_info(path):
+    """Return the SONAME and NEEDED entries of a dynamic binary, or None for other files.
+
+    The SONAME is only returned for shared libraries.
+    """
+    elf_file = open_elf(path)
+    if not elf_file:
+        return None
+    with elf_file:
+        return elf_dependency_info(elf_file)
 
-    for line in get_output(cmd).split("\n"):
-        line = line.strip()
-        shared = shared_lib.match(line)
-        if shared is None:
-            continue
-        ret.add(shared.group(1))
 
-    return ret
+def elf_dependency_info(elf_file):
+    """Return the get_dependency_info result of an ElfFile."""
+    if not elf_file.is_dynamic_binary:
+        return None
+    soname = elf_file.soname if elf_file.is_shared_object else None
+    return soname, elf_file.needed
 
 
 def get_all_dependencies(path):
     """Determine all dependencies in the given path."""
-    deps = set()
-
-    sonames = set()
-    examine = set()
-
+    paths = []
     for root, dirs, files in os.walk(path):
         for file in files:
             fpath = os.path.join(root, file)
-            if not is_dynamic_binary(fpath):
+            if os.path.islink(fpath) or not os.path.isfile(fpath):
                 continue
-            # Encountered a valid dynamic linked object
-            if is_file_valid(fpath):
-                # We must account for *all* internal symbols due to rpaths and
-                # overriding of LD_LIBRARY_PATH
-                soname = get_soname(fpath)
-                if soname is not None:
-                    sonames.add(soname)
-            if is_dynamic_binary(fpath):
-                examine.add(fpath)
-
-    for path in examine:
-        current_deps = get_shared_dependencies(path)
-        # Ensure we don't add a dependency on an internally provided symbol
-        deps.update(set(filter(lambda s: s not in sonames, current_deps)))
+            paths.append(fpath)
 
-    return deps
+    return merge_dependencies(scan_map(get_dependency_info, sorted(paths)))
 
 
-def get_file_magic(path):
-    """Return the 'magic' for a given path."""
-    cmd = "file \"{}\"".format(path)
-    try:
-        line = get_output(cmd).split("\n")[0]
-        return line.strip()
-    except Exception:
-        return None
+def merge_dependencies(infos):
+    """Return the libraries needed by the get_dependency_info results infos and not provided by them."""
+    deps = set()
+
+    sonames = set()
+    examine = set()
+
+    for info in infos:
+        if info is None:
+            continue
+        # Encountered a valid dynamic linked object
+        soname, needed = info
+        # We must account for *all* internal symbols due to rpaths and
+        # overriding of LD_LIBRARY_PATH
+        if soname is not None:
+            sonames.add(soname)
+        examine.update(needed)
+
+    # Ensure we don't add a dependency on an internally provided symbol
+    deps.update(set(filter(lambda s: s not in sonames, examine)))
+
+    return deps
 
 
 def is_dynamic_binary(path):
     """Determine if a given path is a dynamic binary."""
-    if not os.path.exists(path) or not os.path.isfile(path):
+    if os.path.islink(path) or not os.path.isfile(path):
         return False
-    mg = get_file_magic(path)
-    if not mg:
+    elf_file = open_elf(path)
+    if not elf_file:
         return False
-    if valid_dyn.match(mg):
-        return True
-    return False
+    with elf_file:
+        return elf_file.is_dynamic_binary
 
 
 def is_file_valid(path):
     """Validate file is an SO."""
     if not os.path.exists(path) or os.path.islink(path):
         return False
-    mg = get_file_magic(path)
-    if not mg:
+    elf_file = open_elf(path)
+    if not elf_file:
         return False
-    if reg.match(mg):
-        return True
-    return False
-
+    with elf_file:
+        return elf_file.is_shared_object
 
-def dump_symbols(path):
-    """Get symbols from a file."""
-    cmd = "nm --defined-only -g --dynamic \"{}\" | c++filt".format(path)
-    lines = None
-
-    ret = set()
 
+def demangle(names):
+    """Demangle C++ symbol names with a single c++filt process, returning them in order."""
+    if not names:
+        return []
     try:
-        lines = get_output(cmd)
-    except Exception as e:
-        util.print_fatal("Fatal error inspecting {}: {}".format(path, e))
+        proc = subprocess.run(["c++filt"], input="\n".join(names) + "\n", capture_output=True,
+                              text=True, errors="surrogateescape", check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        util.print_fatal("Fatal error demangling symbols: {}".format(e))
+        sys.exit(1)
+    demangled = proc.stdout.split("\n")[:len(names)]
+    if len(demangled) != len(names):
+        util.print_fatal("Fatal error demangling symbols: c++filt output is truncated")
         sys.exit(1)
-    for line in lines.split("\n"):
-        line = line.strip()
+    return demangled
 
-        spl = line.split()
-        if len(spl) != 3:
-            continue
-        sym_type = spl[1]
-        sym_id = spl[2]
 
-        if sym_type not in wanted_symbol_types:
-            continue
-        if sym_id in ignored_symbols:
-            continue
-        ret.add(sym_id)
-    return ret
+def get_symbols(path):
+    """Get the wanted raw symbol names exported by a file."""
+    elf_file = open_elf(path)
+    if not elf_file:
+        return []
+    with elf_file:
+        return [name for name, sym_type in elf_file.dynamic_symbols() if sym_type in wanted_symbol_types]
 
 
-def purge_tree(tree):
-    """Run rm -fr."""
-    if not os.path.exists(tree):
-        return
+def scan_library(path):
+    """Return the SONAME and wanted raw symbol names of a shared library, or None for other files."""
+    if not is_file_valid(path):
+        return None
+    elf_file = open_elf(path)
+    if not elf_file:
+        return None
+    with elf_file:
+        return elf_library_info(elf_file)
+
+
+def elf_library_info(elf_file):
+    """Return the scan_library result of an ElfFile."""
+    if not elf_file.is_shared_object:
+        return None
+    symbols = [name for name, sym_type in elf_file.dynamic_symbols() if sym_type in wanted_symbol_types]
+    return elf_file.soname, symbols
+
+
+def fingerprint(data):
+    """Return the fingerprint identifying the content data of a library in the ABI cache."""
+    return "{}-{}".format(len(data), hashlib.sha256(data).hexdigest())
+
+
+def scan_rpm(path, known=frozenset()):
+    """Scan the ELF files of the payload of the rpm at path, without extracting them.
+
+    Returns a list of (file path, dependency info, library info) for the
+    ELF files, as get_dependency_info and scan_library would for the
+    extracted file, with the library fingerprint added to library info.
+    Library info is only looked for in valid_dirs, and the symbols of
+    libraries whose fingerprint is in known are not read, leaving None.
+    """
+    results = []
+    # hard linked files only have their data in the last member of the set
+    hardlinks = {}
+    with rpmpayload.open_payload(path) as payload:
+        for entry in payload:
+            if not entry.isreg():
+                continue
+            names = [os.path.normpath(os.path.join("/", entry.name))]
+            if entry.nlink > 1:
+                if entry.size == 0:
+                    hardlinks.setdefault(entry.inode, []).extend(names)
+                    continue
+                names = hardlinks.pop(entry.inode, []) + names
+            if entry.read(4) != ELFMAG:
+                continue
+            data = ELFMAG + entry.read()
+            try:
+                with ElfFile(names[-1], data) as elf_file:
+                    dependency_info = elf_dependency_info(elf_file)
+                    library_info = None
+                    if any(os.path.dirname(name) in valid_dirs for name in names) and elf_file.is_shared_object:
+                        library_id = fingerprint(data)
+                        if library_id in known:
+                            library_info = (elf_file.soname, None, library_id)
+                        else:
+                            library_info = elf_library_info(elf_file) + (library_id,)
+            except ElfError:
+                continue
+            for name in names:
+                results.append((name, dependency_info, library_info if os.path.dirname(name) in valid_dirs else None))
+    return results
+
+
+def load_abi_cache(download_path):
+    """Return the symbols of the libraries scanned by the previous ABI report, by fingerprint."""
     try:
-        shutil.rmtree(tree)
-    except Exception as e:
-        util.print_fatal("Cannot remove tree: {}".format(e))
-        sys.exit(1)
+        with open(os.path.join(download_path, ABI_CACHE)) as cachef:
+            cache = json.load(cachef)
+        if cache.get("version") != ABI_CACHE_VERSION:
+            return {}
+        return {library_id: set(symbols) for library_id, symbols in cache["libraries"].items()}
+    except (OSError, ValueError, KeyError, AttributeError):
+        return {}
+
+
+def save_abi_cache(download_path, libraries):
+    """Save the dict of fingerprint to symbols of the libraries scanned by the ABI report."""
+    cache = {"version": ABI_CACHE_VERSION,
+             "libraries": {library_id: sorted(symbols) for library_id, symbols in libraries.items()}}
+    util.write_out(os.path.join(download_path, ABI_CACHE), json.dumps(cache, sort_keys=True))
+
+
+def filter_symbols(raw):
+    """Demangle and filter the raw symbol names of each path in the dict raw, returning a dict of sets.
+
+    Symbols whose demangled form holds spaces, like C++ functions with
+    parameters, are left out.
+    """
+    names = sorted(set(name for symbols in raw.values() for name in symbols))
+    demangled = dict(zip(names, demangle(names)))
+
+    ret = {}
+    for path, symbols in raw.items():
+        ret[path] = set()
+        for name in symbols:
+            sym_id = demangled[name]
+            if len(sym_id.split()) != 1:
+                continue
+            if sym_id in ignored_symbols:
+                continue
+            ret[path].add(sym_id)
+    return ret
+
+
+def dump_all_symbols(paths):
+    """Get the symbols of each of paths, as a dict of path to set of symbols."""
+    paths = sorted(paths)
+    return filter_symbols(dict(zip(paths, scan_map(get_symbols, paths))))
+
+
+def dump_symbols(path):
+    """Get symbols from a file."""
+    return dump_all_symbols([path])[path]
 
 
 def truncate_file(path):
@@ -241,8 +352,6 @@ def examine_abi_host(download_path, results_dir, name):
 
 def examine_abi_fallback(download_path, results_dir, name):
     """Missing abireport so fallback to internal scanning."""
-    old_dir = os.getcwd()
-
     rpms = set()
     for item in os.listdir(results_dir):
         namelen = len(name)
@@ -255,56 +364,46 @@ def examine_abi_fallback(download_path, results_dir, name):
         util.print_fatal("No usable rpms found, aborting")
         sys.exit(1)
 
-    extract_dir = os.path.abspath(os.path.join(download_path, "__extraction"))
-    purge_tree(extract_dir)
-
-    try:
-        os.makedirs(extract_dir)
-    except Exception as e:
-        util.print_fatal("Cannot create extraction tree: {}".format(e))
-        sys.exit(1)
-
-    os.chdir(extract_dir)
-
-    # Extract all those rpms to our current directory
+    # Read the ELF files straight from the rpm payloads, the first rpm
+    # providing a path wins. The symbols of the libraries unchanged since
+    # the previous report are reused from the ABI cache.
+    abi_cache = load_abi_cache(download_path)
     try:
-        for rpm in rpms:
-            cmd = "rpm2cpio \"{}\" | cpio -imd 2>/dev/null".format(os.path.join(results_dir, rpm))
-            subprocess.check_call(cmd, shell=True)
-    except Exception as e:
+        scans = scan_map(functools.partial(scan_rpm, known=frozenset(abi_cache)),
+                         [os.path.join(results_dir, rpm) for rpm in sorted(rpms)])
+    except (OSError, rpmpayload.RpmError) as e:
         util.print_fatal("Error extracting RPMS: {}".format(e))
         sys.exit(1)
 
-    os.chdir(download_path)
-    collected_files = set()
-
-    # Places we expect to find shared libraries
-    for check_path in valid_dirs:
-        if check_path[0] == '/':
-            check_path = check_path[1:]
-
-        dirn = os.path.join(extract_dir, check_path)
-        if not os.path.isdir(dirn):
-            continue
-
-        for file in os.listdir(dirn):
-            f = os.path.basename(file)
-
-            clean_path = os.path.abspath(os.path.join(dirn, f))
-            if not is_file_valid(clean_path):
+    seen = set()
+    libraries = {}
+    dependencies = []
+    for scan in scans:
+        for name, dependency_info, library_info in sorted(scan, key=lambda result: result[0]):
+            if name in seen:
                 continue
-            collected_files.add(clean_path)
+            seen.add(name)
+            dependencies.append(dependency_info)
+            if library_info is not None:
+                libraries[name] = library_info
+    library_symbols = filter_symbols({library: scan[1] for library, scan in libraries.items()
+                                      if scan[1] is not None})
+    new_cache = {}
+    for library, (_, _, library_id) in libraries.items():
+        if library not in library_symbols:
+            library_symbols[library] = abi_cache[library_id]
+        new_cache[library_id] = library_symbols[library]
+    save_abi_cache(download_path, new_cache)
 
     abi_report = dict()
 
-    # Now examine these libraries
-    for library in sorted(collected_files):
-        soname = get_soname(library)
+    for library in sorted(libraries):
+        soname = libraries[library][0]
         if not soname:
             warn = "Failed to determine soname of: {}".format(library)
             util.print_warning(warn)
             soname = os.path.basename(library)
-        symbols = dump_symbols(library)
+        symbols = library_symbols[library]
         if symbols and len(symbols) > 0:
             if soname not in abi_report:
                 abi_report[soname] = set()
@@ -324,7 +423,7 @@ def examine_abi_fallback(download_path, results_dir, name):
         truncate_file(report_file)
 
     # Write the library report
-    lib_deps = get_all_dependencies(extract_dir)
+    lib_deps = merge_dependencies(dependencies)
     report_file = os.path.join(download_path, "used_libs")
     if len(lib_deps) > 0:
         report = util.open_auto(report_file, "w")
@@ -333,6 +432,3 @@ def examine_abi_fallback(download_path, results_dir, name):
         report.close()
     else:
         truncate_file(report_file)
-
-    os.chdir(old_dir)
-    purge_tree(extract_dir)
@@ -22,12 +22,14 @@ import os
 import re
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 import build
 import buildreq
 import check
 import commitmessage
 import config
+import count
 import files
 import git
 import license
@@ -35,17 +37,24 @@ import pkg_integrity
 import pkg_scan
 import specdescription
 import specfiles
+import srctree
 import tarball
 from abireport import examine_abi
-from logcheck import logcheck
-from util import binary_in_path, print_build_failed, print_fatal, write_out
+from logcheck import LogCheck, logcheck
+from util import (ERROR_ENV, BuildErrors, binary_in_path, print_build_failed,
+                  print_fatal, write_out)
 
 sys.path.append(os.path.dirname(__file__))
 
+# use_git values check_requirements passed for, batch mode checks them once
+checked_requirements = set()
+
 
 def check_requirements(use_git):
     """Ensure all requirements are satisfied before continuing."""
-    required_bins = ["mock", "rpm2cpio", "nm", "objdump", "cpio", "readelf"]
+    if use_git in checked_requirements:
+        return
+    required_bins = ["mock", "rpm2cpio", "c++filt"]
 
     if use_git:
         required_bins.append("git")
@@ -55,6 +64,7 @@ def check_requirements(use_git):
     if missing:
         print_fatal("Required programs are not installed: {}".format(", ".join(missing)))
         sys.exit(1)
+    checked_requirements.add(use_git)
 
 
 def load_specfile(conf, specfile):
@@ -84,12 +94,17 @@ def read_old_metadata():
 
 
 def save_mock_logs(path, iteration):
-    """Save Mock build logs to <path>/results/round<iteration>-*.log."""
+    """Save Mock build logs to <path>/results/round<iteration>-*.log.
+
+    The srpm logs are missing from the rounds that reused the srpm.
+    """
     basedir = os.path.join(path, "results")
     loglist = ["build", "root", "srpm-build", "srpm-root", "mock_srpm", "mock_build"]
     for log in loglist:
         src = "{}/{}.log".format(basedir, log)
         dest = "{}/round{}-{}.log".format(basedir, iteration, log)
+        if log in ("srpm-build", "srpm-root", "mock_srpm") and not os.path.exists(src):
+            continue
         os.rename(src, dest)
 
 
@@ -113,8 +128,31 @@ def write_prep(conf, workingdir, content):
     write_out(os.path.join(workingdir, "source0"), used_url)
 
 
-def main():
-    """Entry point for autospec."""
+def scan_source(conf, requirements, content, archives, path):
+    """Run the static analysis of the source extracted in path.
+
+    The license files are read and looked up, and the changelogs copied, in
+    worker threads while the build files and descriptions are scanned. The
+    results are applied in the serial order, so that they do not depend on
+    the thread scheduling.
+    """
+    # Start one directory higher so we scan *all* versions for licenses,
+    # the other analyzers query the same index for path
+    tree = srctree.SourceTree(os.path.dirname(path))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        licenses = pool.submit(license.prefetch_licenses, os.path.dirname(path), conf, content.name, tree)
+        changes = pool.submit(commitmessage.scan_for_changes, conf.download_path, path, conf.transforms, tree)
+        requirements.scan_for_configure(path, content.name, conf, tree)
+        specdescription.scan_for_description(content.name, path, conf.license_translations,
+                                             conf.license_blacklist, tree)
+        license.scan_for_licenses(os.path.dirname(path), conf, content.name, tree, licenses.result())
+        changes.result()
+    conf.add_sources(archives, content)
+    check.scan_for_tests(path, conf, requirements, content, tree)
+
+
+def make_parser():
+    """Return the parser of the autospec command line."""
     parser = argparse.ArgumentParser()
     parser.add_argument("-g", "--skip-git",
                         action="store_false", dest="git", default=True,
@@ -164,9 +202,11 @@ def main():
     parser.add_argument("-o", "--mock-opts", action="store", default="",
                         help="Arbitrary options to pass down to mock when "
                         "building a package.")
+    return parser
 
-    args = parser.parse_args()
 
+def run(parser, args):
+    """Build the package of the current directory with the parsed command line args."""
     name, url, archives = read_old_metadata()
     name = args.name or name
     url = args.url or url
@@ -196,11 +236,21 @@ def main():
             package(args, url, name, archives, workingdir)
 
 
+def main():
+    """Entry point for autospec."""
+    parser = make_parser()
+    run(parser, parser.parse_args())
+
+
 def package(args, url, name, archives, workingdir):
     """Entry point for building a package with autospec."""
     conf = config.Config(args.target)
+    conf.config_file = args.config
     check_requirements(args.git)
     conf.detect_build_from_url(url)
+    if not args.prep_only:
+        # cached trees are hard-linked, keep them away from manual edits
+        conf.setup_extract_cache()
     package = build.Build()
 
     #
@@ -239,13 +289,7 @@ def package(args, url, name, archives, workingdir):
         license.scan_for_licenses(os.path.dirname(_dir), conf, name)
         exit(0)
 
-    requirements.scan_for_configure(_dir, content.name, conf)
-    specdescription.scan_for_description(content.name, _dir, conf.license_translations, conf.license_blacklist)
-    # Start one directory higher so we scan *all* versions for licenses
-    license.scan_for_licenses(os.path.dirname(_dir), conf, content.name)
-    commitmessage.scan_for_changes(conf.download_path, _dir, conf.transforms)
-    conf.add_sources(archives, content)
-    check.scan_for_tests(_dir, conf, requirements, content)
+    scan_source(conf, requirements, content, archives, _dir)
 
     #
     # Now, we have enough to write out a specfile, and try to build it.
@@ -266,13 +310,24 @@ def package(args, url, name, archives, workingdir):
 
     if args.integrity:
         interactive_mode = not args.non_interactive
-        pkg_integrity.check(url, conf, interactive=interactive_mode)
+        pkg_integrity.check(url, conf, interactive=interactive_mode, digests=content.digests.get(content.url))
         pkg_integrity.load_specfile(specfile)
 
     spec_type = specfile.write_spec()
 
+    # analyze build.log for tests, configure misses and errors in the same
+    # pass that looks for missing build requirements
+    test_counter = count.LogCounter()
+    configure_misses = LogCheck()
+    package.log_consumers += [test_counter, configure_misses]
+    build_errors = None
+    if os.environ.get(ERROR_ENV):
+        build_errors = BuildErrors()
+        package.log_consumers.append(build_errors)
+
     while 1:
-        package.package(filemanager, args.mock_config, args.mock_opts, conf, requirements, content, args.cleanup)
+        package.package(filemanager, args.mock_config, args.mock_opts, conf, requirements, content, args.cleanup,
+                        specfile.changed_sections)
         if spec_type == "template":
             # specfile template is assumed "correct" and any failures need to be manually addressed
             break
@@ -298,7 +353,7 @@ def package(args, url, name, archives, workingdir):
 
     if package.success == 0:
         conf.create_buildreq_cache(content.version, requirements.buildreqs_cache)
-        print_build_failed()
+        print_build_failed(build_errors)
         sys.exit(1)
     elif 'license' not in specfile.packages and conf.config_opts['has_license']:
         print_fatal("package -license subpackage deleted")
@@ -316,7 +371,9 @@ def package(args, url, name, archives, workingdir):
             pass
 
     if spec_type == "generate":
-        check.check_regression(conf.download_path, conf.config_opts['skip_tests'], package.round - 1)
+        build_dir = "/var/lib/mock/clear-{}/root/builddir/build/BUILD".format(package.uniqueext)
+        check.check_regression(conf.download_path, conf.config_opts['skip_tests'], package.round - 1, test_counter.result, build_dir,
+                               package.build_started)
 
     examine_abi(conf.download_path, content.name)
     if os.path.exists("/var/lib/rpm"):
@@ -325,7 +382,7 @@ def package(args, url, name, archives, workingdir):
     write_out(conf.download_path + "/release", content.release + "\n")
 
     # record logcheck output
-    logcheck(conf.download_path)
+    logcheck(conf.download_path, configure_misses)
 
     commitmessage.guess_commit_message(pkg_integrity.IMPORTED, conf, content)
     conf.create_buildreq_cache(content.version, requirements.buildreqs_cache)
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+#
+# batch.py - part of autospec
+# Copyright (C) 2015 Intel Corporation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Run autospec over many packages from a single process
+#
+
+import argparse
+import json
+import multiprocessing
+import os
+import shlex
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+
+import autospec
+import build
+import config
+import util
+
+# name of the autospec output file written in each package target
+LOG_NAME = "autospec.log"
+
+
+def read_jobs(parser, path):
+    """Read the autospec command lines of the batch list in path.
+
+    Each non-empty line not starting with '#' holds the autospec arguments
+    of one package, including its --target. Returns (target, args) tuples
+    with absolute targets.
+    """
+    if path == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path) as listf:
+            lines = listf.read().splitlines()
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        args = parser.parse_args(shlex.split(line))
+        args.target = os.path.abspath(args.target)
+        jobs.append((args.target, args))
+    return jobs
+
+
+def preload():
+    """Load the data every package needs, for the forked workers to share."""
+    conf = config.Config("")
+    conf.setup_patterns()
+    for name in config.pattern_tables:
+        getattr(conf, name)
+    util.translate("")
+
+
+def init_worker(mock_slots):
+    """Set up a worker process to bound its mock runs with mock_slots."""
+    build.mock_slots = mock_slots
+
+
+def job_process(job, mock_slots, conn):
+    """Run job in a worker process, sending its summary through conn."""
+    init_worker(mock_slots)
+    conn.send(run_job(job))
+    conn.close()
+
+
+def run_job(job):
+    """Build the package of job, with the output in its target directory.
+
+    Returns the summary of the build. Each worker runs a single job, the
+    module level state of the analyzers is not shared between packages.
+    """
+    target, args = job
+    start = time.monotonic()
+    log = os.path.join(target, LOG_NAME)
+    code = 0
+    try:
+        os.makedirs(target, exist_ok=True)
+        os.chdir(target)
+        with open(log, 'w') as logf:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(logf.fileno(), 1)
+            os.dup2(logf.fileno(), 2)
+        # the worker exits after the job, no need to restore them
+        sys.stdout = open(1, 'w', buffering=1, closefd=False)
+        sys.stderr = open(2, 'w', buffering=1, closefd=False)
+        autospec.run(autospec.make_parser(), args)
+    except SystemExit as err:
+        if isinstance(err.code, int) or err.code is None:
+            code = err.code or 0
+        else:
+            print(err.code, file=sys.stderr)
+            code = 1
+    except Exception:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    return {"target": target,
+            "status": "ok" if code == 0 else "failed",
+            "code": code,
+            "seconds": round(time.monotonic() - start, 1),
+            "log": log}
+
+
+def run_batch(jobs, workers, mock_jobs):
+    """Build the packages of jobs with workers processes, mock_jobs mock runs at a time.
+
+    Returns the job summaries, in the order of jobs. Each job gets its own
+    forked process. They are not daemonic (unlike multiprocessing.Pool
+    workers) so the analyzers can start their own process pools.
+    """
+    context = multiprocessing.get_context("fork")
+    mock_slots = context.BoundedSemaphore(mock_jobs)
+    pending = list(jobs)
+    running = {}
+    results = {}
+    while pending or running:
+        while pending and len(running) < workers:
+            job = pending.pop(0)
+            recv_conn, send_conn = context.Pipe(duplex=False)
+            proc = context.Process(target=job_process, args=(job, mock_slots, send_conn))
+            proc.start()
+            send_conn.close()
+            running[proc.sentinel] = (proc, recv_conn, job, time.monotonic())
+        for sentinel in wait(list(running)):
+            proc, recv_conn, (target, _), start = running.pop(sentinel)
+            proc.join()
+            if recv_conn.poll():
+                result = recv_conn.recv()
+            else:
+                # the worker died without reporting
+                result = {"target": target,
+                          "status": "failed",
+                          "code": proc.exitcode,
+                          "seconds": round(time.monotonic() - start, 1),
+                          "log": os.path.join(target, LOG_NAME)}
+            recv_conn.close()
+            results[target] = result
+            print("{status:>6} {target} ({seconds}s)".format(**result), flush=True)
+    return [results[target] for target, _ in jobs]
+
+
+def write_report(results, path):
+    """Write the job summaries to path as json."""
+    with open(path, 'w') as reportf:
+        json.dump(results, reportf, indent=2)
+        reportf.write('\n')
+
+
+def main():
+    """Entry point for batch builds."""
+    parser = argparse.ArgumentParser(description="Run autospec for each package of a batch list")
+    parser.add_argument("batch_list",
+                        help="file with the autospec arguments of one package per line, "
+                             "'-' to read standard input")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="number of packages processed at the same time")
+    parser.add_argument("-m", "--mock-jobs", type=int, default=2,
+                        help="number of mock builds run at the same time")
+    parser.add_argument("-r", "--report", action="store", default="",
+                        help="write the per package summary as json to this file")
+    args = parser.parse_args()
+    if args.jobs < 1 or args.mock_jobs < 1:
+        parser.error("the number of jobs must be at least 1")
+
+    jobs = read_jobs(autospec.make_parser(), args.batch_list)
+    targets = [target for target, _ in jobs]
+    if len(set(targets)) != len(targets):
+        parser.error("each package must have its own --target")
+    for use_git in {job.git for _, job in jobs}:
+        autospec.check_requirements(use_git)
+    preload()
+
+    results = run_batch(jobs, min(args.jobs, len(jobs)) or 1, args.mock_jobs)
+    if args.report:
+        write_report(results, args.report)
+    failed = [result for result in results if result["status"] != "ok"]
+    print(f"{len(results) - len(failed)} of {len(results)} packages built")
+    for result in failed:
+        util.print_fatal(f"{result['target']} failed, see {result['log']}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
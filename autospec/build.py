@@ -19,13 +19,25 @@
 # Actually build the package
 #
 
+import contextlib
+import copy
+import hashlib
 import os
 import re
 import shutil
 import sys
+import time
 
 import util
 
+# semaphore bounding the concurrent mock runs, set by batch mode
+mock_slots = None
+
+# spec sections (see specfiles.spec_sections) a binary build short-circuited
+# past %prep and %build picks up changes from
+binary_sections = frozenset(["tags", "%install", "%check", "%clean", "%files", "%package", "%description",
+                             "%pre", "%post", "%preun", "%postun", "%pretrans", "%posttrans", "%changelog"])
+
 
 def cleanup_req(s: str) -> str:
     """Strip unhelpful strings from requirements."""
@@ -72,6 +84,39 @@ def check_for_warning_pattern(line):
             util.print_warning("Build log contains: {}".format(pat))
 
 
+class LogPatterns(object):
+    """Missing dependency patterns of a Config, compiled for repeated use.
+
+    The pkgconfig, simple and failed pattern tables are compiled once and each
+    pattern is guarded by a literal it requires, so the regular expression is
+    only run on lines that contain that literal.
+    """
+
+    def __init__(self, config):
+        """Compile the pattern tables of config in the order they are checked."""
+        self.config = config
+        self.patterns = []
+        for pattern, pkgconfig in config.pkgconfig_pats:
+            self.add(pattern, 'pkgconfig', pkgconfig)
+        for pattern, req in config.simple_pats:
+            self.add(pattern, 'simple', req)
+        for pattern, _, buildtool in config.failed_pats:
+            self.add(pattern, 'failed', buildtool)
+
+    def add(self, pattern, kind, arg):
+        """Append a compiled pattern of the given kind to the table."""
+        self.patterns.append((util.required_literal(pattern), re.compile(pattern), kind, arg))
+
+    def matches(self, line):
+        """Yield (match, kind, arg) for each pattern matching line, in table order."""
+        for literal, pat, kind, arg in self.patterns:
+            if literal not in line:
+                continue
+            match = pat.search(line)
+            if match:
+                yield match, kind, arg
+
+
 def get_mock_cmd():
     """Set mock command to use sudo as needed."""
     # Some distributions (e.g. Fedora) use consolehelper to run mock,
@@ -81,6 +126,38 @@ def get_mock_cmd():
     return 'sudo /usr/bin/mock'
 
 
+def source_digest(path, name):
+    """Return a digest of the files other than the spec mock --buildsrpm may package from path.
+
+    The files are only compared by name, size and modification time.
+    """
+    digest = hashlib.sha256()
+    with os.scandir(path) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if entry.name.startswith('.') or entry.name in ('results', f"{name}.spec") or not entry.is_file():
+                continue
+            info = entry.stat()
+            digest.update(f"{entry.name}\0{info.st_size}\0{info.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def srpm_digest(path, name, sources=None):
+    """Return a digest of the spec and the files mock --buildsrpm may package from path.
+
+    sources is the source_digest of path, when already known.
+    """
+    digest = hashlib.sha256()
+    with open(os.path.join(path, f"{name}.spec"), 'rb') as specf:
+        digest.update(specf.read())
+    digest.update((sources or source_digest(path, name)).encode())
+    return digest.hexdigest()
+
+
+def mock_slot():
+    """Return a context manager holding one of the mock_slots while mock runs."""
+    return mock_slots if mock_slots is not None else contextlib.nullcontext()
+
+
 class Build(object):
     """Manage package builds."""
 
@@ -91,9 +168,26 @@ class Build(object):
         self.must_restart = 0
         self.file_restart = 0
         self.uniqueext = ''
+        # srpm_digest of the sources of the last srpm built
+        self.srpm_digest = None
+        # source_digest and %install progress of the last round
+        self.sources = None
+        self.install_reached = False
+        # time the binary build of the last round started
+        self.build_started = None
         self.warned_about = set()
         self.patch_name_line = re.compile(r'^Patch #[0-9]+ \((.*)\):$')
         self.patch_fail_line = re.compile(r'^Skipping patch.$')
+        self.log_patterns = None
+        # objects with reset(), parse_line(line) and finish() methods that are
+        # fed each line of build.log while it is parsed
+        self.log_consumers = []
+
+    def get_log_patterns(self, config):
+        """Return the compiled log patterns for config, compiling them on first use."""
+        if not self.log_patterns or self.log_patterns.config is not config:
+            self.log_patterns = LogPatterns(config)
+        return self.log_patterns
 
     def simple_pattern_pkgconfig(self, line, pattern, pkgconfig, conf32, requirements):
         """Check for pkgconfig patterns and restart build as needed."""
@@ -115,6 +209,10 @@ class Build(object):
         match = pat.search(line)
         if not match:
             return
+        self.failed_match(match, config, requirements, buildtool)
+
+    def failed_match(self, match, config, requirements, buildtool=None):
+        """Add the requirement named by a failed pattern match."""
         s = match.group(1)
         # standard configure cleanups
         s = cleanup_req(s)
@@ -148,6 +246,41 @@ class Build(object):
                 util.print_warning(f"Unknown pattern match: {s}")
                 self.warned_about.add(s)
 
+    def check_patterns(self, line, config, requirements):
+        """Check a log line against all missing dependency patterns."""
+        for match, kind, arg in self.get_log_patterns(config).matches(line):
+            if kind == 'pkgconfig':
+                self.must_restart += requirements.add_pkgconfig_buildreq(arg, config.config_opts.get('32bit'), cache=True)
+            elif kind == 'simple':
+                self.must_restart += requirements.add_buildreq(arg, cache=True)
+            else:
+                self.failed_match(match, config, requirements, arg)
+
+    def early_restart_watch(self, filename, config, requirements):
+        """Return a util.call watch function that spots missing requirements in filename.
+
+        Lines appended to the log are checked against the log patterns using
+        a copy of requirements, so nothing is really added until the log is
+        parsed by parse_build_results once the build has stopped.
+        """
+        log = util.LogTail(filename)
+        scout = Build()
+        scout.warned_about = self.warned_about
+        scout.log_patterns = self.get_log_patterns(config)
+        scout_reqs = copy.deepcopy(requirements)
+        scout_reqs.verbose = 0
+
+        def watch():
+            for line in log.read_lines():
+                scout.check_patterns(line, config, scout_reqs)
+                if scout.must_restart:
+                    util.print_info(f"Missing build requirement found, stopping round early: {line.strip()}")
+                    log.close()
+                    return True
+            return False
+
+        return watch
+
     def parse_buildroot_log(self, filename, returncode):
         """Handle buildroot log contents."""
         if returncode == 0:
@@ -155,11 +288,9 @@ class Build(object):
         self.must_restart = 0
         self.file_restart = 0
         fatals = []
-        util.call("sync")
-        with util.open_auto(filename, "r") as rootlog:
-            loglines = rootlog.readlines()
+        util.fsync_file(filename)
         missing_pat = re.compile(r"^.*No matching package to install: '(.*)'$")
-        for line in loglines:
+        for line in util.stream_log(filename):
             match = missing_pat.match(line)
             if match is not None:
                 fatals.append(f"Cannot resolve dependency name: {match.group(1)}")
@@ -174,25 +305,21 @@ class Build(object):
         self.file_restart = 0
         infiles = 0
         patch_name = ""
+        self.install_reached = False
 
         # Flush the build-log to disk, before reading it
-        util.call("sync")
-        with util.open_auto(filename, "r") as buildlog:
-            loglines = buildlog.readlines()
-        for line in loglines:
+        util.fsync_file(filename)
+        for consumer in self.log_consumers:
+            consumer.reset()
+        for line in util.stream_log(filename):
+            for consumer in self.log_consumers:
+                consumer.parse_line(line)
             if patch_name_match := self.patch_name_line.search(line):
                 patch_name = patch_name_match.groups()[0]
             if patch_name:
                 if self.patch_fail_line.search(line):
                     self.must_restart += config.remove_backport_patch(patch_name)
-            for pat in config.pkgconfig_pats:
-                self.simple_pattern_pkgconfig(line, *pat, config.config_opts.get('32bit'), requirements)
-
-            for pat in config.simple_pats:
-                self.simple_pattern(line, *pat, requirements)
-
-            for pat in config.failed_pats:
-                self.failed_pattern(line, config, requirements, *pat)
+            self.check_patterns(line, config, requirements)
 
             check_for_warning_pattern(line)
 
@@ -230,12 +357,37 @@ class Build(object):
                 missing_file = "/" + line.split(match)[1].strip()
                 filemanager.remove_file(missing_file)
 
+            if line.startswith("Executing(%install"):
+                self.install_reached = True
+
             if line.startswith("Executing(%clean") and returncode == 0:
                 print("RPM build successful")
                 self.success = 1
 
-    def package(self, filemanager, mockconfig, mockopts, config, requirements, content, cleanup=False):
-        """Run main package build routine."""
+        for consumer in self.log_consumers:
+            consumer.finish()
+
+    def short_circuit(self, filemanager, config, cleanup, changed_sections, sources):
+        """Return True if the binary build can reuse the %build of the previous round.
+
+        That is when the sources are the same and the spec only changed in
+        sections a short-circuited binary build runs again. Without the
+        changed_sections, only rounds restarted for the file list do.
+        """
+        if not config.config_opts.get('avoid_rebuild') or cleanup:
+            return False
+        if changed_sections is None:
+            return self.must_restart == 0 and self.file_restart > 0 and \
+                set(filemanager.excludes) == set(filemanager.manual_excludes)
+        return self.install_reached and sources == self.sources and changed_sections <= binary_sections
+
+    def package(self, filemanager, mockconfig, mockopts, config, requirements, content, cleanup=False,
+                changed_sections=None):
+        """Run main package build routine.
+
+        changed_sections are the names of the spec sections changed since
+        the previous round, when known.
+        """
         self.round += 1
         self.success = 0
         mock_cmd = get_mock_cmd()
@@ -254,27 +406,34 @@ class Build(object):
             shutil.rmtree('{}/results'.format(config.download_path), ignore_errors=True)
             os.makedirs('{}/results'.format(config.download_path))
 
-        cmd_args = [
-            mock_cmd,
-            f"--root={mockconfig}",
-            "--buildsrpm",
-            "--sources=./",
-            f"--spec={content.name}.spec",
-            f"--uniqueext={self.uniqueext}-src",
-            "--result=results/",
-            cleanup_flag,
-            mockopts,
-        ]
-
-        util.call(" ".join(cmd_args),
-                  logfile=f"{config.download_path}/results/mock_srpm.log",
-                  cwd=config.download_path)
-
-        # back up srpm mock logs
-        util.call("mv results/root.log results/srpm-root.log", cwd=config.download_path)
-        util.call("mv results/build.log results/srpm-build.log", cwd=config.download_path)
-
         srcrpm = f"results/{content.name}-{content.version}-{content.release}.src.rpm"
+        sources = source_digest(config.download_path, content.name)
+        digest = srpm_digest(config.download_path, content.name, sources)
+        if digest == self.srpm_digest and os.path.isfile(os.path.join(config.download_path, srcrpm)):
+            print(f"Spec and sources unchanged, reusing {srcrpm}")
+        else:
+            cmd_args = [
+                mock_cmd,
+                f"--root={mockconfig}",
+                "--buildsrpm",
+                "--sources=./",
+                f"--spec={content.name}.spec",
+                f"--uniqueext={self.uniqueext}-src",
+                "--result=results/",
+                cleanup_flag,
+                mockopts,
+            ]
+
+            with mock_slot():
+                util.call(" ".join(cmd_args),
+                          logfile=f"{config.download_path}/results/mock_srpm.log",
+                          cwd=config.download_path)
+
+            # back up srpm mock logs
+            results = os.path.join(config.download_path, "results")
+            os.replace(os.path.join(results, "root.log"), os.path.join(results, "srpm-root.log"))
+            os.replace(os.path.join(results, "build.log"), os.path.join(results, "srpm-build.log"))
+            self.srpm_digest = digest
 
         cmd_args = [
             mock_cmd,
@@ -287,14 +446,23 @@ class Build(object):
             mockopts,
         ]
 
-        if config.config_opts.get('avoid_rebuild') and not cleanup and self.must_restart == 0 and self.file_restart > 0 and set(filemanager.excludes) == set(filemanager.manual_excludes):
+        if self.short_circuit(filemanager, config, cleanup, changed_sections, sources):
+            print("Reusing the %build of the previous round")
             cmd_args.append("--no-clean")
             cmd_args.append("--short-circuit=binary")
-
-        ret = util.call(" ".join(cmd_args),
-                        logfile=f"{config.download_path}/results/mock_build.log",
-                        check=False,
-                        cwd=config.download_path)
+        self.sources = sources
+
+        watch = None
+        if config.config_opts.get('early_restart'):
+            watch = self.early_restart_watch(f"{config.download_path}/results/build.log", config, requirements)
+
+        with mock_slot():
+            self.build_started = time.time()
+            ret = util.call(" ".join(cmd_args),
+                            logfile=f"{config.download_path}/results/mock_build.log",
+                            check=False,
+                            watch=watch,
+                            cwd=config.download_path)
 
         # sanity check the build log
         if not os.path.exists(config.download_path + "/results/build.log"):
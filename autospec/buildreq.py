@@ -28,6 +28,7 @@ import tomllib
 
 import pypidata
 import specdescription
+import srctree
 import util
 
 
@@ -36,6 +37,13 @@ def is_qmake_pro(f):
     return f.endswith(".pro") and not f.startswith(".")
 
 
+def is_executable(path, tree=None):
+    """Test if path is executable, through the source tree index when given."""
+    if tree is not None:
+        return tree.is_executable(path)
+    return os.access(path, os.X_OK)
+
+
 def old_python_module(req):
     """Check if the req is only for old python versions."""
     # Format for the line is expected to be:
@@ -747,8 +755,11 @@ class Requirements(object):
         else:
             config.autoreconf = False
 
-    def scan_for_configure(self, dirn, tname, config):
-        """Scan the package directory for build files to determine build pattern."""
+    def scan_for_configure(self, dirn, tname, config, tree=None):
+        """Scan the package directory for build files to determine build pattern.
+
+        tree is an optional srctree.SourceTree index of dirn.
+        """
         count = 0
         pyproject_path = ""
         requirements_path = ""
@@ -760,7 +771,7 @@ class Requirements(object):
         if config.config_opts['use_ninja']:
             self.add_buildreq('ninja')
 
-        for dirpath, _, files in os.walk(dirn):
+        for dirpath, _, files in srctree.walk(dirn, tree):
             default_score = 2 if dirpath == dirn else 1
 
             if "Cargo.toml" in files and 'Makefile' not in files:
@@ -769,7 +780,7 @@ class Requirements(object):
             if "CMakeLists.txt" in files and "configure.ac" not in files:
                 config.set_build_pattern("cmake", default_score)
 
-            if "configure" in files and os.access(dirpath + '/configure', os.X_OK):
+            if "configure" in files and is_executable(dirpath + '/configure', tree):
                 config.set_build_pattern("configure", default_score)
             elif any(is_qmake_pro(f) for f in files):
                 config.set_build_pattern("qmake", default_score)
@@ -21,24 +21,161 @@
 
 import os
 import re
+import xml.etree.ElementTree as ET
 
 import count
+import srctree
 import util
 
 tests_config = ""
 
+# result files written by test harnesses, e.g. meson's testlog.junit.xml,
+# pytest --junitxml, ctest --output-junit or TAP producers
+junit_file_pat = re.compile(r"(^TEST-.*|^junit.*|[.-]junit)\.xml$")
+tap_file_pat = re.compile(r"\.tap$")
+tap_line_pat = re.compile(r"^(not )?ok\b *([0-9]+)? *-? *([^#]*?) *(?:# *(skip|todo)\S*.*)?$", flags=re.I)
 
-def check_regression(pkg_dir, skip_tests, test_round):
-    """Check the build log for test regressions using the count module."""
+
+def junit_cases(path):
+    """Yield the (status, name) of each test case of the JUnit XML file path."""
+    for _, elem in ET.iterparse(path):
+        if elem.tag != "testcase":
+            continue
+        status = "PASS"
+        for child in elem:
+            if child.tag in ("failure", "error"):
+                status = "FAIL"
+                break
+            if child.tag == "skipped":
+                status = "XFAIL" if child.get("type") == "pytest.xfail" else "SKIP"
+        name = elem.get("name", "")
+        if elem.get("classname"):
+            name = "{}.{}".format(elem.get("classname"), name)
+        elem.clear()
+        yield status, name
+
+
+def tap_cases(path):
+    """Yield the (status, name) of each top level test point of the TAP file path."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    with util.open_auto(path) as tapf:
+        for line in tapf:
+            match = tap_line_pat.match(line.rstrip())
+            if not match:
+                continue
+            failed, number, description, directive = match.groups()
+            directive = (directive or "").lower()
+            if directive == "skip":
+                status = "SKIP"
+            elif failed:
+                status = "XFAIL" if directive == "todo" else "FAIL"
+            else:
+                status = "PASS"
+            yield status, "{}: {}".format(stem, description or number or "")
+
+
+def find_result_files(build_dir, since=None):
+    """Return the JUnit XML and TAP files under build_dir, with the reader of each.
+
+    With since, only the files modified from that time on are returned, so
+    that result files shipped in the source tree (test fixtures, CI data)
+    are not mistaken for the output of the build.
+    """
+    found = []
+    for dirpath, dirs, files in os.walk(build_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for fname in files:
+            if junit_file_pat.search(fname):
+                reader = junit_cases
+            elif tap_file_pat.search(fname):
+                reader = tap_cases
+            else:
+                continue
+            path = os.path.join(dirpath, fname)
+            try:
+                if since is not None and os.stat(path).st_mtime < since:
+                    continue
+            except OSError:
+                continue
+            found.append((path, reader))
+    return sorted(found)
+
+
+def read_test_cases(build_dir, since=None):
+    """Return the (status, name) of the test cases of the result files under build_dir written since."""
+    cases = []
+    for path, reader in find_result_files(build_dir, since):
+        try:
+            # a truncated file is skipped rather than partially counted
+            cases.extend(list(reader(path)))
+        except (OSError, ET.ParseError, UnicodeDecodeError) as err:
+            util.print_warning("Unable to read test results from {}: {}".format(path, err))
+    return cases
+
+
+def cases_result(cases):
+    """Return the test cases totals in the count module output format."""
+    totals = {"PASS": 0, "FAIL": 0, "SKIP": 0, "XFAIL": 0}
+    for status, _ in cases:
+        totals[status] += 1
+    return ",{},{},{},{},{}".format(len(cases), totals["PASS"], totals["FAIL"], totals["SKIP"], totals["XFAIL"])
+
+
+def write_test_cases(pkg_dir, cases):
+    """Write the test cases to testcases, warning about tests that passed in the previous run."""
+    cases_path = os.path.join(pkg_dir, "testcases")
+    previous = {}
+    try:
+        with util.open_auto(cases_path) as casesf:
+            for line in casesf:
+                status, _, name = line.rstrip("\n").partition(" ")
+                previous[name] = status
+    except FileNotFoundError:
+        pass
+
+    for status, name in cases:
+        if status == "FAIL" and previous.get(name) == "PASS":
+            util.print_warning("Test regression: {}".format(name))
+
+    util.write_out(cases_path, "".join("{} {}\n".format(status, name) for status, name in sorted(cases, key=lambda case: case[1])))
+
+
+def result_total(result):
+    """Return the total number of tests of a count module output."""
+    try:
+        return int(result.split(',')[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def check_regression(pkg_dir, skip_tests, test_round, result=None, build_dir=None, since=None):
+    """Check the build for test regressions.
+
+    The build log is checked with the count module. The JUnit XML and TAP
+    result files written under build_dir, the build tree of the last round,
+    since the time the build started are used instead when they cover at
+    least as many tests.
+
+    result is the count output for build.log if it was already gathered while
+    parsing the build (see count.LogCounter).
+    """
     if skip_tests:
         return
 
-    log_path = os.path.join(pkg_dir, 'results', 'build.log')
-    result = count.parse_log(log_path)
+    if result is None:
+        log_path = os.path.join(pkg_dir, 'results', 'build.log')
+        result = count.parse_log(log_path)
     if len(result) == 0 or result[0:2] == ',0':
         log_path = os.path.join(pkg_dir, 'results', f"round{test_round}-build.log")
         result = count.parse_log(log_path)
 
+    cases = read_test_cases(build_dir, since) if build_dir and os.path.isdir(build_dir) else []
+    if cases:
+        write_test_cases(pkg_dir, cases)
+        # the result files may only cover some of the test suites of the log
+        if len(cases) >= result_total(result):
+            result = cases_result(cases)
+
     titles = [('Package', 'package name', 1),
               ('Total', 'total tests', 1),
               ('Pass', 'total passing', 1),
@@ -57,7 +194,7 @@ def check_regression(pkg_dir, skip_tests, test_round):
     util.write_out(os.path.join(pkg_dir, "testresults"), res_str)
 
 
-def scan_for_tests(src_dir, config, requirements, content):
+def scan_for_tests(src_dir, config, requirements, content, tree=None):
     """Scan source directory for test files and set tests_config accordingly."""
     global tests_config
 
@@ -113,7 +250,7 @@ def scan_for_tests(src_dir, config, requirements, content):
         testsuites["makecheck"] += "\ncd ../build-openmpi;\n" + make_check_openmpi
         testsuites["cmake"] += "\ncd ../../build-openmpi/clr-build-openmpi;\n" + cmake_check_openmpi
 
-    files = os.listdir(src_dir)
+    files = tree.files(src_dir) if tree is not None and src_dir in tree else os.listdir(src_dir)
 
     if config.default_pattern == "cmake":
         makefile_path = os.path.join(src_dir, "CMakeLists.txt")
@@ -151,7 +288,7 @@ def scan_for_tests(src_dir, config, requirements, content):
         makefile_path = os.path.join(src_dir, "meson.build")
         if not os.path.isfile(makefile_path):
             return
-        for dirpath, _, files in os.walk(src_dir):
+        for dirpath, _, files in srctree.walk(src_dir, tree):
             for f in files:
                 if f == "meson.build":
                     with util.open_auto(os.path.join(dirpath, f)) as fp:
@@ -28,10 +28,11 @@ import shutil
 import sys
 from subprocess import PIPE, run
 
+import srctree
 import util
 
 
-def scan_for_changes(download_path, directory, transforms):
+def scan_for_changes(download_path, directory, transforms, tree=None):
     """Scan for changelogs or news files in the file sources.
 
     Scan for changelogs or news files in the source code and copy them to download_path as their
@@ -40,7 +41,7 @@ def scan_for_changes(download_path, directory, transforms):
     """
     found = []
     interests = transforms.keys()
-    for dirpath, dirnames, files in os.walk(directory, topdown=False):
+    for dirpath, dirnames, files in srctree.walk(directory, tree, topdown=False):
         hits = [x for x in files if x.lower() in interests and x.lower() not in found]
         for item in hits:
             source = os.path.join(dirpath, item)
@@ -28,10 +28,31 @@ from collections import OrderedDict
 
 import check
 import license
+from extractcache import ExtractCache
+from licensecache import LicenseCache
 from util import (call, open_auto, print_fatal, print_info, print_warning,
                   write_out)
 
 
+# pattern configuration files read by Config.setup_patterns, and whether
+# each one is a plain list instead of "<pattern>, <value>" lines
+pattern_tables = {
+    "ignored_commands": True,
+    "failed_commands": False,
+    "gems": False,
+    "license_hashes": False,
+    "license_translations": False,
+    "license_blacklist": True,
+    "qt_modules": False,
+    "cmake_modules": False,
+    "keyid_blocklist": True,
+}
+
+# parsed pattern configuration files, keyed by the path, mtime and size of
+# the files read so a changed file is parsed again
+pattern_conf_cache = {}
+
+
 def read_pattern_conf(filename, dest, list_format=False, path=None):
     """Read a fail-pattern configuration file.
 
@@ -47,6 +68,17 @@ def read_pattern_conf(filename, dest, list_format=False, path=None):
         file_path = [file_repo_path, file_conf_path]
     else:
         file_path = [file_repo_path]
+
+    key = [list_format]
+    for fpath in file_path:
+        stat = os.stat(fpath)
+        key.append((fpath, stat.st_mtime_ns, stat.st_size))
+    key = tuple(key)
+    if key in pattern_conf_cache:
+        dest.update(pattern_conf_cache[key])
+        return
+
+    patterns = {}
     for fpath in file_path:
         with open(fpath, "r") as patfile:
             for line in patfile:
@@ -56,12 +88,14 @@ def read_pattern_conf(filename, dest, list_format=False, path=None):
                     line = line[1:]
                 # Make list format a dict for faster lookup times
                 if list_format:
-                    dest[line.strip()] = True
+                    patterns[line.strip()] = True
                     continue
                 # split from the right a maximum of one time, since the pattern
                 # string might contain ", "
                 pattern, package = line.rsplit(", ", 1)
-                dest[pattern] = package.rstrip()
+                patterns[pattern] = package.rstrip()
+    pattern_conf_cache[key] = patterns
+    dest.update(patterns)
 
 
 class Config(object):
@@ -110,6 +144,7 @@ class Config(object):
         self.custom_summ = ""
         self.license_fetch = None
         self.license_show = None
+        self.license_cache = None
         self.license_skips = []
         self.git_uri = None
         self.os_packages = set()
@@ -123,16 +158,11 @@ class Config(object):
         self.pkey_macro = None
         self.yum_conf = None
         self.failed_pattern_dir = None
+        self.extract_cache = None
         self.alias = None
-        self.failed_commands = {}
-        self.ignored_commands = {}
-        self.gems = {}
-        self.keyid_blocklist = {}
-        self.license_hashes = {}
-        self.license_translations = {}
-        self.license_blacklist = {}
-        self.qt_modules = {}
-        self.cmake_modules = {}
+        # the pattern_tables are loaded on first use once setup_patterns is called
+        self.patterns_ready = False
+        self.patterns_path = None
         self.cves = []
         self.download_path = download_path
         self.default_pattern = "make"
@@ -194,6 +224,7 @@ class Config(object):
             "allow_exe": "Allow Windows executables (*.exe, *.dll) to be packaged",
             "use_ninja": "Use ninja build files",
             "has_license": "Require license subpackage for successful build",
+            "early_restart": "Stop a build round as soon as the log shows a missing build requirement",
         }
         # simple_pattern_pkgconfig patterns
         # contains patterns for parsing build.log for missing dependencies
@@ -612,16 +643,26 @@ class Config(object):
         return [line.rstrip() for line in lines]
 
     def setup_patterns(self, path=None):
-        """Read each pattern configuration file and assign to the appropriate variable."""
-        read_pattern_conf("ignored_commands", self.ignored_commands, list_format=True, path=path)
-        read_pattern_conf("failed_commands", self.failed_commands, path=path)
-        read_pattern_conf("gems", self.gems, path=path)
-        read_pattern_conf("license_hashes", self.license_hashes, path=path)
-        read_pattern_conf("license_translations", self.license_translations, path=path)
-        read_pattern_conf("license_blacklist", self.license_blacklist, list_format=True, path=path)
-        read_pattern_conf("qt_modules", self.qt_modules, path=path)
-        read_pattern_conf("cmake_modules", self.cmake_modules, path=path)
-        read_pattern_conf("keyid_blocklist", self.keyid_blocklist, list_format=True, path=path)
+        """Use the pattern configuration files of the repository and path.
+
+        The pattern_tables are each read and assigned to the attribute of the
+        same name when first used, so the tables a build doesn't need are
+        never parsed.
+        """
+        for name in pattern_tables:
+            self.__dict__.pop(name, None)
+        self.patterns_ready = True
+        self.patterns_path = path
+
+    def __getattr__(self, name):
+        """Load the pattern table name, which is empty until setup_patterns is called."""
+        if name not in pattern_tables:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        table = {}
+        if self.__dict__.get("patterns_ready"):
+            read_pattern_conf(name, table, list_format=pattern_tables[name], path=self.patterns_path)
+        setattr(self, name, table)
+        return table
 
     def parse_existing_spec(self, name):
         """Determine the old version, old patch list, old keyid, and cves from old spec file."""
@@ -705,6 +746,30 @@ class Config(object):
         print_info(f'Removed patch: {patch_name}')
         return 1
 
+    def setup_extract_cache(self):
+        """Enable the extraction cache if set in the [autospec] section of config_file.
+
+        extract_cache is the cache directory and extract_cache_size its size
+        limit in GiB (20 by default).
+        """
+        if not os.path.exists(self.config_file):
+            return
+        config = configparser.ConfigParser(interpolation=None)
+        config.read(self.config_file)
+        if "autospec" not in config.sections():
+            return
+
+        cache_dir = config['autospec'].get('extract_cache', None)
+        if not cache_dir:
+            return
+        if not os.path.isabs(cache_dir):
+            cache_dir = os.path.join(os.path.dirname(self.config_file), cache_dir)
+        try:
+            max_size = config['autospec'].getfloat('extract_cache_size', 20)
+            self.extract_cache = ExtractCache(cache_dir, int(max_size * 1024 ** 3))
+        except (OSError, ValueError) as err:
+            print_warning(f"Extraction cache disabled: {err}")
+
     def parse_config_files(self, bump, filemanager, version, requirements):
         """Parse the various configuration files that may exist in the package directory."""
         packages_file = None
@@ -721,6 +786,7 @@ class Config(object):
             self.git_uri = config['autospec'].get('git', None)
             self.license_fetch = config['autospec'].get('license_fetch', None)
             self.license_show = config['autospec'].get('license_show', None)
+            license_cache = config['autospec'].get('license_cache', None)
             packages_file = config['autospec'].get('packages_file', None)
             self.yum_conf = config['autospec'].get('yum_conf', None)
             self.failed_pattern_dir = config['autospec'].get('failed_pattern_dir', None)
@@ -732,6 +798,15 @@ class Config(object):
                 self.yum_conf = os.path.join(os.path.dirname(self.config_file), self.yum_conf)
             if self.failed_pattern_dir and not os.path.isabs(self.failed_pattern_dir):
                 self.failed_pattern_dir = os.path.join(os.path.dirname(self.config_file), self.failed_pattern_dir)
+            if license_cache and not os.path.isabs(license_cache):
+                license_cache = os.path.join(os.path.dirname(self.config_file), license_cache)
+            if license_cache:
+                try:
+                    ttl = config['autospec'].getfloat('license_cache_ttl', 30)
+                    negative_ttl = config['autospec'].getfloat('license_cache_negative_ttl', 1)
+                    self.license_cache = LicenseCache(license_cache, ttl * 86400, negative_ttl * 86400)
+                except (OSError, ValueError) as err:
+                    print_warning(f"License cache disabled: {err}")
 
             if not packages_file:
                 print("Warning: Set [autospec][packages_file] path to package list file for "
@@ -17,63 +17,299 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import hashlib
 import os
 import sys
+import threading
 from io import BytesIO
+from urllib.parse import urlparse
 
 import pycurl
 from util import print_fatal
 
+_session = None
+_session_lock = threading.Lock()
 
-def do_curl(url, dest=None, post=None, is_fatal=False):
+
+class DownloadSession(object):
+    """Reusable curl handles, pooled per host, sharing DNS, TLS sessions and connections.
+
+    Handles can be acquired from several threads, each handle is only used
+    by one thread at a time.
+    """
+
+    def __init__(self):
+        """Set up the shared curl state and the handle pool."""
+        self.share = pycurl.CurlShare()
+        for data in (pycurl.LOCK_DATA_DNS, pycurl.LOCK_DATA_SSL_SESSION, pycurl.LOCK_DATA_CONNECT):
+            self.share.setopt(pycurl.SH_SHARE, data)
+        self.handles = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        """Return a curl handle for url, preferably one used for the same host before."""
+        host = urlparse(url).netloc
+        with self.lock:
+            idle = self.handles.get(host)
+            if idle:
+                return idle.pop()
+        c = pycurl.Curl()
+        # kept by reset()
+        c.setopt(c.SHARE, self.share)
+        return c
+
+    def release(self, url, c):
+        """Return the curl handle used for url to the pool, keeping its connections."""
+        c.reset()
+        with self.lock:
+            self.handles.setdefault(urlparse(url).netloc, []).append(c)
+
+    def close(self):
+        """Close all pooled curl handles."""
+        with self.lock:
+            for idle in self.handles.values():
+                for c in idle:
+                    c.close()
+            self.handles = {}
+
+
+def get_session():
+    """Return the DownloadSession shared by all autospec modules."""
+    global _session
+    with _session_lock:
+        if not _session:
+            _session = DownloadSession()
+    return _session
+
+
+class HashingWriter(object):
+    """Write data to a file while computing its digests."""
+
+    def __init__(self, fp, digests):
+        """Write to fp, hashing with the hashlib algorithms named in digests."""
+        self.fp = fp
+        self.hashes = {name: hashlib.new(name) for name in digests}
+
+    def hash_file(self, path):
+        """Hash the content of path, as if it had been written."""
+        if not self.hashes:
+            return
+        with open(path, 'rb') as f:
+            while chunk := f.read(1024 * 1024):
+                for digest in self.hashes.values():
+                    digest.update(chunk)
+
+    def write(self, data):
+        """Write a chunk of data."""
+        self.fp.write(data)
+        for digest in self.hashes.values():
+            digest.update(data)
+
+    def hexdigests(self):
+        """Return a dict of the hex digests of the data written."""
+        return {name: digest.hexdigest() for name, digest in self.hashes.items()}
+
+
+def write_failed(dest, error, is_fatal):
+    """Remove dest after a failure to write to it."""
+    if os.path.exists(dest):
+        os.unlink(dest)
+    if is_fatal:
+        print_fatal("Unable to write to {}: {}".format(dest, error))
+        sys.exit(1)
+    return None
+
+
+class Transfer(object):
+    """One do_curl request, set up on a curl handle and completed once performed."""
+
+    def __init__(self, url, dest=None, post=None, is_fatal=False, digests=(), resume=False):
+        """Store the do_curl arguments of the request."""
+        self.url = url
+        self.dest = dest
+        self.post = post
+        self.is_fatal = is_fatal
+        self.digests = digests
+        self.resume = resume
+        # dest is only replaced once the download succeeds
+        self.part = None
+        if dest:
+            self.part = dest + (".part" if resume else ".tmp")
+        self.offset = 0
+        self.c = None
+        self.fp = None
+        self.buf = None
+        self.result = None
+
+    def setup(self, c):
+        """Set up the request on curl handle c, returning False if it can't be performed."""
+        self.c = c
+        c.setopt(c.URL, self.url)
+        if self.post:
+            c.setopt(c.POSTFIELDS, self.post)
+        c.setopt(c.FOLLOWLOCATION, True)
+        c.setopt(c.FAILONERROR, True)
+        c.setopt(c.CONNECTTIMEOUT, 10)
+        c.setopt(c.TIMEOUT, 600)
+        c.setopt(c.LOW_SPEED_LIMIT, 1)
+        c.setopt(c.LOW_SPEED_TIME, 10)
+        if self.dest:
+            if self.resume and os.path.isfile(self.part):
+                self.offset = os.path.getsize(self.part)
+            try:
+                self.fp = open(self.part, 'ab' if self.offset else 'wb')
+                self.buf = HashingWriter(self.fp, self.digests)
+                if self.offset:
+                    self.buf.hash_file(self.part)
+                    c.setopt(c.RESUME_FROM_LARGE, self.offset)
+            except IOError as e:
+                if self.fp:
+                    self.fp.close()
+                self.result = write_failed(self.part, e, self.is_fatal)
+                return False
+        else:
+            self.buf = BytesIO()
+        c.setopt(c.WRITEDATA, self.buf)
+        return True
+
+    def finish(self, error=None):
+        """Complete the request once performed, error being the pycurl.error it raised.
+
+        Returns the result of do_curl for the request.
+        """
+        if error:
+            if self.fp:
+                self.fp.close()
+                if self.offset and error.args[0] == pycurl.E_RANGE_ERROR:
+                    return self.restart()
+                if not self.resume:
+                    os.unlink(self.part)
+            if self.is_fatal:
+                print_fatal("Unable to fetch {}: {}".format(self.url, error))
+                sys.exit(1)
+            return None
+
+        if not self.dest:
+            return self.buf
+        # libcurl does not fail on a 416 response to a range request
+        if self.offset and self.c.getinfo(self.c.RESPONSE_CODE) == 416:
+            self.fp.close()
+            return self.restart()
+
+        try:
+            self.fp.close()
+            os.replace(self.part, self.dest)
+        except IOError as e:
+            return write_failed(self.part, e, self.is_fatal)
+        if self.digests:
+            return self.buf.hexdigests()
+        return self.dest
+
+    def restart(self):
+        """Download dest from the start, when its partial file can't be completed."""
+        os.unlink(self.part)
+        self.c.reset()
+        transfer = Transfer(self.url, self.dest, self.post, self.is_fatal, self.digests, self.resume)
+        return transfer.perform(self.c)
+
+    def perform(self, c):
+        """Perform the request with curl handle c, returning the result of do_curl."""
+        if not self.setup(c):
+            return self.result
+        try:
+            c.perform()
+        except pycurl.error as e:
+            return self.finish(e)
+        return self.finish()
+
+
+def do_curl(url, dest=None, post=None, is_fatal=False, digests=(), session=None, resume=False):
     """
     Perform a curl operation for `url`.
 
     If `post` is set, a POST is performed for `url` with fields taken from the
     specified value. Otherwise a GET is performed for `url`. If `dest` is set,
-    the curl response (if successful) is written to the specified path and the
-    path is returned. Otherwise a successful response is returned as a BytesIO
-    object. If `is_fatal` is `True` (`False` is the default), a GET failure,
-    POST failure, or a failure to write to the path specified for `dest`
-    results in the program exiting with an error. Otherwise, `None` is returned
-    for any of those error conditions.
+    the curl response is streamed to the specified path and, if successful,
+    the path is returned. Otherwise a successful response is returned as a
+    BytesIO object. If `is_fatal` is `True` (`False` is the default), a GET
+    failure, POST failure, or a failure to write to the path specified for
+    `dest` results in the program exiting with an error. Otherwise, `None` is
+    returned for any of those error conditions.
+
+    If `digests` names hashlib algorithms (e.g. ("sha1", "sha256")), the
+    response written to `dest` is hashed while it is downloaded and a dict of
+    the hex digests is returned instead of the path.
+
+    With a DownloadSession as `session`, connections are reused between
+    calls. The response is written to a file next to `dest`, which replaces
+    `dest` only once the download succeeded, so a failed download leaves an
+    existing `dest` untouched. With `resume`, that file is `dest`.part, which
+    is kept when the download fails and completed with a range request by the
+    next call.
     """
-    c = pycurl.Curl()
-    c.setopt(c.URL, url)
-    if post:
-        c.setopt(c.POSTFIELDS, post)
-    c.setopt(c.FOLLOWLOCATION, True)
-    c.setopt(c.FAILONERROR, True)
-    c.setopt(c.CONNECTTIMEOUT, 10)
-    c.setopt(c.TIMEOUT, 600)
-    c.setopt(c.LOW_SPEED_LIMIT, 1)
-    c.setopt(c.LOW_SPEED_TIME, 10)
-    buf = BytesIO()
-    c.setopt(c.WRITEDATA, buf)
+    c = session.acquire(url) if session else pycurl.Curl()
     try:
-        c.perform()
-    except pycurl.error as e:
-        if is_fatal:
-            print_fatal("Unable to fetch {}: {}".format(url, e))
-            sys.exit(1)
-        return None
+        return Transfer(url, dest, post, is_fatal, digests, resume).perform(c)
     finally:
-        c.close()
+        if session:
+            session.release(url, c)
+        else:
+            c.close()
 
-    # write to dest if specified
-    if dest:
-        try:
-            with open(dest, 'wb') as fp:
-                fp.write(buf.getvalue())
-        except IOError as e:
-            if os.path.exists(dest):
-                os.unlink(dest)
-            if is_fatal:
-                print_fatal("Unable to write to {}: {}".format(dest, e))
-                sys.exit(1)
-            return None
 
-    if dest:
-        return dest
-    else:
-        return buf
+def fetch_many(requests, session=None, max_host_connections=4):
+    """
+    Perform several curl operations concurrently.
+
+    `requests` is a list of dicts of do_curl keyword arguments (`url`, `dest`,
+    `post`, `is_fatal`, `digests` and `resume`). At most
+    `max_host_connections` requests to the same host are performed at the
+    same time. Returns the list of do_curl results, in the order of
+    `requests`.
+    """
+    if len(requests) <= 1:
+        # nothing to run concurrently
+        return [do_curl(**request, session=session) for request in requests]
+
+    multi = pycurl.CurlMulti()
+    multi.setopt(pycurl.M_MAX_HOST_CONNECTIONS, max_host_connections)
+    results = [None] * len(requests)
+    handles = []
+    active = {}
+    try:
+        for idx, request in enumerate(requests):
+            transfer = Transfer(**request)
+            c = session.acquire(transfer.url) if session else pycurl.Curl()
+            handles.append((transfer.url, c))
+            if transfer.setup(c):
+                multi.add_handle(c)
+                active[c] = (idx, transfer)
+            else:
+                results[idx] = transfer.result
+
+        while active:
+            while multi.perform()[0] == pycurl.E_CALL_MULTI_PERFORM:
+                pass
+            while True:
+                queued, ok_list, err_list = multi.info_read()
+                done = [(c, None) for c in ok_list]
+                done += [(c, pycurl.error(errno, errmsg)) for c, errno, errmsg in err_list]
+                for c, error in done:
+                    multi.remove_handle(c)
+                    idx, transfer = active.pop(c)
+                    results[idx] = transfer.finish(error)
+                if not queued:
+                    break
+            if active:
+                multi.select(1.0)
+    finally:
+        for c in active:
+            multi.remove_handle(c)
+        for url, c in handles:
+            if session:
+                session.release(url, c)
+            else:
+                c.close()
+        multi.close()
+
+    return results
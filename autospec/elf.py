@@ -0,0 +1,377 @@
+#!/bin/true
+#
+# elf.py - part of autospec
+# Copyright (C) 2016 Intel Corporation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Minimal ELF reader for the dynamic linking information of binaries, the
+# SONAME, NEEDED entries and exported dynamic symbols, classifying files and
+# symbols the way file(1) and nm(1) do.
+
+import mmap
+import os
+import struct
+
+ELFMAG = b"\x7fELF"
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+ET_EXEC = 2
+ET_DYN = 3
+
+PT_LOAD = 1
+PT_DYNAMIC = 2
+
+SHT_STRTAB = 3
+SHT_DYNAMIC = 6
+SHT_NOBITS = 8
+SHT_DYNSYM = 11
+SHT_GNU_VERDEF = 0x6ffffffd
+SHT_GNU_VERSYM = 0x6fffffff
+
+SHF_EXECINSTR = 0x4
+
+SHN_UNDEF = 0
+SHN_LORESERVE = 0xff00
+SHN_ABS = 0xfff1
+SHN_COMMON = 0xfff2
+SHN_XINDEX = 0xffff
+
+STB_GLOBAL = 1
+STB_WEAK = 2
+STB_GNU_UNIQUE = 10
+STT_GNU_IFUNC = 10
+
+DT_NULL = 0
+DT_NEEDED = 1
+DT_STRTAB = 5
+DT_SONAME = 14
+DT_FLAGS_1 = 0x6ffffffb
+DF_1_PIE = 0x08000000
+
+VER_FLG_BASE = 0x1
+VERSYM_HIDDEN = 0x8000
+VERSYM_VERSION = 0x7fff
+
+# section name prefixes nm classifies before looking at section flags
+nm_section_types = ((".drectve", "i"), (".edata", "e"), (".idata", "i"), (".pdata", "p"))
+
+
+class ElfError(Exception):
+    """Raised when a file is not a readable ELF file."""
+
+    pass
+
+
+class ElfFile(object):
+    """Read-only view of the dynamic linking information of an ELF file.
+
+    The file is mapped in memory for the lifetime of the object, use it as a
+    context manager to unmap it. The content of files that are not on disk
+    can be passed as bytes instead.
+    """
+
+    def __init__(self, path, data=None):
+        """Map path, or use its content data, and read its ELF header, program and section headers."""
+        self.path = path
+        if data is not None:
+            if len(data) < 64 or data[:4] != ELFMAG:
+                raise ElfError(f"{path} is not an ELF file")
+            self.data = data
+        else:
+            with open(path, "rb") as elff:
+                if os.fstat(elff.fileno()).st_size < 64 or elff.read(4) != ELFMAG:
+                    raise ElfError(f"{path} is not an ELF file")
+                self.data = mmap.mmap(elff.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.read_headers()
+        except (struct.error, IndexError, ValueError) as err:
+            self.close()
+            raise ElfError(f"{path} is a malformed ELF file: {err}")
+        self._dynamic = None
+
+    def __enter__(self):
+        """Return self, the file is already mapped."""
+        return self
+
+    def __exit__(self, *_):
+        """Unmap the file."""
+        self.close()
+
+    def close(self):
+        """Unmap the file."""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def unpack(self, fmt, offset):
+        """Unpack fmt, in the byte order of the file, from offset."""
+        return struct.unpack_from(self.endian + fmt, self.data, offset)
+
+    def read_headers(self):
+        """Read the ELF header and the program and section header tables."""
+        self.elf_class, self.elf_data = self.data[4], self.data[5]
+        if self.elf_class not in (ELFCLASS32, ELFCLASS64) or self.elf_data not in (ELFDATA2LSB, ELFDATA2MSB):
+            raise ValueError("unknown ELF class or data encoding")
+        self.endian = "<" if self.elf_data == ELFDATA2LSB else ">"
+        self.is64 = self.elf_class == ELFCLASS64
+        if self.is64:
+            (self.e_type, _, _, _, phoff, shoff, _, _, phentsize, phnum,
+             shentsize, shnum, shstrndx) = self.unpack("HHIQQQIHHHHHH", 16)
+        else:
+            (self.e_type, _, _, _, phoff, shoff, _, _, phentsize, phnum,
+             shentsize, shnum, shstrndx) = self.unpack("HHIIIIIHHHHHH", 16)
+
+        # (p_type, p_offset, p_vaddr, p_filesz, p_flags)
+        self.segments = []
+        for idx in range(phnum if phoff else 0):
+            offset = phoff + idx * phentsize
+            if self.is64:
+                p_type, p_flags, p_offset, p_vaddr, _, p_filesz = self.unpack("IIQQQQ", offset)
+            else:
+                p_type, p_offset, p_vaddr, _, p_filesz, _, p_flags = self.unpack("IIIIIII", offset)
+            self.segments.append((p_type, p_offset, p_vaddr, p_filesz, p_flags))
+
+        # (sh_name, sh_type, sh_flags, sh_offset, sh_size, sh_link, sh_entsize)
+        self.sections = []
+        if shoff:
+            if shnum == 0:
+                # the real number of sections is in the first section header
+                shnum = self.read_section_header(shoff)[4]
+            for idx in range(shnum):
+                self.sections.append(self.read_section_header(shoff + idx * shentsize))
+        if shstrndx == SHN_XINDEX and self.sections:
+            shstrndx = self.sections[0][5]
+        self.section_names = []
+        if self.sections and shstrndx < len(self.sections):
+            shstrtab = self.sections[shstrndx]
+            self.section_names = [self.string(shstrtab[3], shstrtab[4], sec[0]) for sec in self.sections]
+
+    def read_section_header(self, offset):
+        """Return the section header at offset."""
+        if self.is64:
+            sh_name, sh_type, sh_flags, _, sh_offset, sh_size, sh_link, _, _, sh_entsize = \
+                self.unpack("IIQQQQIIQQ", offset)
+        else:
+            sh_name, sh_type, sh_flags, _, sh_offset, sh_size, sh_link, _, _, sh_entsize = \
+                self.unpack("IIIIIIIIII", offset)
+        return (sh_name, sh_type, sh_flags, sh_offset, sh_size, sh_link, sh_entsize)
+
+    def string(self, table_offset, table_size, index):
+        """Return the nul terminated string at index in a string table."""
+        if index >= table_size:
+            raise ValueError("string index out of range")
+        start = table_offset + index
+        end = self.data.find(b"\0", start, table_offset + table_size)
+        if end < 0:
+            end = table_offset + table_size
+        return self.data[start:end].decode("utf-8", "surrogateescape")
+
+    def vaddr_to_offset(self, vaddr):
+        """Return the file offset of the virtual address vaddr."""
+        for p_type, p_offset, p_vaddr, p_filesz, _ in self.segments:
+            if p_type == PT_LOAD and p_vaddr <= vaddr < p_vaddr + p_filesz:
+                return vaddr - p_vaddr + p_offset
+        raise ValueError("address not mapped from the file")
+
+    def read_dynamic(self):
+        """Return the (tag, value) entries of the dynamic section and its string table offset."""
+        entsize = 16 if self.is64 else 8
+        fmt = "qQ" if self.is64 else "iI"
+        dynamic = None
+        for p_type, p_offset, _, p_filesz, _ in self.segments:
+            if p_type == PT_DYNAMIC:
+                dynamic = (p_offset, p_filesz)
+                break
+        else:
+            for section in self.sections:
+                if section[1] == SHT_DYNAMIC:
+                    dynamic = (section[3], section[4])
+                    break
+        if dynamic is None:
+            return [], None
+
+        entries = []
+        offset, size = dynamic
+        for entry in range(offset, offset + size - entsize + 1, entsize):
+            tag, value = self.unpack(fmt, entry)
+            if tag == DT_NULL:
+                break
+            entries.append((tag, value))
+
+        strtab = None
+        for tag, value in entries:
+            if tag == DT_STRTAB:
+                strtab = self.vaddr_to_offset(value)
+        return entries, strtab
+
+    @property
+    def dynamic(self):
+        """Return the SONAME, NEEDED entries and DT_FLAGS_1 of the dynamic section."""
+        if self._dynamic is None:
+            soname, needed, flags_1 = None, [], 0
+            try:
+                entries, strtab = self.read_dynamic()
+                strsize = len(self.data) - strtab if strtab is not None else 0
+                for tag, value in entries:
+                    if tag == DT_SONAME:
+                        soname = self.string(strtab, strsize, value)
+                    elif tag == DT_NEEDED:
+                        needed.append(self.string(strtab, strsize, value))
+                    elif tag == DT_FLAGS_1:
+                        flags_1 = value
+            except (struct.error, IndexError, ValueError, TypeError):
+                pass
+            self._dynamic = (soname, needed, flags_1)
+        return self._dynamic
+
+    @property
+    def soname(self):
+        """Return the DT_SONAME of the file, or None."""
+        return self.dynamic[0]
+
+    @property
+    def needed(self):
+        """Return the list of DT_NEEDED libraries of the file."""
+        return self.dynamic[1]
+
+    @property
+    def is_pie(self):
+        """Return True if the file is a position independent executable."""
+        return self.e_type == ET_DYN and bool(self.dynamic[2] & DF_1_PIE)
+
+    @property
+    def is_shared_object(self):
+        """Return True where file(1) reports an 'LSB shared object'."""
+        return self.elf_data == ELFDATA2LSB and self.e_type == ET_DYN and not self.is_pie
+
+    @property
+    def is_dynamic_binary(self):
+        """Return True where file(1) reports an 'LSB shared object' or 'LSB executable'."""
+        return self.is_shared_object or (self.elf_data == ELFDATA2LSB and self.e_type == ET_EXEC)
+
+    def symbol_versions(self, versym, verdef):
+        """Return the version index of each dynamic symbol and the names of the version definitions."""
+        versions = []
+        if versym:
+            versions = list(struct.unpack_from(f"{self.endian}{versym[4] // 2}H", self.data, versym[3]))
+
+        # version index -> (vd_flags, vd_nodename)
+        definitions = {}
+        if verdef:
+            strtab = self.sections[verdef[5]]
+            offset = verdef[3]
+            while True:
+                _, vd_flags, vd_ndx, _, _, vd_aux, vd_next = self.unpack("HHHHIII", offset)
+                vda_name = self.unpack("I", offset + vd_aux)[0]
+                definitions[vd_ndx] = (vd_flags, self.string(strtab[3], strtab[4], vda_name))
+                if not vd_next:
+                    break
+                offset += vd_next
+        return versions, definitions
+
+    def symbol_version(self, name, vernum, definitions):
+        """Return the version suffix nm prints for a defined symbol."""
+        hidden = vernum & VERSYM_HIDDEN
+        vernum &= VERSYM_VERSION
+        cverdefs = max(definitions) if definitions else 0
+        if vernum == 0:
+            return ""
+        if vernum == 1 and (vernum > cverdefs or definitions.get(1, (0,))[0] == VER_FLG_BASE):
+            return ""
+        if vernum not in definitions:
+            return ""
+        nodename = definitions[vernum][1]
+        if nodename == name:
+            return ""
+        return ("@" if hidden else "@@") + nodename
+
+    def symbol_class(self, info, shndx):
+        """Return the nm symbol type letter of a defined global dynamic symbol, or None."""
+        bind, sym_type = info >> 4, info & 0xf
+        if shndx == SHN_UNDEF or shndx == SHN_COMMON:
+            return None
+        if sym_type == STT_GNU_IFUNC:
+            return "i"
+        if bind == STB_WEAK:
+            return "W"
+        if bind == STB_GNU_UNIQUE:
+            return "u"
+        if bind != STB_GLOBAL:
+            return None
+        if shndx == SHN_ABS:
+            return "A"
+        if shndx >= SHN_LORESERVE or shndx >= len(self.sections):
+            return "?"
+        section_name = self.section_names[shndx] if self.section_names else ""
+        for prefix, letter in nm_section_types:
+            if section_name.startswith(prefix):
+                return letter.upper()
+        sh_type, sh_flags = self.sections[shndx][1:3]
+        if sh_flags & SHF_EXECINSTR:
+            return "T"
+        if sh_type == SHT_NOBITS:
+            return "B"
+        return "D"
+
+    def dynamic_symbols(self):
+        """Return the (name, type) of the defined external dynamic symbols, as nm -D prints them.
+
+        The names carry their @VERSION or @@VERSION suffix, and the type is
+        the nm symbol type letter, with data symbols reported as 'D'.
+        """
+        dynsym = versym = verdef = None
+        for section in self.sections:
+            if section[1] == SHT_DYNSYM:
+                dynsym = section
+            elif section[1] == SHT_GNU_VERSYM:
+                versym = section
+            elif section[1] == SHT_GNU_VERDEF:
+                verdef = section
+        if dynsym is None or dynsym[5] >= len(self.sections):
+            return []
+
+        try:
+            versions, definitions = self.symbol_versions(versym, verdef)
+            strtab = self.sections[dynsym[5]]
+            entsize = 24 if self.is64 else 16
+            symbols = []
+            # the first symbol is always the undefined null symbol
+            for idx in range(1, dynsym[4] // entsize):
+                offset = dynsym[3] + idx * entsize
+                if self.is64:
+                    st_name, st_info, _, st_shndx = self.unpack("IBBH", offset)
+                else:
+                    st_name = self.unpack("I", offset)[0]
+                    st_info, _, st_shndx = self.unpack("BBH", offset + 12)
+                sym_class = self.symbol_class(st_info, st_shndx)
+                if sym_class is None:
+                    continue
+                name = self.string(strtab[3], strtab[4], st_name)
+                if idx < len(versions):
+                    name += self.symbol_version(name, versions[idx], definitions)
+                symbols.append((name, sym_class))
+        except (struct.error, IndexError, ValueError):
+            return []
+        return symbols
+
+
+def open_elf(path):
+    """Return an ElfFile for path, or None if it isn't a readable ELF file."""
+    try:
+        return ElfFile(path)
+    except (OSError, ElfError):
+        return None
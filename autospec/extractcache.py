@@ -0,0 +1,149 @@
+#!/bin/true
+#
+# extractcache.py - part of autospec
+# Copyright (C) 2015 Intel Corporation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Cache of extracted source trees, keyed by the tarball sha1sum
+#
+
+import json
+import os
+import shutil
+import tempfile
+
+from util import print_info, print_warning
+
+
+def link_tree(src, dst):
+    """Recreate the tree at src in dst, hard-linking files when possible."""
+    def link_or_copy(src_file, dst_file):
+        try:
+            os.link(src_file, dst_file)
+        except OSError:
+            # e.g. src and dst are on different filesystems
+            shutil.copy2(src_file, dst_file)
+
+    shutil.copytree(src, dst, symlinks=True, copy_function=link_or_copy, dirs_exist_ok=True)
+
+
+def tree_size(path):
+    """Return the disk usage in bytes of the files under path."""
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            size += os.lstat(os.path.join(root, name)).st_blocks * 512
+    return size
+
+
+class ExtractCache(object):
+    """Size-bounded cache of extracted source trees.
+
+    Each entry is a directory named after the sha1sum of a tarball, holding
+    the tree it unpacked to and a meta.json file with its prefix. The entry
+    used least recently is evicted when the cache grows over max_size bytes.
+    """
+
+    def __init__(self, path, max_size):
+        """Set up the cache in path."""
+        self.path = path
+        self.max_size = max_size
+        os.makedirs(self.path, exist_ok=True)
+
+    def entry_meta(self, src):
+        """Return the metadata identifying how src was unpacked."""
+        return {"name": os.path.basename(src.path),
+                "pattern": src.pattern,
+                "type": src.type}
+
+    def restore(self, src, staging):
+        """Restore the cached tree of src into staging, returning True on a hit.
+
+        The prefix and subdir of src are set from the cache entry.
+        """
+        entry = os.path.join(self.path, src.sha1)
+        try:
+            with open(os.path.join(entry, "meta.json")) as metaf:
+                meta = json.load(metaf)
+        except (OSError, ValueError):
+            return False
+        if meta["source"] != self.entry_meta(src) or "as_is" not in meta:
+            return False
+
+        try:
+            link_tree(os.path.join(entry, "tree"), staging)
+        except OSError:
+            # the entry was evicted while being restored
+            shutil.rmtree(staging, ignore_errors=True)
+            os.mkdir(staging)
+            return False
+        # the modification time of meta.json tracks when the entry was used
+        os.utime(os.path.join(entry, "meta.json"))
+        src.prefix = meta["prefix"]
+        src.subdir = meta["subdir"]
+        src.as_is = meta["as_is"]
+        print_info(f"Restored {meta['source']['name']} from the extraction cache")
+        return True
+
+    def store(self, src, staging):
+        """Add the tree src unpacked to in staging to the cache."""
+        tmp_entry = tempfile.mkdtemp(prefix=".new-", dir=self.path)
+        try:
+            link_tree(staging, os.path.join(tmp_entry, "tree"))
+            meta = {"source": self.entry_meta(src),
+                    "prefix": src.prefix,
+                    "subdir": src.subdir,
+                    "as_is": src.as_is,
+                    "size": tree_size(os.path.join(tmp_entry, "tree"))}
+            with open(os.path.join(tmp_entry, "meta.json"), "w") as metaf:
+                json.dump(meta, metaf)
+            entry = os.path.join(self.path, src.sha1)
+            self.remove(entry)
+            os.rename(tmp_entry, entry)
+        except OSError as err:
+            print_warning(f"Unable to add {src.path} to the extraction cache: {err}")
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return
+        self.evict()
+
+    def remove(self, entry):
+        """Remove the cache entry directory, if present."""
+        if not os.path.isdir(entry):
+            return
+        # rename first so no partial entry is ever seen under its sha1sum
+        tmp_entry = tempfile.mkdtemp(prefix=".old-", dir=self.path)
+        os.rename(entry, os.path.join(tmp_entry, "entry"))
+        shutil.rmtree(tmp_entry, ignore_errors=True)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_size."""
+        entries = []
+        for name in os.listdir(self.path):
+            meta_path = os.path.join(self.path, name, "meta.json")
+            if name.startswith("."):
+                continue
+            try:
+                with open(meta_path) as metaf:
+                    size = json.load(metaf)["size"]
+                entries.append((os.stat(meta_path).st_mtime, size, name))
+            except (OSError, ValueError, KeyError):
+                continue
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_size:
+                break
+            self.remove(os.path.join(self.path, name))
+            total -= size
@@ -26,6 +26,206 @@ from collections import OrderedDict
 import util
 
 
+def file_patterns(pkg_name, so_dest, so_dest_ompi):
+    """Return the patterns that map installed files to subpackages.
+
+    Each entry is a tuple (<raw pattern>, <package>, <optional replacement>),
+    order matters, first match wins!
+    """
+    return [
+        (r"^/usr/share/package-licenses/.{1,}/.{1,}", "license"),
+        (r"^/usr/share/man/man2", "dev"),
+        (r"^/usr/share/man/man3", "dev"),
+        (r"^/usr/share/man/", "man"),
+        (r"^/usr/share/pkgconfig/32.*\.pc$", "dev32"),
+        (r"^/usr/share/pkgconfig/", "dev"),
+        (r"^/usr/share/info/", "info"),
+        (r"^/usr/share/abi/", "abi"),
+        (r"^/usr/share/qt5/examples/", "examples"),
+        (r"^/usr/share/qt6/examples/", "examples"),
+        (r"^/usr/share/omf", "main", "/usr/share/omf/*"),
+        (r"^/usr/share/installed-tests/", "tests"),
+        (r"^/usr/libexec/installed-tests/", "tests"),
+        (r"^/usr/lib/rustlib/x86_64-unknown-linux-gnu/lib/[a-zA-Z0-9._+-]+\.rlib", "lib", "/usr/lib/rustlib/x86_64-unknown-linux-gnu/lib/*.rlib"),
+        (r"^/usr/lib/rustlib/x86_64-unknown-linux-gnu/analysis/[a-zA-Z0-9._+-]+\.json", "lib", "/usr/lib/rustlib/x86_64-unknown-linux-gnu/analysis/*.json"),
+        (r"^/usr/share/clear/optimized-elf/bin", "bin", "/usr/share/clear/optimized-elf/bin*"),
+        (r"^/usr/share/clear/optimized-elf/exec", "libexec", "/usr/share/clear/optimized-elf/exec*"),
+        (r"^/usr/share/clear/optimized-elf/lib", "lib", "/usr/share/clear/optimized-elf/lib*"),
+        (r"^/usr/share/clear/optimized-elf/other", "lib", "/usr/share/clear/optimized-elf/other*"),
+        (r"^/usr/share/clear/optimized-elf/test", "tests", "/usr/share/clear/optimized-elf/test*"),
+        (r"^/usr/share/clear/optimized-elf/", "lib"),
+        (r"^/usr/share/clear/filemap/", "filemap"),
+        (r"^/usr/lib64/openmpi/bin/", "openmpi"),
+        (r"^/usr/lib64/openmpi/share", "openmpi"),
+        (r"^/usr/lib64/openmpi/include/", "dev"),
+        (r"^/usr/lib64/openmpi/lib/[a-zA-Z0-9._+-]*\.so$", so_dest_ompi),
+        (r"^/usr/lib64/openmpi/lib/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
+        (r"^/usr/lib64/openmpi/lib/[a-zA-Z0-9._+-]*\.so\.", "openmpi"),
+        (r"^/usr/lib64/openmpi/lib/python3.*/", "openmpi"),
+        (r"^/usr/lib64/openmpi/lib/", "dev"),
+        (r"^/usr/lib/[a-zA-Z0-9._+-]*\.so\.", "plugins"),
+        (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.so\.", "lib"),
+        (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.so\.", "lib32"),
+        (r"^/usr/lib64/lib(asm|dw|elf)-[0-9.]+\.so", "lib"),
+        (r"^/usr/lib64/libkdeinit5", "lib"),
+        (r"^/usr/lib32/lib(asm|dw|elf)-[0-9.]+\.so", "lib32"),
+        (r"^/usr/lib64/haswell/[a-zA-Z0-9._+-]*\.so\.", "lib"),
+        (r"^/usr/lib64/gobject-introspection/", "lib"),
+        (r"^/usr/libexec/", "libexec"),
+        (r"^/usr/bin/", "bin"),
+        (r"^/usr/sbin/", "bin"),
+        (r"^/sbin/", "bin"),
+        (r"^/bin/", "bin"),
+        (r"^/usr/lib/python3.*/", "python3", "/usr/lib/python3*/*"),
+        (r"^/usr/share/gir-[0-9\.]+/[a-zA-Z0-9._+-]*\.gir", "data", "/usr/share/gir-1.0/*.gir"),
+        (r"^/usr/share/cmake/", "data", "/usr/share/cmake/*"),
+        (r"^/usr/share/cmake-3.1/", "data", "/usr/share/cmake-3.1/*"),
+        (r"^/usr/share/cmake-3.7/", "data", "/usr/share/cmake-3.7/*"),
+        (r"^/usr/share/cmake-3.8/", "data", "/usr/share/cmake-3.8/*"),
+        (r"^/usr/share/cmake-3.6/", "data", "/usr/share/cmake-3.6/*"),
+        (r"^/usr/share/girepository-1\.0/.*\.typelib\$", "data", "/usr/share/girepository-1.0/*.typelib"),
+        (r"^/usr/include/", "dev"),
+        (r"^/usr/lib64/girepository-1.0/", "data"),
+        (r"^/usr/share/cmake/", "dev"),
+        (r"^/usr/lib/cmake/", "dev"),
+        (r"^/usr/lib64/cmake/", "dev"),
+        (r"^/usr/lib32/cmake/", "dev32"),
+        (r"^/usr/lib/qt5/mkspecs/", "dev"),
+        (r"^/usr/lib/qt6/mkspecs/", "dev"),
+        (r"^/usr/lib64/qt5/mkspecs/", "dev"),
+        (r"^/usr/lib32/qt5/mkspecs/", "dev32"),
+        (r"^/usr/lib64/qt6/mkspecs/", "dev"),
+        (r"^/usr/lib32/qt6/mkspecs/", "dev32"),
+        (r"^/usr/lib/qt5/", "lib"),
+        (r"^/usr/lib/qt6/", "lib"),
+        (r"^/usr/lib64/qt5/", "lib"),
+        (r"^/usr/lib32/qt5/", "lib32"),
+        (r"^/usr/lib64/qt6/", "lib"),
+        (r"^/usr/lib32/qt6/", "lib32"),
+        (r"^/usr/lib/[a-zA-Z0-9._+-]*\.so$", so_dest),
+        (r"^/usr/lib64/libkdeinit5_[a-zA-Z0-9._+-]*\.so$", "lib"),
+        (r"^/usr/lib32/libkdeinit5_[a-zA-Z0-9._+-]*\.so$", "lib32"),
+        (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.so$", so_dest),
+        (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.so$", so_dest + '32'),
+        (r"^/usr/lib64/glibc-hwcaps/x86-64-v[0-9]+/[a-zA-Z0-9._+-]*\.so$", so_dest),
+        (r"^/usr/lib64/haswell/avx512_1/[a-zA-Z0-9._+-]*\.so$", so_dest),
+        (r"^/usr/lib64/haswell/[a-zA-Z0-9._+-]*\.so$", so_dest),
+        (r"^/usr/lib64/haswell/avx512_1/[a-zA-Z0-9._+-]*\.so$", so_dest),
+        (r"^/usr/lib/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
+        (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
+        (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.a$", "staticdev32"),
+        (r"^/usr/lib/haswell/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
+        (r"^/usr/lib64/glibc-hwcaps/x86-64-v[0-9]+/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
+        (r"^/usr/lib64/haswell/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
+        (r"^/usr/lib64/haswell/avx512_1/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
+        (r"^/usr/lib32/haswell/[a-zA-Z0-9._+-]*\.a$", "staticdev32"),
+        (r"^/usr/lib/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
+        (r"^/usr/lib64/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
+        (r"^/usr/lib32/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev32"),
+        (r"^/usr/lib64/glibc-hwcaps/x86-64-v[0-9]+/[a-zA-Z0-9._+-]*\.pc$", "dev"),
+        (r"^/usr/lib64/haswell/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
+        (r"^/usr/lib64/haswell/avx512_1/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
+        (r"^/usr/lib/[a-zA-Z0-9._+-]*\.la$", "dev"),
+        (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.la$", "dev"),
+        (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.la$", "dev32"),
+        (r"^/usr/lib/[a-zA-Z0-9._+-]*\.prl$", "dev"),
+        (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.prl$", "dev"),
+        (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.prl$", "dev32"),
+        (r"^/usr/share/aclocal/[a-zA-Z0-9._+-]*\.ac$", "dev", "/usr/share/aclocal/*.ac"),
+        (r"^/usr/share/aclocal/[a-zA-Z0-9._+-]*\.m4$", "dev", "/usr/share/aclocal/*.m4"),
+        (r"^/usr/share/aclocal-1.[0-9]+/[a-zA-Z0-9._+-]*\.ac$", "dev", "/usr/share/aclocal-1.*/*.ac"),
+        (r"^/usr/share/aclocal-1.[0-9]+/[a-zA-Z0-9._+-]*\.m4$", "dev", "/usr/share/aclocal-1.*/*.m4"),
+        (r"^/usr/share/doc/" + re.escape(pkg_name) + "/", "doc", "/usr/share/doc/" + re.escape(pkg_name) + "/*"),
+        (r"^/usr/share/doc/", "doc"),
+        (r"^/usr/share/gtk-doc/html", "doc"),
+        (r"^/usr/share/help", "doc"),
+        (r"^/usr/share/info/", "doc", "/usr/share/info/*"),
+        # now a set of catch-all rules
+        (r"^/lib/systemd/system/", "services"),
+        (r"^/lib/systemd/user/", "services"),
+        (r"^/usr/lib/systemd/system/", "services"),
+        (r"^/usr/lib/systemd/user/", "services"),
+        (r"^/usr/lib/udev/hwdb.d", "config"),
+        (r"^/usr/lib/udev/rules.d", "config"),
+        (r"^/usr/lib/modules-load.d", "config"),
+        (r"^/usr/lib/tmpfiles.d", "config"),
+        (r"^/usr/lib/sysusers.d", "config"),
+        (r"^/usr/lib/sysctl.d", "config"),
+        (r"^/usr/share/", "data"),
+        (r"^/usr/lib/perl5/", "perl", "/usr/lib/perl5/*"),
+        # finally move any dynamically loadable plugins (not
+        # perl/python/etc.. extensions) into lib package
+        (r"^/usr/lib/.*/[a-zA-Z0-9._+-]*\.so", "lib"),
+        (r"^/usr/lib64/.*/[a-zA-Z0-9._+-]*\.so", "lib"),
+        (r"^/usr/lib32/.*/[a-zA-Z0-9._+-]*\.so", "lib32"),
+        # locale data gets picked up via file_is_locale
+        (r"^/usr/share/locale/", "ignore")]
+
+
+def _pattern_key(pattern):
+    """Return the leading path components every match of pattern starts with.
+
+    At most two components are returned, and only those fully spelled out
+    before the first regular expression special character.
+    """
+    literal = re.match(r"\^?([^.^$*+?{}\[\]\\|()]*)", pattern).group(1)
+    if not literal.startswith('/'):
+        return ()
+    return tuple(literal[1:].split('/')[:-1][:2])
+
+
+def _path_keys(filename):
+    """Return the keys of the patterns that may match filename."""
+    parts = filename[1:].split('/', 2)[:-1]
+    return [(), tuple(parts[:1]), tuple(parts[:2])]
+
+
+class FileClassifier(object):
+    """File patterns compiled and indexed by leading path components.
+
+    Only patterns that start with the same path components as a file are
+    tried, in their original order, so the first match is the same as when
+    trying every pattern in turn.
+    """
+
+    def __init__(self, patterns):
+        """Compile patterns, a list of file_patterns tuples."""
+        self.index = {}
+        self.candidates = {}
+        for idx, (pattern, *args) in enumerate(patterns):
+            pattern = pattern if not pattern.startswith('^') else pattern[1:]
+            entry = (idx, re.compile(pattern), *args)
+            self.index.setdefault(_pattern_key(pattern), []).append(entry)
+
+    def match(self, norm_filename):
+        """Return (package, replacement) of the first pattern matching norm_filename, or None.
+
+        norm_filename must not have a /V3, /V4 or /VA prefix.
+        """
+        keys = tuple(_path_keys(norm_filename))
+        entries = self.candidates.get(keys)
+        if entries is None:
+            entries = []
+            for key in set(keys):
+                entries += self.index.get(key, [])
+            entries.sort(key=lambda entry: entry[0])
+            self.candidates[keys] = entries
+        for _, pat, package, *replacement in entries:
+            if pat.match(norm_filename):
+                return package, replacement[0] if replacement else ""
+        return None
+
+
+compat_patterns = [re.compile(r"^(/V3|/V4|/VA)?" + pat) for pat in [
+    r"/usr/lib/[a-zA-Z0-9\.\_\-\+]*\.so\.",
+    r"/usr/lib64/[a-zA-Z0-9\.\_\-\+]*\.so\.",
+    r"/usr/lib32/[a-zA-Z0-9\.\_\-\+]*\.so\.",
+    r"/usr/lib64/lib(asm|dw|elf)-[0-9.]+\.so",
+    r"/usr/lib32/lib(asm|dw|elf)-[0-9.]+\.so",
+    r"/usr/lib64/haswell/[a-zA-Z0-9\.\_\-\+]*\.so\.",
+    r"/usr/share/package-licenses/"]]
+
+
 class FileManager(object):
     """Class to handle spec file %files section management."""
 
@@ -48,6 +248,7 @@ class FileManager(object):
         # packages, the answer is No.
         self.want_dev_split = True
         self.has_banned = False
+        self.classifiers = {}
 
     @staticmethod
     def banned_path(path):
@@ -90,18 +291,8 @@ class FileManager(object):
         if not self.config.config_opts.get("compat"):
             return False
 
-        patterns = [
-            r"/usr/lib/[a-zA-Z0-9\.\_\-\+]*\.so\.",
-            r"/usr/lib64/[a-zA-Z0-9\.\_\-\+]*\.so\.",
-            r"/usr/lib32/[a-zA-Z0-9\.\_\-\+]*\.so\.",
-            r"/usr/lib64/lib(asm|dw|elf)-[0-9.]+\.so",
-            r"/usr/lib32/lib(asm|dw|elf)-[0-9.]+\.so",
-            r"/usr/lib64/haswell/[a-zA-Z0-9\.\_\-\+]*\.so\.",
-            r"/usr/share/package-licenses/"]
-
         exclude = True
-        for pat in patterns:
-            pat = re.compile(r"^(/V3|/V4|/VA)?" + pat)
+        for pat in compat_patterns:
             if pat.search(filename):
                 exclude = False
                 break
@@ -143,6 +334,42 @@ class FileManager(object):
 
         return False
 
+    def get_classifier(self, pkg_name, so_dest, so_dest_ompi):
+        """Return the FileClassifier for the file patterns, compiling it on first use."""
+        key = (pkg_name, so_dest, so_dest_ompi)
+        if key not in self.classifiers:
+            self.classifiers[key] = FileClassifier(file_patterns(*key))
+        return self.classifiers[key]
+
+    def classify(self, filename, classifier):
+        """Push filename to the package of the first classifier pattern it matches.
+
+        Same as calling file_pat_match with each of the classifier's patterns
+        until one returns True, which is what this returns.
+        """
+        # compat files should always be excluded
+        if self.compat_exclude(filename):
+            self.excludes.append(filename)
+            return True
+
+        match = re.match(r"/(V3|V4|VA)", filename)
+        prefix = match.group() if match else ""
+        norm_filename = filename.removeprefix(prefix)
+        result = classifier.match(norm_filename)
+        if not result:
+            return False
+
+        package, replacement = result
+        if not replacement or self.config.config_opts.get("no_glob"):
+            replacement = filename
+        else:
+            replacement = prefix + replacement
+        if norm_filename in self.excludes:
+            return True
+
+        self.push_package_file(replacement, package)
+        return True
+
     def file_is_locale(self, filename):
         """If a file is a locale, appends to self.locales and returns True, returns False otherwise."""
         pat = re.compile(r"^/usr/share/locale/.*/(.*)\.mo")
@@ -207,10 +434,10 @@ class FileManager(object):
             return
 
         # Explicit file packaging
+        match = re.search(r"^/(V3|V4|VA)", filename)
+        norm_filename = filename if not match else filename.removeprefix(match.group())
         for k, v in self.file_maps.items():
             for match_name in v['files']:
-                match = re.search(r"^/(V3|V4|VA)", filename)
-                norm_filename = filename if not match else filename.removeprefix(match.group())
                 if isinstance(match_name, str):
                     if norm_filename == match_name:
                         self.push_package_file(filename, k)
@@ -260,142 +487,9 @@ class FileManager(object):
         # architecture like elfutils and mesa.
         so_dest = 'lib' if self.config.config_opts.get('so_to_lib') else 'dev'
         so_dest_ompi = 'openmpi' if self.config.config_opts.get('so_to_lib') else 'dev'
-
-        patterns = [
-            # Patterns for matching files, format is a tuple as follows:
-            # (<raw pattern>, <package>, <optional replacement>, <optional prefix>)
-            # order matters, first match wins!
-            (r"^/usr/share/package-licenses/.{1,}/.{1,}", "license"),
-            (r"^/usr/share/man/man2", "dev"),
-            (r"^/usr/share/man/man3", "dev"),
-            (r"^/usr/share/man/", "man"),
-            (r"^/usr/share/pkgconfig/32.*\.pc$", "dev32"),
-            (r"^/usr/share/pkgconfig/", "dev"),
-            (r"^/usr/share/info/", "info"),
-            (r"^/usr/share/abi/", "abi"),
-            (r"^/usr/share/qt5/examples/", "examples"),
-            (r"^/usr/share/qt6/examples/", "examples"),
-            (r"^/usr/share/omf", "main", "/usr/share/omf/*"),
-            (r"^/usr/share/installed-tests/", "tests"),
-            (r"^/usr/libexec/installed-tests/", "tests"),
-            (r"^/usr/lib/rustlib/x86_64-unknown-linux-gnu/lib/[a-zA-Z0-9._+-]+\.rlib", "lib", "/usr/lib/rustlib/x86_64-unknown-linux-gnu/lib/*.rlib"),
-            (r"^/usr/lib/rustlib/x86_64-unknown-linux-gnu/analysis/[a-zA-Z0-9._+-]+\.json", "lib", "/usr/lib/rustlib/x86_64-unknown-linux-gnu/analysis/*.json"),
-            (r"^/usr/share/clear/optimized-elf/bin", "bin", "/usr/share/clear/optimized-elf/bin*"),
-            (r"^/usr/share/clear/optimized-elf/exec", "libexec", "/usr/share/clear/optimized-elf/exec*"),
-            (r"^/usr/share/clear/optimized-elf/lib", "lib", "/usr/share/clear/optimized-elf/lib*"),
-            (r"^/usr/share/clear/optimized-elf/other", "lib", "/usr/share/clear/optimized-elf/other*"),
-            (r"^/usr/share/clear/optimized-elf/test", "tests", "/usr/share/clear/optimized-elf/test*"),
-            (r"^/usr/share/clear/optimized-elf/", "lib"),
-            (r"^/usr/share/clear/filemap/", "filemap"),
-            (r"^/usr/lib64/openmpi/bin/", "openmpi"),
-            (r"^/usr/lib64/openmpi/share", "openmpi"),
-            (r"^/usr/lib64/openmpi/include/", "dev"),
-            (r"^/usr/lib64/openmpi/lib/[a-zA-Z0-9._+-]*\.so$", so_dest_ompi),
-            (r"^/usr/lib64/openmpi/lib/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
-            (r"^/usr/lib64/openmpi/lib/[a-zA-Z0-9._+-]*\.so\.", "openmpi"),
-            (r"^/usr/lib64/openmpi/lib/python3.*/", "openmpi"),
-            (r"^/usr/lib64/openmpi/lib/", "dev"),
-            (r"^/usr/lib/[a-zA-Z0-9._+-]*\.so\.", "plugins"),
-            (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.so\.", "lib"),
-            (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.so\.", "lib32"),
-            (r"^/usr/lib64/lib(asm|dw|elf)-[0-9.]+\.so", "lib"),
-            (r"^/usr/lib64/libkdeinit5", "lib"),
-            (r"^/usr/lib32/lib(asm|dw|elf)-[0-9.]+\.so", "lib32"),
-            (r"^/usr/lib64/haswell/[a-zA-Z0-9._+-]*\.so\.", "lib"),
-            (r"^/usr/lib64/gobject-introspection/", "lib"),
-            (r"^/usr/libexec/", "libexec"),
-            (r"^/usr/bin/", "bin"),
-            (r"^/usr/sbin/", "bin"),
-            (r"^/sbin/", "bin"),
-            (r"^/bin/", "bin"),
-            (r"^/usr/lib/python3.*/", "python3", "/usr/lib/python3*/*"),
-            (r"^/usr/share/gir-[0-9\.]+/[a-zA-Z0-9._+-]*\.gir", "data", "/usr/share/gir-1.0/*.gir"),
-            (r"^/usr/share/cmake/", "data", "/usr/share/cmake/*"),
-            (r"^/usr/share/cmake-3.1/", "data", "/usr/share/cmake-3.1/*"),
-            (r"^/usr/share/cmake-3.7/", "data", "/usr/share/cmake-3.7/*"),
-            (r"^/usr/share/cmake-3.8/", "data", "/usr/share/cmake-3.8/*"),
-            (r"^/usr/share/cmake-3.6/", "data", "/usr/share/cmake-3.6/*"),
-            (r"^/usr/share/girepository-1\.0/.*\.typelib\$", "data", "/usr/share/girepository-1.0/*.typelib"),
-            (r"^/usr/include/", "dev"),
-            (r"^/usr/lib64/girepository-1.0/", "data"),
-            (r"^/usr/share/cmake/", "dev"),
-            (r"^/usr/lib/cmake/", "dev"),
-            (r"^/usr/lib64/cmake/", "dev"),
-            (r"^/usr/lib32/cmake/", "dev32"),
-            (r"^/usr/lib/qt5/mkspecs/", "dev"),
-            (r"^/usr/lib/qt6/mkspecs/", "dev"),
-            (r"^/usr/lib64/qt5/mkspecs/", "dev"),
-            (r"^/usr/lib32/qt5/mkspecs/", "dev32"),
-            (r"^/usr/lib64/qt6/mkspecs/", "dev"),
-            (r"^/usr/lib32/qt6/mkspecs/", "dev32"),
-            (r"^/usr/lib/qt5/", "lib"),
-            (r"^/usr/lib/qt6/", "lib"),
-            (r"^/usr/lib64/qt5/", "lib"),
-            (r"^/usr/lib32/qt5/", "lib32"),
-            (r"^/usr/lib64/qt6/", "lib"),
-            (r"^/usr/lib32/qt6/", "lib32"),
-            (r"^/usr/lib/[a-zA-Z0-9._+-]*\.so$", so_dest),
-            (r"^/usr/lib64/libkdeinit5_[a-zA-Z0-9._+-]*\.so$", "lib"),
-            (r"^/usr/lib32/libkdeinit5_[a-zA-Z0-9._+-]*\.so$", "lib32"),
-            (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.so$", so_dest),
-            (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.so$", so_dest + '32'),
-            (r"^/usr/lib64/glibc-hwcaps/x86-64-v[0-9]+/[a-zA-Z0-9._+-]*\.so$", so_dest),
-            (r"^/usr/lib64/haswell/avx512_1/[a-zA-Z0-9._+-]*\.so$", so_dest),
-            (r"^/usr/lib64/haswell/[a-zA-Z0-9._+-]*\.so$", so_dest),
-            (r"^/usr/lib64/haswell/avx512_1/[a-zA-Z0-9._+-]*\.so$", so_dest),
-            (r"^/usr/lib/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
-            (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
-            (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.a$", "staticdev32"),
-            (r"^/usr/lib/haswell/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
-            (r"^/usr/lib64/glibc-hwcaps/x86-64-v[0-9]+/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
-            (r"^/usr/lib64/haswell/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
-            (r"^/usr/lib64/haswell/avx512_1/[a-zA-Z0-9._+-]*\.a$", "staticdev"),
-            (r"^/usr/lib32/haswell/[a-zA-Z0-9._+-]*\.a$", "staticdev32"),
-            (r"^/usr/lib/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
-            (r"^/usr/lib64/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
-            (r"^/usr/lib32/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev32"),
-            (r"^/usr/lib64/glibc-hwcaps/x86-64-v[0-9]+/[a-zA-Z0-9._+-]*\.pc$", "dev"),
-            (r"^/usr/lib64/haswell/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
-            (r"^/usr/lib64/haswell/avx512_1/pkgconfig/[a-zA-Z0-9._+-]*\.pc$", "dev"),
-            (r"^/usr/lib/[a-zA-Z0-9._+-]*\.la$", "dev"),
-            (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.la$", "dev"),
-            (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.la$", "dev32"),
-            (r"^/usr/lib/[a-zA-Z0-9._+-]*\.prl$", "dev"),
-            (r"^/usr/lib64/[a-zA-Z0-9._+-]*\.prl$", "dev"),
-            (r"^/usr/lib32/[a-zA-Z0-9._+-]*\.prl$", "dev32"),
-            (r"^/usr/share/aclocal/[a-zA-Z0-9._+-]*\.ac$", "dev", "/usr/share/aclocal/*.ac"),
-            (r"^/usr/share/aclocal/[a-zA-Z0-9._+-]*\.m4$", "dev", "/usr/share/aclocal/*.m4"),
-            (r"^/usr/share/aclocal-1.[0-9]+/[a-zA-Z0-9._+-]*\.ac$", "dev", "/usr/share/aclocal-1.*/*.ac"),
-            (r"^/usr/share/aclocal-1.[0-9]+/[a-zA-Z0-9._+-]*\.m4$", "dev", "/usr/share/aclocal-1.*/*.m4"),
-            (r"^/usr/share/doc/" + re.escape(pkg_name) + "/", "doc", "/usr/share/doc/" + re.escape(pkg_name) + "/*"),
-            (r"^/usr/share/doc/", "doc"),
-            (r"^/usr/share/gtk-doc/html", "doc"),
-            (r"^/usr/share/help", "doc"),
-            (r"^/usr/share/info/", "doc", "/usr/share/info/*"),
-            # now a set of catch-all rules
-            (r"^/lib/systemd/system/", "services"),
-            (r"^/lib/systemd/user/", "services"),
-            (r"^/usr/lib/systemd/system/", "services"),
-            (r"^/usr/lib/systemd/user/", "services"),
-            (r"^/usr/lib/udev/hwdb.d", "config"),
-            (r"^/usr/lib/udev/rules.d", "config"),
-            (r"^/usr/lib/modules-load.d", "config"),
-            (r"^/usr/lib/tmpfiles.d", "config"),
-            (r"^/usr/lib/sysusers.d", "config"),
-            (r"^/usr/lib/sysctl.d", "config"),
-            (r"^/usr/share/", "data"),
-            (r"^/usr/lib/perl5/", "perl", "/usr/lib/perl5/*"),
-            # finally move any dynamically loadable plugins (not
-            # perl/python/etc.. extensions) into lib package
-            (r"^/usr/lib/.*/[a-zA-Z0-9._+-]*\.so", "lib"),
-            (r"^/usr/lib64/.*/[a-zA-Z0-9._+-]*\.so", "lib"),
-            (r"^/usr/lib32/.*/[a-zA-Z0-9._+-]*\.so", "lib32"),
-            # locale data gets picked up via file_is_locale
-            (r"^/usr/share/locale/", "ignore")]
-
-        for pat_args in patterns:
-            if self.file_pat_match(filename, *pat_args):
-                return
+        classifier = self.get_classifier(pkg_name, so_dest, so_dest_ompi)
+        if self.classify(filename, classifier):
+            return
 
         if filename in self.excludes:
             return
@@ -21,6 +21,7 @@
 
 import glob
 import os
+import shlex
 import subprocess
 import sys
 import tempfile
@@ -49,6 +50,26 @@ def get_autospec_info():
     return tag, commit
 
 
+def glob_in(path, pattern):
+    """Return the sorted names of the files in path matching the shell pattern."""
+    return sorted(os.path.basename(fname) for fname in glob.glob(os.path.join(glob.escape(path), pattern)))
+
+
+def git_rm(path, files):
+    """Remove the tracked files of files from the repository in path.
+
+    git rm fails as a whole when one of the files has local changes, those
+    are left in place while the other files are still removed.
+    """
+    cmd = ["git", "rm", "-q", "--ignore-unmatch", "--"]
+    if call(shlex.join(cmd + files), check=False, stderr=subprocess.DEVNULL, cwd=path) == 0:
+        return
+    tracked = subprocess.run(["git", "ls-files", "-z", "--"] + files, cwd=path, stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, universal_newlines=True).stdout.split("\0")
+    for fname in filter(None, tracked):
+        call(shlex.join(cmd + [fname]), check=False, stderr=subprocess.DEVNULL, cwd=path)
+
+
 def commit_to_git(config, name, success):
     """Update package's git tree for autospec managed changes."""
     path = config.download_path
@@ -62,78 +83,36 @@ def commit_to_git(config, name, success):
             upstream_uri = config.git_uri % {'NAME': name}
             call("git remote add origin %s" % upstream_uri, cwd=path)
 
-    for config_file in config.config_files:
-        call("git add %s" % config_file, cwd=path, check=False)
-    for unit in config.sources["unit"]:
-        call("git add %s" % unit, cwd=path)
-    call("git add Makefile", cwd=path)
-    call("git add upstream", cwd=path)
-    call("bash -c 'shopt -s failglob; git add *.spec'", cwd=path)
-    call("git add %s.tmpfiles" % name, check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add %s.sysusers" % name, check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add prep_prepend", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add pypi.json", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add build_prepend", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add make_prepend", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add install_prepend", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add install_append", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add series", check=False, stderr=subprocess.DEVNULL, cwd=path)
+    # files added when they exist
+    optional = list(config.config_files)
+    optional += [f"{name}.tmpfiles", f"{name}.sysusers"]
+    optional += ["prep_prepend", "pypi.json", "build_prepend", "make_prepend", "install_prepend",
+                 "install_append", "series"]
+    removed = []
     # Add/remove version specific patch lists
-    for filename in glob.glob('series.*'):
+    for filename in glob_in(path, 'series.*'):
         base, version = filename.split('.', 1)
         if version in config.versions:
-            call("git add {}".format(filename), check=False, stderr=subprocess.DEVNULL, cwd=path)
+            optional.append(filename)
         else:
-            call("git rm {}".format(filename), check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("bash -c 'shopt -s failglob; git add -f *.asc'", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("bash -c 'shopt -s failglob; git add -f *.sig'", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("bash -c 'shopt -s failglob; git add -f *.sha256'", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("bash -c 'shopt -s failglob; git add -f *.sign'", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("bash -c 'shopt -s failglob; git add -f *.pkey'", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add configure", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add configure32", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add configure64", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add configure_avx2", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add configure_avx512", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add make_check_command", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("bash -c 'shopt -s failglob; git add *.patch'", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("bash -c 'shopt -s failglob; git add *.nopatch'", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    for item in config.transforms.values():
-        call("git add {}".format(item), check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add release", cwd=path)
-    call("git add symbols", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add symbols32", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add used_libs", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add used_libs32", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add testresults", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add profile_payload", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add options.conf", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add configure_misses", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add etc_files", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add whatrequires", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add description", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git add attrs", check=False, stderr=subprocess.DEVNULL, cwd=path)
+            removed.append(filename)
+    optional += ["configure", "configure32", "configure64", "configure_avx2", "configure_avx512",
+                 "make_check_command"]
+    optional += glob_in(path, "*.patch") + glob_in(path, "*.nopatch")
+    optional += config.transforms.values()
+    optional += ["release", "symbols", "symbols32", "used_libs", "used_libs32", "testresults", "testcases",
+                 "profile_payload", "options.conf", "configure_misses", "etc_files", "whatrequires",
+                 "description", "attrs", ".gitignore"]
+    # files added even if they match .gitignore
+    forced = []
+    for pattern in ("*.asc", "*.sig", "*.sha256", "*.sign", "*.pkey"):
+        forced += glob_in(path, pattern)
 
     # remove deprecated config files
-    call("git rm make_install_append", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm prep_append", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm use_clang", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm use_lto", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm use_avx2", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm fast-math", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm broken_c++", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm skip_test_suite", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm optimize_size", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm asneeded", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm broken_parallel_build", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm pgo", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm unit_tests_must_pass", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm funroll-loops", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm keepstatic", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm allow_test_failures", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm no_autostart", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm insecure_build", check=False, stderr=subprocess.DEVNULL, cwd=path)
-    call("git rm conservative_flags", check=False, stderr=subprocess.DEVNULL, cwd=path)
+    removed += ["make_install_append", "prep_append", "use_clang", "use_lto", "use_avx2", "fast-math",
+                "broken_c++", "skip_test_suite", "optimize_size", "asneeded", "broken_parallel_build", "pgo",
+                "unit_tests_must_pass", "funroll-loops", "keepstatic", "allow_test_failures", "no_autostart",
+                "insecure_build", "conservative_flags"]
 
     # add a gitignore
     ignorelist = [
@@ -153,13 +132,25 @@ def commit_to_git(config, name, success):
         "*.pom",
         "*.xml",
         "commitmsg",
+        "symbols.cache",
         "results/",
         "rpms/",
         "for-review.txt",
         ""
     ]
     write_out(os.path.join(path, '.gitignore'), '\n'.join(ignorelist))
-    call("git add .gitignore", check=False, stderr=subprocess.DEVNULL, cwd=path)
+
+    # the files autospec requires must all be added, the spec file is
+    # matched by git like the shell would
+    required = ["Makefile", "upstream"] + config.sources["unit"] + [":(glob)*.spec"]
+    call(shlex.join(["git", "add", "--"] + required), cwd=path)
+    optional = [fname for fname in dict.fromkeys(optional) if os.path.lexists(os.path.join(path, fname))]
+    if optional:
+        # ignored files are skipped, the other files are still added
+        call(shlex.join(["git", "add", "--"] + optional), check=False, stderr=subprocess.DEVNULL, cwd=path)
+    if forced:
+        call(shlex.join(["git", "add", "-f", "--"] + forced), check=False, stderr=subprocess.DEVNULL, cwd=path)
+    git_rm(path, removed)
 
     if success == 0:
         return
@@ -21,14 +21,17 @@
 # exact matches on hashes of the COPYING file
 #
 
+import hashlib
 import os
 import re
 import shlex
 import sys
 import urllib.parse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 import chardet
 import download
+import srctree
 import util
 
 default_license = "TO BE DETERMINED"
@@ -37,6 +40,26 @@ licenses = []
 license_files = []
 hashes = dict()
 
+# distinct license texts are decoded by a process pool from this many on
+PARALLEL_DECODE_MIN = 16
+
+targets = frozenset(["copyright",
+                     "copyright.txt",
+                     "apache-2.0",
+                     "artistic.txt",
+                     "libcurllicense",
+                     "gpl.txt",
+                     "gpl2.txt",
+                     "gplv2.txt",
+                     "notice",
+                     "copyrights",
+                     "about_bsd.txt"])
+# look for files that start with copying or licen[cs]e (but are
+# not likely scripts) or end with licen[cs]e
+target_pat = re.compile(r"^((copying)|(licen[cs]e)|(e[dp]l-v\d+))|(licen[cs]e)(\.(txt|xml))?$")
+# directories holding the license texts of REUSE-compliant trees
+reuse_dir_pat = re.compile(r'^(LICENSES|licenses?|licensing)$')
+
 
 def process_licenses(lics, translations, blacklist):
     """Handle licenses string from the license server.
@@ -91,48 +114,91 @@ def decode_license(license):
     return try_with_charset(license, chardet.detect(license)['encoding'])
 
 
-def license_from_copying_hash(copying, srcdir, config, name):
-    """Add licenses based on the hash of the copying file."""
+def read_license_bytes(copying):
+    """Return the content and sha1sum of the copying file, or None if it isn't a license."""
     try:
         data = util.get_contents(copying)
     except FileNotFoundError:
         # LICENSE file is a bad symlink (qemu-4.2.0!)
-        return
+        return None
 
     if data.startswith(b'#!'):
         # Not a license if this is a script
-        return
+        return None
 
-    data = decode_license(data)
-    if not data:
-        return
+    return data, hashlib.sha1(data).hexdigest()
 
-    hash_sum = util.get_sha1sum(copying)
 
-    if config.license_fetch:
-        values = {'hash': hash_sum, 'text': data, 'package': name}
-        data = urllib.parse.urlencode(values)
-        data = data.encode('utf-8')
-
-        buffer = download.do_curl(config.license_fetch, post=data, is_fatal=True)
-        response = buffer.getvalue()
-        page = response.decode('utf-8').strip()
-        if page:
-            print("License     : ", page, " (server) (", hash_sum, ")")
-            process_licenses(page, config.license_translations, config.license_blacklist)
-
-            if page != "none":
-                # Strip the build source directory off the front
-                lic_path = copying[len(srcdir):]
-                # Strip any leading slashes
-                while lic_path.startswith('/'):
-                    lic_path = lic_path[1:]
-                lic_path = shlex.quote(lic_path)
-                license_files.append(lic_path)
-                hashes[lic_path] = hash_sum
+def read_copying(copying):
+    """Return the decoded text and sha1sum of the copying file, or None if it isn't a license."""
+    return read_copyings([copying])[0]
 
-            return
 
+def read_copyings(copyings, processes=True):
+    """Return the read_copying result of each copying file, in order.
+
+    The files are read and hashed by a thread pool, then each distinct
+    license text is decoded once. Decoding is CPU bound, so it is spread
+    over a process pool when there are many texts to decode, unless
+    processes is False. Callers running in a worker thread pass False, a
+    fork would copy the locks held by the other threads.
+    """
+    if len(copyings) > 1:
+        with ThreadPoolExecutor() as executor:
+            contents = list(executor.map(read_license_bytes, copyings))
+    else:
+        contents = [read_license_bytes(copying) for copying in copyings]
+
+    raw = {}
+    for content in contents:
+        if content:
+            raw.setdefault(content[1], content[0])
+    if processes and len(raw) >= PARALLEL_DECODE_MIN:
+        with ProcessPoolExecutor() as executor:
+            decoded = list(executor.map(decode_license, raw.values(), chunksize=8))
+    else:
+        decoded = [decode_license(data) for data in raw.values()]
+    texts = dict(zip(raw, decoded))
+
+    results = []
+    for content in contents:
+        if content and texts[content[1]]:
+            results.append((texts[content[1]], content[1]))
+        else:
+            results.append(None)
+    return results
+
+
+def license_server_request(data, hash_sum, config, name):
+    """Return the download request asking the license server about a license text."""
+    values = {'hash': hash_sum, 'text': data, 'package': name}
+    post = urllib.parse.urlencode(values).encode('utf-8')
+    return {'url': config.license_fetch, 'post': post, 'is_fatal': True}
+
+
+def license_from_server(page, copying, hash_sum, srcdir, config, origin="server"):
+    """Add licenses from the license server response page, returning True if it had any."""
+    if not page:
+        return False
+
+    print("License     : ", page, " ({}) (".format(origin), hash_sum, ")")
+    process_licenses(page, config.license_translations, config.license_blacklist)
+
+    if page != "none":
+        # Strip the build source directory off the front
+        lic_path = copying[len(srcdir):]
+        # Strip any leading slashes
+        while lic_path.startswith('/'):
+            lic_path = lic_path[1:]
+        lic_path = shlex.quote(lic_path)
+        license_files.append(lic_path)
+        hashes[lic_path] = hash_sum
+
+    return True
+
+
+def license_from_known_hash(copying, hash_sum, config):
+    """Add licenses from the known license hashes."""
     if hash_sum in config.license_hashes:
         add_license(config.license_hashes[hash_sum],
                     config.license_translations,
@@ -145,6 +211,62 @@ def license_from_copying_hash(copying, srcdir, config, name):
         util.print_warning("Visit {0} to enter".format(hash_url))
 
 
+def license_from_copying_hash(copying, srcdir, config, name):
+    """Add licenses based on the hash of the copying file."""
+    license_from_copying_hashes([copying], srcdir, config, name)
+
+
+def fetch_license_pages(copyings, config, name, processes=True):
+    """Read the copying files and get the license server responses for their hashes.
+
+    The license server is asked about all the hashes missing from the
+    license cache at once. Returns the (copying, data, hash_sum) of the
+    readable files, the responses by hash and the set of cached hashes.
+    processes is passed on to read_copyings.
+    """
+    texts = []
+    for copying, text in zip(copyings, read_copyings(copyings, processes)):
+        if text:
+            texts.append((copying, *text))
+
+    # responses of the license server, from the license cache when possible
+    pages = {}
+    cached = set()
+    if config.license_fetch:
+        if config.license_cache:
+            for _, _, hash_sum in texts:
+                page = config.license_cache.get(hash_sum, config.license_fetch)
+                if page is not None:
+                    pages[hash_sum] = page
+                    cached.add(hash_sum)
+        missing = {}
+        for _, data, hash_sum in texts:
+            if hash_sum not in pages:
+                missing.setdefault(hash_sum, data)
+        requests = [license_server_request(data, hash_sum, config, name) for hash_sum, data in missing.items()]
+        buffers = download.fetch_many(requests, session=download.get_session()) if requests else []
+        for hash_sum, buffer in zip(missing, buffers):
+            page = buffer.getvalue().decode('utf-8').strip() if buffer else None
+            pages[hash_sum] = page
+            if config.license_cache and page is not None:
+                config.license_cache.put(hash_sum, config.license_fetch, page)
+    return texts, pages, cached
+
+
+def license_from_copying_hashes(copyings, srcdir, config, name, fetched=None):
+    """Add licenses based on the hashes of the copying files.
+
+    fetched is the fetch_license_pages result for copyings, when it was
+    already run.
+    """
+    texts, pages, cached = fetched or fetch_license_pages(copyings, config, name)
+    for copying, _, hash_sum in texts:
+        origin = "cached" if hash_sum in cached else "server"
+        if license_from_server(pages.get(hash_sum), copying, hash_sum, srcdir, config, origin):
+            continue
+        license_from_known_hash(copying, hash_sum, config)
+
+
 def skip_license(license_path, config):
     """Check if a given license file path should be skipped."""
     skip_name = False
@@ -160,42 +282,48 @@ def skip_license(license_path, config):
     return skip_name
 
 
-def scan_for_licenses(srcdir, config, pkg_name):
-    """Scan the project directory for things we can use to guess a description and summary."""
-    targets = ["copyright",
-               "copyright.txt",
-               "apache-2.0",
-               "artistic.txt",
-               "libcurllicense",
-               "gpl.txt",
-               "gpl2.txt",
-               "gplv2.txt",
-               "notice",
-               "copyrights",
-               "about_bsd.txt"]
-    # look for files that start with copying or licen[cs]e (but are
-    # not likely scripts) or end with licen[cs]e
-    target_pat = re.compile(r"^((copying)|(licen[cs]e)|(e[dp]l-v\d+))|(licen[cs]e)(\.(txt|xml))?$")
-    for dirpath, dirnames, files in os.walk(srcdir):
+def find_copyings(srcdir, config, tree=None):
+    """Return the paths of the license files under srcdir, in walk order."""
+    copyings = []
+    for dirpath, dirnames, files in srctree.walk(srcdir, tree):
+        # Also search for license texts in project trees that are
+        # REUSE-compliant, or are in process of adopting this standard (for
+        # example, KDE ecosystem packages). See https://reuse.software for
+        # details. At a basic level, this layout requires a toplevel
+        # `LICENSES` directory that includes separate files (with .txt
+        # extension) for each license text that covers source code, data,
+        # etc elsewhere in the project tree. A variant layout is currently
+        # seen in the DPDK 20.11.3 tree, where the `LICENSES` directory is
+        # named `license` instead.
+        reuse_dir = reuse_dir_pat.search(os.path.basename(dirpath))
         for name in files:
-            if name.lower() in targets or target_pat.search(name.lower()):
-                license_path = os.path.join(dirpath, name)
-                if not skip_license(license_path, config):
-                    license_from_copying_hash(license_path, srcdir, config, pkg_name)
-            # Also search for license texts in project trees that are
-            # REUSE-compliant, or are in process of adopting this standard (for
-            # example, KDE ecosystem packages). See https://reuse.software for
-            # details. At a basic level, this layout requires a toplevel
-            # `LICENSES` directory that includes separate files (with .txt
-            # extension) for each license text that covers source code, data,
-            # etc elsewhere in the project tree. A variant layout is currently
-            # seen in the DPDK 20.11.3 tree, where the `LICENSES` directory is
-            # named `license` instead.
-            dirbase = os.path.basename(dirpath)
-            if re.search(r'^(LICENSES|licenses?|licensing)$', dirbase) and re.search(r'\.txt$', name):
-                license_path = os.path.join(dirpath, name)
-                if not skip_license(license_path, config):
-                    license_from_copying_hash(license_path, srcdir, config, pkg_name)
+            lname = name.lower()
+            matches = int(lname in targets or bool(target_pat.search(lname)))
+            if reuse_dir and name.endswith('.txt'):
+                matches += 1
+            if not matches:
+                continue
+            license_path = os.path.join(dirpath, name)
+            if not skip_license(license_path, config):
+                copyings += [license_path] * matches
+    return copyings
+
+
+def prefetch_licenses(srcdir, config, pkg_name, tree=None):
+    """Find the license files under srcdir and fetch their license server responses.
+
+    Nothing is added to the licenses yet, the result is passed on to
+    scan_for_licenses. Safe to run in a thread next to the other analyzers,
+    the license texts are decoded without a process pool.
+    """
+    copyings = find_copyings(srcdir, config, tree)
+    return copyings, fetch_license_pages(copyings, config, pkg_name, processes=False)
+
+
+def scan_for_licenses(srcdir, config, pkg_name, tree=None, prefetched=None):
+    """Scan the project directory for things we can use to guess a description and summary."""
+    copyings, fetched = prefetched or (find_copyings(srcdir, config, tree), None)
+    license_from_copying_hashes(copyings, srcdir, config, pkg_name, fetched)
 
     if not licenses:
         util.print_fatal(" Cannot find any license or a valid {}.license file!\n".format(pkg_name))
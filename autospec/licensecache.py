@@ -0,0 +1,79 @@
+#!/bin/true
+#
+# licensecache.py - part of autospec
+# Copyright (C) 2015 Intel Corporation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Cache of license server responses, keyed by the license file sha1sum
+#
+
+import json
+import os
+import tempfile
+import time
+
+from util import print_warning
+
+
+class LicenseCache(object):
+    """Persistent cache of license server responses.
+
+    Each entry is a json file named after the sha1sum of a license text,
+    holding the server that answered and its response. Entries expire after
+    ttl seconds, or negative_ttl seconds when the server did not know the
+    license. The cache directory may be shared by concurrent autospec runs.
+    """
+
+    def __init__(self, path, ttl, negative_ttl):
+        """Set up the cache in path."""
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        os.makedirs(self.path, exist_ok=True)
+
+    def get(self, hash_sum, server):
+        """Return the cached response of server for hash_sum, or None if unknown or expired.
+
+        An empty string is returned for a cached negative response.
+        """
+        entry = os.path.join(self.path, hash_sum + ".json")
+        try:
+            with open(entry) as entryf:
+                meta = json.load(entryf)
+            age = time.time() - meta["time"]
+            if meta["server"] != server:
+                return None
+            page = meta["page"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        if age > (self.ttl if page else self.negative_ttl):
+            return None
+        return page
+
+    def put(self, hash_sum, server, page):
+        """Store the response of server for hash_sum."""
+        meta = {"server": server, "page": page, "time": time.time()}
+        tmp_entry = None
+        try:
+            fd, tmp_entry = tempfile.mkstemp(prefix=".new-", dir=self.path)
+            with os.fdopen(fd, "w") as entryf:
+                json.dump(meta, entryf)
+            # readers see either the old or the new entry, never a partial one
+            os.replace(tmp_entry, os.path.join(self.path, hash_sum + ".json"))
+        except OSError as err:
+            print_warning(f"Unable to add {hash_sum} to the license cache: {err}")
+            if tmp_entry and os.path.exists(tmp_entry):
+                os.unlink(tmp_entry)
@@ -20,61 +20,55 @@ import os
 import re
 import sys
 
-from util import print_fatal, write_out
-
-
-def log_etc(lines):
-    """Return the content of the START/etc ... END/etc section."""
-    etc = []
-    while True:
-        line = next(lines)
-        line = line.strip()
-        if line == 'END/etc':
-            break
-        if line.startswith('+'):
-            continue
-        etc.append(line)
-    return etc
-
+from util import print_fatal, stream_log, write_out
 
-def logcheck(pkg_loc):
-    """Try to discover configuration options that were automatically switched off."""
-    log = os.path.join(pkg_loc, 'results', 'build.log')
-    if not os.path.exists(log):
-        print('build log is missing, unable to perform logcheck.')
-        return
 
-    whitelist = []
+def read_list(filename):
+    """Read a configure miss list shipped with autospec."""
+    entries = []
     file_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(file_dir, 'configure_whitelist')
-    with open(file_path, "r") as whitelistf:
-        for line in whitelistf:
+    with open(os.path.join(file_dir, filename), "r") as listf:
+        for line in listf:
             if line.startswith("#"):
                 continue
-            whitelist.append(line.rstrip())
-
-    blacklist = []
-    file_dir = os.path.dirname(os.path.abspath(__file__))
-    file_path = os.path.join(file_dir, 'configure_blacklist')
-    with open(file_path, "r") as blacklistf:
-        for line in blacklistf:
-            if line.startswith("#"):
-                continue
-            blacklist.append(line.rstrip())
-
-    with open(log, 'r') as logf:
-        lines = logf.readlines()
-
-    pat = re.compile(r"^checking (?:for )?(.*?)\.\.\. no")
-    misses = []
-    iter_lines = iter(lines)
-    for line in iter_lines:
+            entries.append(line.rstrip())
+    return entries
+
+
+class LogCheck(object):
+    """Collect configure misses and /etc listings from build log lines.
+
+    Instances are fed one line at a time, either by logcheck itself or while
+    build.Build parses the build log, and only gather results; logcheck
+    reports them.
+    """
+
+    def __init__(self):
+        """Set up an empty result set."""
+        self.pat = re.compile(r"^checking (?:for )?(.*?)\.\.\. no")
+        self.reset()
+
+    def reset(self):
+        """Forget results of earlier logs."""
+        self.misses = []
+        self.etc_files = []
+        self.etc = None
+
+    def parse_line(self, line):
+        """Check a single log line."""
+        if self.etc is not None:
+            line = line.strip()
+            if line == 'END/etc':
+                if self.etc:
+                    self.etc_files = self.etc
+                self.etc = None
+            elif not line.startswith('+'):
+                self.etc.append(line)
+            return
         if line.strip() == "START/etc":
-            etc = log_etc(iter_lines)
-            if etc:
-                write_log(pkg_loc, "etc_files", etc)
+            self.etc = []
         match = None
-        m = pat.search(line)
+        m = self.pat.search(line)
         if m:
             match = m.group(1)
 
@@ -84,7 +78,39 @@ def logcheck(pkg_loc):
         if "warning: format not a string literal" in line:
             match = line
 
-        if not match or match in whitelist:
+        if match:
+            self.misses.append(match)
+
+    def finish(self):
+        """Drop an /etc listing that was never terminated."""
+        self.etc = None
+
+
+def logcheck(pkg_loc, results=None):
+    """Try to discover configuration options that were automatically switched off.
+
+    results is a LogCheck that already parsed the build log, if not given the
+    build log is read again.
+    """
+    if results is None:
+        log = os.path.join(pkg_loc, 'results', 'build.log')
+        if not os.path.exists(log):
+            print('build log is missing, unable to perform logcheck.')
+            return
+        results = LogCheck()
+        for line in stream_log(log):
+            results.parse_line(line)
+        results.finish()
+
+    whitelist = read_list('configure_whitelist')
+    blacklist = read_list('configure_blacklist')
+
+    if results.etc_files:
+        write_log(pkg_loc, "etc_files", results.etc_files)
+
+    misses = []
+    for match in results.misses:
+        if match in whitelist:
             continue
 
         if match in blacklist:
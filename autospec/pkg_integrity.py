@@ -249,15 +249,14 @@ def get_signature_file(package_url, package_path):
         for sign_url in iter:
             sign_urls.append(sign_url)
 
-    sign_file = None
-    dest = None
-    for url in sign_urls:
-        dest = os.path.join(package_path, os.path.basename(url))
-        sign_file = download.do_curl(url, dest)
-        if sign_file is not None:
-            return sign_file
+    # probe all signature URLs at once, keeping the first one found
+    requests = [{'url': url, 'dest': os.path.join(package_path, os.path.basename(url))} for url in sign_urls]
+    sign_files = [sign_file for sign_file in download.fetch_many(requests, session=download.get_session())
+                  if sign_file is not None]
+    for sign_file in sign_files[1:]:
+        os.unlink(sign_file)
 
-    return None
+    return sign_files[0] if sign_files else None
 
 
 def compare_keys(newkey, oldkey):
@@ -280,6 +279,8 @@ class ShaSumVerifier(Verifier):
         Verifier.__init__(self, **kwargs)
         self.package_path = kwargs.get('package_path', None)
         self.shalen = kwargs.get('shalen', 256)
+        # digests of package_path already computed while downloading it
+        self.digests = kwargs.get('digests') or {}
 
     def verify_sum(self, shasum):
         """Verify sha sum."""
@@ -299,7 +300,9 @@ class ShaSumVerifier(Verifier):
             self.print_result(False, err_msg='sha{} algorithm not found'.format(self.shalen))
             return None
 
-        digest = self.calc_sum(self.package_path, sha_algo)
+        digest = self.digests.get('sha{}'.format(self.shalen))
+        if digest is None:
+            digest = self.calc_sum(self.package_path, sha_algo)
         self.print_result(digest == shasum)
         return digest == shasum
 
@@ -341,7 +344,7 @@ class GnomeOrgVerifier(ShaSumVerifier):
     @staticmethod
     def fetch_shasum(shasum_url):
         """Get shasum file from gnome.org."""
-        data = download.do_curl(shasum_url)
+        data = download.do_curl(shasum_url, session=download.get_session())
         if data:
             return data.getvalue().decode('utf-8')
         else:
@@ -400,7 +403,7 @@ class QtIoVerifier(ShaSumVerifier):
     def fetch_shasum(self):
         """Fetch sha256 file associated with the package URL."""
         shasum_url = "{}.sha256".format(self.package_url)
-        data = download.do_curl(shasum_url)
+        data = download.do_curl(shasum_url, session=download.get_session())
         if data:
             return data.getvalue().decode('utf-8')
         else:
@@ -455,7 +458,8 @@ class GPGVerifier(Verifier):
 
     def get_sign(self):
         """Attempt to download gpg signature file."""
-        sign_file = download.do_curl(self.key_url, self.package_sign_path)
+        sign_file = download.do_curl(self.key_url, self.package_sign_path,
+                                     session=download.get_session())
         if sign_file is not None:
             return True
         else:
@@ -720,8 +724,11 @@ def from_disk(url, package_path, package_check, config, interactive=True):
                               })
 
 
-def attempt_verification_per_domain(package_path, url):
-    """Use url domain name to set verification type."""
+def attempt_verification_per_domain(package_path, url, digests=None):
+    """Use url domain name to set verification type.
+
+    digests are the known hex digests of package_path, by hashlib name.
+    """
     netloc = urlparse(url).netloc
     if 'download.gnome.org' in netloc:
         domain = 'gnome.org'
@@ -741,7 +748,8 @@ def attempt_verification_per_domain(package_path, url):
         util.print_info('Verification based on domain {}'.format(domain))
         return apply_verification(verifier, **{
                                   'package_path': package_path,
-                                  'url': url})
+                                  'url': url,
+                                  'digests': digests})
 
 
 def get_integrity_file(package_path):
@@ -753,8 +761,12 @@ def get_integrity_file(package_path):
     return None
 
 
-def check(url, config, interactive=True):
-    """Run verification based on tar file url."""
+def check(url, config, interactive=True, digests=None):
+    """Run verification based on tar file url.
+
+    digests are the hex digests of the tar file computed while downloading
+    it, by hashlib name, so checksums can be verified without reading it back.
+    """
     package_name = filename_from_url(url)
     package_path = os.path.join(config.download_path, package_name)
     package_check = get_integrity_file(package_path)
@@ -774,9 +786,9 @@ def check(url, config, interactive=True):
             verified = from_disk(url, package_path, signature_file, config, interactive=interactive)
             if verified is None:
                 util.print_info('Unable to find a signature')
-                verified = attempt_verification_per_domain(package_path, url)
+                verified = attempt_verification_per_domain(package_path, url, digests)
         else:
-            verified = attempt_verification_per_domain(package_path, url)
+            verified = attempt_verification_per_domain(package_path, url, digests)
 
     if verified is None and config.config_opts['verify_required']:
         quit_verify()
@@ -17,29 +17,22 @@ def pip_env():
     return env
 
 
-def pkg_search(name):
-    """Query the pypi json API for name and return True if found."""
-    query = f"https://pypi.org/pypi/{name}/json/"
-    resp = download.do_curl(query)
-    if resp is not None:
-        return True
-    else:
-        return False
-
-
 def get_pypi_name(name, miss=False):
     """Try and verify the pypi name for a given package name."""
     # normalize the name for matching as pypi is case insensitve for search
     name = name.lower().replace('-', '_')
-    # Common case is the name and the pypi name match
-    if pkg_search(name):
-        return name
-    # Maybe we have a prefix
+    # Common case is the name and the pypi name match, but maybe we have a
+    # prefix
+    candidates = [name]
     for prefix in ["pypi_", "python_"]:
         if name.startswith(prefix):
             name = name[len(prefix):]
-            if pkg_search(name):
-                return name
+            candidates.append(name)
+    # query all candidates at once, in order of preference
+    requests = [{'url': f"https://pypi.org/pypi/{candidate}/json/"} for candidate in candidates]
+    for candidate, resp in zip(candidates, download.fetch_many(requests, session=download.get_session())):
+        if resp is not None:
+            return candidate
     # Some cases where search fails (Sphinx)
     # Just try the name we were given
     if miss:
@@ -0,0 +1,225 @@
+#!/bin/true
+#
+# rpmpayload.py - part of autospec
+# Copyright (C) 2016 Intel Corporation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Streaming reader of the cpio payload of rpm files, walking the payload
+# entries without extracting them to disk.
+
+import bz2
+import gzip
+import lzma
+import stat
+import struct
+import subprocess
+
+import zstandard as zstd
+
+RPM_LEAD_MAGIC = b"\xed\xab\xee\xdb"
+RPM_LEAD_SIZE = 96
+RPM_HEADER_MAGIC = b"\x8e\xad\xe8\x01"
+
+RPMTAG_PAYLOADFORMAT = 1124
+RPMTAG_PAYLOADCOMPRESSOR = 1125
+RPM_STRING_TYPE = 6
+
+CPIO_NEWC_MAGICS = (b"070701", b"070702")
+CPIO_HEADER_SIZE = 110
+CPIO_TRAILER = "TRAILER!!!"
+
+
+class RpmError(Exception):
+    """Raised when an rpm payload cannot be read."""
+
+    pass
+
+
+def read_exact(stream, size):
+    """Read exactly size bytes from stream."""
+    chunks = []
+    while size > 0:
+        chunk = stream.read(min(size, 1024 * 1024))
+        if not chunk:
+            raise RpmError("unexpected end of payload")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def skip(stream, size):
+    """Skip size bytes of stream."""
+    while size > 0:
+        chunk = stream.read(min(size, 1024 * 1024))
+        if not chunk:
+            raise RpmError("unexpected end of payload")
+        size -= len(chunk)
+
+
+def read_header(rpmf):
+    """Read an rpm header structure from rpmf, returning its string tags as a dict."""
+    intro = read_exact(rpmf, 16)
+    if intro[:4] != RPM_HEADER_MAGIC:
+        raise RpmError("bad rpm header magic")
+    nindex, hsize = struct.unpack(">II", intro[8:])
+    index = read_exact(rpmf, 16 * nindex)
+    store = read_exact(rpmf, hsize)
+
+    tags = {}
+    for idx in range(nindex):
+        tag, tag_type, offset, _ = struct.unpack_from(">iiii", index, 16 * idx)
+        if tag_type == RPM_STRING_TYPE:
+            end = store.find(b"\0", offset)
+            tags[tag] = store[offset:end].decode("utf-8", "replace")
+    return tags, 16 + 16 * nindex + hsize
+
+
+def decompressor(rpmf, compressor):
+    """Return a stream decompressing rpmf with the rpm payload compressor named compressor."""
+    if compressor == "gzip":
+        return gzip.GzipFile(fileobj=rpmf, mode="rb")
+    if compressor == "bzip2":
+        return bz2.BZ2File(rpmf)
+    if compressor in ("xz", "lzma"):
+        return lzma.LZMAFile(rpmf)
+    if compressor == "zstd":
+        return zstd.ZstdDecompressor().stream_reader(rpmf)
+    if compressor == "identity":
+        return rpmf
+    raise RpmError(f"unsupported payload compressor {compressor}")
+
+
+class CpioEntry(object):
+    """A cpio archive member, its data is read with read() while the archive is at the member."""
+
+    def __init__(self, stream, name, mode, nlink, inode, size):
+        """Describe the member name of the archive stream."""
+        self.stream = stream
+        self.name = name
+        self.mode = mode
+        self.nlink = nlink
+        self.inode = inode
+        self.size = size
+        self.remaining = size
+
+    def isreg(self):
+        """Return True if the member is a regular file."""
+        return stat.S_ISREG(self.mode)
+
+    def read(self, size=-1):
+        """Read up to size bytes of the member data, all of it by default."""
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = read_exact(self.stream, size)
+        self.remaining -= size
+        return data
+
+
+def cpio_entries(stream):
+    """Yield the CpioEntry of each member of the cpio newc archive stream."""
+    while True:
+        header = read_exact(stream, CPIO_HEADER_SIZE)
+        if header[:6] not in CPIO_NEWC_MAGICS:
+            raise RpmError("unsupported cpio format in payload")
+        try:
+            fields = [int(header[6 + 8 * idx:14 + 8 * idx], 16) for idx in range(13)]
+        except ValueError:
+            raise RpmError("malformed cpio header in payload")
+        ino, mode, _, _, nlink, _, size, devmajor, devminor, _, _, namesize, _ = fields
+        name = read_exact(stream, namesize)[:-1].decode("utf-8", "surrogateescape")
+        skip(stream, -(CPIO_HEADER_SIZE + namesize) % 4)
+        if name == CPIO_TRAILER:
+            return
+
+        entry = CpioEntry(stream, name, mode, nlink, (devmajor, devminor, ino), size)
+        yield entry
+        skip(stream, entry.remaining)
+        skip(stream, -size % 4)
+
+
+class RpmPayload(object):
+    """The cpio payload of an rpm file, iterated as CpioEntry objects.
+
+    Only the compressed payload is read and decompressed on the fly, nothing
+    is written to disk. Use it as a context manager to close the rpm file.
+    """
+
+    def __init__(self, path):
+        """Open path and position it at the start of the payload."""
+        self.path = path
+        self.rpmf = open(path, "rb")
+        try:
+            self.stream = self.open_payload()
+        except (RpmError, OSError, zstd.ZstdError):
+            self.rpmf.close()
+            raise
+
+    def open_payload(self):
+        """Skip the lead and headers of the rpm, returning the decompressed payload stream."""
+        lead = read_exact(self.rpmf, RPM_LEAD_SIZE)
+        if lead[:4] != RPM_LEAD_MAGIC:
+            raise RpmError(f"{self.path} is not an rpm file")
+        # the signature header is padded to a multiple of 8 bytes
+        _, size = read_header(self.rpmf)
+        skip(self.rpmf, -size % 8)
+        tags, _ = read_header(self.rpmf)
+
+        payload_format = tags.get(RPMTAG_PAYLOADFORMAT, "cpio")
+        if payload_format != "cpio":
+            raise RpmError(f"unsupported payload format {payload_format}")
+        return decompressor(self.rpmf, tags.get(RPMTAG_PAYLOADCOMPRESSOR, "gzip"))
+
+    def __enter__(self):
+        """Return self."""
+        return self
+
+    def __exit__(self, *_):
+        """Close the rpm file."""
+        self.close()
+
+    def close(self):
+        """Close the rpm file."""
+        self.rpmf.close()
+
+    def __iter__(self):
+        """Iterate over the payload members."""
+        try:
+            yield from cpio_entries(self.stream)
+        except (OSError, EOFError, lzma.LZMAError, zstd.ZstdError) as err:
+            raise RpmError(f"{self.path}: corrupted payload: {err}")
+
+
+class Rpm2cpioPayload(RpmPayload):
+    """The payload of an rpm file as converted by rpm2cpio, for payloads RpmPayload can't read."""
+
+    def __init__(self, path):
+        """Start rpm2cpio on path."""
+        self.path = path
+        self.proc = subprocess.Popen(["rpm2cpio", path], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        self.stream = self.proc.stdout
+
+    def close(self):
+        """Stop rpm2cpio."""
+        self.proc.stdout.close()
+        self.proc.kill()
+        self.proc.wait()
+
+
+def open_payload(path):
+    """Return the payload of the rpm at path, falling back to rpm2cpio for unsupported rpms."""
+    try:
+        return RpmPayload(path)
+    except RpmError:
+        return Rpm2cpioPayload(path)
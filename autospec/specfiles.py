@@ -41,6 +41,31 @@ APX_CFLAGS = "-march=x86-64-v4 -mapxf"
 APX_LCFLAGS = "-march=x86-64-v4"
 APX_LFLAGS = "-Wl,-z,x86-64-v4"
 
+section_pat = re.compile(r"^%(prep|build|install|check|clean|files|package|description|"
+                         r"pre|post|preun|postun|pretrans|posttrans|trigger\w*|changelog)\b")
+# preamble tags that only end up in the package headers
+header_tag_pat = re.compile(r"^(Requires|Provides|Summary|License|Group)\s*:")
+
+
+def spec_sections(text):
+    """Split the spec text into its sections.
+
+    Returns the lines of each kind of section by name ('%files' holds all
+    the %files sections), the preamble before the first section split into
+    'preamble' and the package header 'tags'.
+    """
+    sections = {}
+    name = "preamble"
+    for line in text.splitlines(keepends=True):
+        match = section_pat.match(line)
+        if match:
+            name = "%" + match.group(1)
+        elif name == "preamble" and header_tag_pat.match(line):
+            sections.setdefault("tags", []).append(line)
+            continue
+        sections.setdefault(name, []).append(line)
+    return {name: "".join(lines) for name, lines in sections.items()}
+
 
 class Specfile(object):
     """Holds data and methods needed to write the spec file."""
@@ -72,6 +97,10 @@ class Specfile(object):
         self.extra_cmake = config.extra_cmake + " " + " ".join(requirements.extra_cmake)
         self.extra_cmake_openmpi = config.extra_cmake_openmpi + " " + " ".join(requirements.extra_cmake_openmpi)
         self.setuid = []
+        # spec_sections of the last spec written, and the names of the
+        # sections that changed from the spec written before it
+        self.sections = None
+        self.changed_sections = None
 
     def write_spec(self):
         """Write spec file."""
@@ -141,11 +170,21 @@ class Specfile(object):
         self.write_lang_files()
 
         self.specfile.close()
+        self.track_sections(spec_path)
 
         # return specfile type built so autospec knows how to
         # handle build results (generate has multiple builds)
         return "generate"
 
+    def track_sections(self, spec_path):
+        """Record which sections of the spec written to spec_path changed since the previous write."""
+        with open_auto(spec_path) as specf:
+            sections = spec_sections(specf.read())
+        if self.sections is not None:
+            self.changed_sections = {name for name in sections.keys() | self.sections.keys()
+                                     if sections.get(name) != self.sections.get(name)}
+        self.sections = sections
+
     def write_comment_header(self):
         """Write comment header to spec file."""
         self._write("#\n")
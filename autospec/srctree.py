@@ -0,0 +1,120 @@
+#!/bin/true
+#
+# srctree.py - part of autospec
+# Copyright (C) 2015 Intel Corporation
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Index of an extracted source tree, shared by the static analyzers
+#
+
+import os
+import stat
+
+
+class SourceTree(object):
+    """Directory listing of a source tree, read with a single scandir walk.
+
+    The analyzers query the index with walk(), a drop-in for os.walk on any
+    directory of the tree, instead of each traversing the tree again. Like
+    os.walk, symlinks to directories are listed in dirnames but not
+    followed. File modes and sizes are read on first use and memoized.
+    """
+
+    def __init__(self, root):
+        """Index the tree under root."""
+        self.root = os.path.normpath(root)
+        self.dirs = {}
+        self.stats = {}
+        pending = [self.root]
+        while pending:
+            path = pending.pop()
+            dirnames = []
+            files = []
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+                        if not is_dir:
+                            files.append(entry.name)
+                            continue
+                        dirnames.append(entry.name)
+                        if not entry.is_symlink():
+                            pending.append(os.path.join(path, entry.name))
+            except OSError:
+                # unreadable directories are skipped, as os.walk does
+                continue
+            self.dirs[path] = (dirnames, files)
+
+    def __contains__(self, path):
+        """Return True if path is an indexed directory."""
+        return os.path.normpath(path) in self.dirs
+
+    def files(self, path):
+        """Return the names of the files in the directory path."""
+        return list(self.dirs[os.path.normpath(path)][1])
+
+    def walk(self, top, topdown=True):
+        """Yield (dirpath, dirnames, files) for top and its subdirectories, as os.walk does.
+
+        With topdown, removing names from dirnames prunes the walk.
+        """
+        if top not in self:
+            yield from os.walk(top, topdown=topdown)
+            return
+        pending = [(top, os.path.normpath(top), False)]
+        while pending:
+            dirpath, key, visited = pending.pop()
+            if key not in self.dirs:
+                continue
+            if visited:
+                yield dirpath, list(self.dirs[key][0]), list(self.dirs[key][1])
+                continue
+            dirnames, files = (list(names) for names in self.dirs[key])
+            if topdown:
+                yield dirpath, dirnames, files
+            else:
+                pending.append((dirpath, key, True))
+            for name in reversed(dirnames):
+                pending.append((os.path.join(dirpath, name), os.path.join(key, name), False))
+
+    def stat(self, path):
+        """Return the os.stat result of path, or None if it cannot be read."""
+        key = os.path.normpath(path)
+        if key not in self.stats:
+            try:
+                self.stats[key] = os.stat(key)
+            except OSError:
+                self.stats[key] = None
+        return self.stats[key]
+
+    def size(self, path):
+        """Return the size of the file path, or 0 if it cannot be read."""
+        info = self.stat(path)
+        return info.st_size if info else 0
+
+    def is_executable(self, path):
+        """Return True if path is a regular file with an execute bit set."""
+        info = self.stat(path)
+        return bool(info and stat.S_ISREG(info.st_mode) and info.st_mode & 0o111)
+
+
+def walk(top, tree=None, topdown=True):
+    """Walk top through the index tree, or the filesystem without one."""
+    if tree is not None:
+        return tree.walk(top, topdown=topdown)
+    return os.walk(top, topdown=topdown)
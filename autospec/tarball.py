@@ -21,20 +21,59 @@ import bz2
 import configparser
 import os
 import re
+import shutil
 import sys
 import tarfile
+import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 
 import download
 import zstandard as zstd
-from util import do_regex, get_sha1sum, print_fatal, write_out
+from util import do_regex, get_digests, print_fatal, write_out
+
+
+def merge_tree(src, dst):
+    """Move the content of src into dst, merging directories present in both.
+
+    Other entries of src replace those of dst, even when one is a directory
+    and the other is not.
+    """
+    os.makedirs(dst, exist_ok=True)
+    for name in os.listdir(src):
+        src_path = os.path.join(src, name)
+        dst_path = os.path.join(dst, name)
+        src_dir = os.path.isdir(src_path) and not os.path.islink(src_path)
+        dst_dir = os.path.isdir(dst_path) and not os.path.islink(dst_path)
+        if src_dir and dst_dir:
+            merge_tree(src_path, dst_path)
+            continue
+        if dst_dir:
+            shutil.rmtree(dst_path)
+        elif src_dir and os.path.lexists(dst_path):
+            os.unlink(dst_path)
+        os.replace(src_path, dst_path)
+
+
+def extract_members(content, extraction_path):
+    """Extract an open tarfile in path, returning the names of all its members."""
+    try:
+        content.extractall(path=extraction_path, filter='data')
+    except tarfile.AbsoluteLinkError:
+        pass
+    # in stream mode this reads the headers left after an aborted extraction
+    return content.getnames()
 
 
 class Source():
     """Holds data and methods for source code or archives management."""
 
-    def __init__(self, url, destination, path, pattern=None):
-        """Set default values for source file."""
+    def __init__(self, url, destination, path, pattern=None, defer_prefix=False):
+        """Set default values for source file.
+
+        With defer_prefix, the prefix of tarballs is only determined when they
+        are extracted, so they are decompressed once instead of twice.
+        """
         self.url = url
         self.destination = destination
         self.path = path
@@ -42,11 +81,19 @@ class Source():
         self.type = None
         self.prefix = None
         self.subdir = None
+        self.prefix_pending = False
+        self.staged = None
+        # the staged tree is the archive as is, without the subdir
+        self.as_is = False
+        self.sha1 = None
 
         # Extra  compressed archives
         if not self.destination.startswith(':'):
             self.set_type()
-            self.set_prefix()
+            if defer_prefix and self.type in ['tar', 'zst']:
+                self.prefix_pending = True
+            else:
+                self.set_prefix()
 
     def set_type(self):
         """Determine compression type."""
@@ -59,45 +106,53 @@ class Source():
         else:
             self.type = 'tar'
 
-    def set_prefix(self):
-        """Determine the prefix and subdir if no prefix."""
+    def set_prefix(self, lines=None):
+        """Determine the prefix and subdir if no prefix.
+
+        lines are the member names of the archive, read from it when None.
+        """
         prefix_method = getattr(self, 'set_{}_prefix'.format(self.type))
-        prefix_method()
+        prefix_method(lines)
         # When there is no prefix, create subdir
         if not self.prefix:
             self.subdir = os.path.splitext(os.path.basename(self.path))[0]
 
-    def set_tar_prefix(self):
+    def check_tarfile(self):
+        """Exit if the source is not a valid tar file."""
+        if not tarfile.is_tarfile(self.path):
+            print_fatal("Not a valid tar file.")
+            sys.exit(1)
+
+    def set_tar_prefix(self, lines=None):
         """Determine prefix folder name of tar file."""
-        if tarfile.is_tarfile(self.path):
+        if lines is None:
+            self.check_tarfile()
             with tarfile.open(self.path, 'r') as content:
                 lines = content.getnames()
-                # When tarball is not empty
-                if len(lines) == 0:
-                    print_fatal("Tar file doesn't appear to have any content")
-                    sys.exit(1)
-                elif len(lines) > 1:
-                    if 'package.xml' in lines and self.pattern in ['phpize']:
-                        lines.remove('package.xml')
-                    self.prefix = os.path.commonpath(lines)
-        else:
-            print_fatal("Not a valid tar file.")
+        # When tarball is not empty
+        if len(lines) == 0:
+            print_fatal("Tar file doesn't appear to have any content")
             sys.exit(1)
+        elif len(lines) > 1:
+            if 'package.xml' in lines and self.pattern in ['phpize']:
+                lines.remove('package.xml')
+            self.prefix = os.path.commonpath(lines)
 
-    def set_zst_prefix(self):
+    def set_zst_prefix(self, lines=None):
         """Determine prefix folder name of tar.zst file."""
-        with tarfile.open(fileobj=zstd.open(self.path, 'rb'), mode='r|') as content:
-            lines = content.getnames()
-            if len(lines) == 0:
-                print_fatal("Zstd compressed tar file doesn't appear to have any content")
-                sys.exit(1)
-            elif len(lines) > 1:
-                self.prefix = os.path.commonpath(lines)
-
-    def set_bz2_prefix(self):
+        if lines is None:
+            with tarfile.open(fileobj=zstd.open(self.path, 'rb'), mode='r|') as content:
+                lines = content.getnames()
+        if len(lines) == 0:
+            print_fatal("Zstd compressed tar file doesn't appear to have any content")
+            sys.exit(1)
+        elif len(lines) > 1:
+            self.prefix = os.path.commonpath(lines)
+
+    def set_bz2_prefix(self, lines=None):
         """No prefix for plain bz2 archives."""
 
-    def set_zip_prefix(self):
+    def set_zip_prefix(self, lines=None):
         """Determine prefix folder name of zip file."""
         if zipfile.is_zipfile(self.path):
             with zipfile.ZipFile(self.path, 'r') as content:
@@ -112,23 +167,70 @@ class Source():
             print_fatal("Not a valid zip file.")
             sys.exit(1)
 
-    def extract(self, base_path):
-        """Prepare extraction path and call specific extraction method."""
-        if not self.prefix:
-            extraction_path = os.path.join(base_path, self.subdir)
+    def unpack(self, base_path, cache=None):
+        """Extract the source to a staging directory under base_path.
+
+        A pending prefix is determined from the members seen while extracting.
+        Sources can be unpacked concurrently, extract() then moves the staged
+        files in place. With an ExtractCache, the tree is restored from it
+        when present and added to it otherwise.
+        """
+        staging = tempfile.mkdtemp(prefix='.unpack-', dir=base_path)
+        use_cache = cache and self.sha1
+        if use_cache and cache.restore(self, staging):
+            self.prefix_pending = False
+        elif self.prefix_pending:
+            if self.type == 'tar':
+                self.check_tarfile()
+            lines = getattr(self, 'extract_{}'.format(self.type))(staging)
+            self.prefix_pending = False
+            self.as_is = True
+            self.set_prefix(lines)
+            if use_cache:
+                cache.store(self, staging)
+        else:
+            self.unpack_to_prefix(staging)
+            if use_cache:
+                cache.store(self, staging)
+
+        # trees unpacked as is are moved to subdir when there is no prefix,
+        # unpack_to_prefix already extracted them there
+        if self.as_is and not self.prefix:
+            self.staged = (staging, os.path.join(base_path, self.subdir))
         else:
-            extraction_path = base_path
+            self.staged = (staging, base_path)
 
+    def unpack_to_prefix(self, staging):
+        """Extract the source in staging, under subdir when there is no prefix."""
+        if not self.prefix:
+            extraction_path = os.path.join(staging, self.subdir)
+        else:
+            extraction_path = staging
         extract_method = getattr(self, 'extract_{}'.format(self.type))
         try:
             extract_method(extraction_path)
         except tarfile.AbsoluteLinkError:
             pass
 
+    def extract(self, base_path):
+        """Extract the source in base_path, unpacking it first if needed."""
+        if not self.staged:
+            self.unpack(base_path)
+        staging, extraction_path = self.staged
+        merge_tree(staging, extraction_path)
+        shutil.rmtree(staging)
+        self.staged = None
+
     def extract_tar(self, extraction_path):
-        """Extract tar in path."""
-        with tarfile.open(self.path) as content:
-            content.extractall(path=extraction_path, filter='data')
+        """Extract tar in path, returning the names of its members."""
+        try:
+            # stream mode decompresses the tarball only once
+            with tarfile.open(self.path, 'r|*') as content:
+                return extract_members(content, extraction_path)
+        except tarfile.StreamError:
+            # hard links to members that were not extracted need random access
+            with tarfile.open(self.path) as content:
+                return extract_members(content, extraction_path)
 
     def extract_bz2(self, extraction_path):
         """Extract plain bz2 file in path."""
@@ -145,9 +247,9 @@ class Source():
             content.extractall(path=extraction_path)
 
     def extract_zst(self, extraction_path):
-        """Extract zst in path."""
+        """Extract zst in path, returning the names of its members."""
         with tarfile.open(fileobj=zstd.open(self.path, 'rb'), mode='r|') as content:
-            content.extractall(path=extraction_path, filter='data')
+            return extract_members(content, extraction_path)
 
 
 def convert_version(ver_str, name):
@@ -203,6 +305,7 @@ class Content():
         self.repo = ""
         self.domain = ""
         self.prefixes = dict()
+        self.digests = dict()
         self.config = config
         self.base_path = base_path
 
@@ -212,27 +315,43 @@ class Content():
                   os.path.join(sha, tarfile) + "\n", mode=mode)
 
     def extract_sources(self, main_src, archives_src):
-        """Extract sources."""
-        full_list_src = [main_src] + archives_src
-        for src in full_list_src:
-            if src.destination != ':':
-                src.extract(self.base_path)
-
-    def check_or_get_file(self, upstream_url, tarfile, mode="w"):
-        """Download tarball from url unless it is present locally."""
-        tarball_path = self.config.download_path + "/" + tarfile
-        if not os.path.isfile(tarball_path):
-            download.do_curl(upstream_url, dest=tarball_path, is_fatal=True)
-            self.write_upstream(get_sha1sum(tarball_path), tarfile, mode)
-        else:
-            self.write_upstream(get_sha1sum(tarball_path), tarfile, mode)
-        return tarball_path
+        """Extract sources.
 
-    def process_main_source(self, url):
-        """Download and get important information from main source code."""
-        src_path = self.check_or_get_file(url, os.path.basename(url))
-        main_src = Source(url, '', src_path, self.config.default_pattern)
-        return main_src
+        Sources are unpacked concurrently, then moved in place in order so
+        later archives overwrite the same files as when extracted one by one.
+        """
+        full_list_src = [src for src in [main_src] + archives_src if src.destination != ':']
+        for src in full_list_src:
+            src.sha1 = self.digests[src.url]["sha1"] if src.url in self.digests else None
+        cache = self.config.extract_cache
+        with ThreadPoolExecutor() as executor:
+            # list() to re-raise any unpacking error
+            list(executor.map(lambda src: src.unpack(self.base_path, cache), full_list_src))
+        for src in full_list_src:
+            src.extract(self.base_path)
+
+    def get_files(self, urls):
+        """Download the tarballs from urls unless present locally, returning their paths.
+
+        The missing tarballs are downloaded concurrently and hashed while
+        downloading. The upstream file lists them in the same order as urls.
+        """
+        paths = [os.path.join(self.config.download_path, os.path.basename(url)) for url in urls]
+        missing = {}
+        for url, tarball_path in zip(urls, paths):
+            if not os.path.isfile(tarball_path):
+                missing.setdefault(tarball_path, url)
+        results = download.fetch_many([dict(url=url, dest=tarball_path, is_fatal=True,
+                                            digests=("sha1", "sha256"), resume=True)
+                                       for tarball_path, url in missing.items()],
+                                      session=download.get_session())
+        fetched = dict(zip(missing, results))
+
+        for idx, (url, tarball_path) in enumerate(zip(urls, paths)):
+            digests = fetched.get(tarball_path) or get_digests(tarball_path, ("sha1", "sha256"))
+            self.write_upstream(digests["sha1"], os.path.basename(url), mode="w" if idx == 0 else "a")
+            self.digests[url] = digests
+        return paths
 
     def print_header(self):
         """Print header for autospec run."""
@@ -408,19 +527,14 @@ class Content():
         if os.path.isfile(gcov_path):
             self.gcov_file = self.name + ".gcov"
 
-    def process_archives(self):
-        """Process extra sources needed by package."""
+    def process_archives(self, src_paths):
+        """Process extra sources needed by package, downloaded to src_paths."""
         src_objects = []
 
         full_archives = self.archives
-        # Download and extract full list
-        for arch_url, destination in zip(full_archives[::2], full_archives[1::2]):
-            src_path = self.check_or_get_file(arch_url, os.path.basename(arch_url), mode="a")
-            # Create source object and extract archive
-            archive = Source(arch_url, destination, src_path, self.config.default_pattern)
-            # Add archive prefix to list
-            self.config.archive_details[arch_url + "prefix"] = archive.prefix
-            self.prefixes[arch_url] = archive.prefix
+        for arch_url, destination, src_path in zip(full_archives[::2], full_archives[1::2], src_paths):
+            # Create source object, its prefix is set once extracted
+            archive = Source(arch_url, destination, src_path, self.config.default_pattern, defer_prefix=True)
             # Add archive to list
             src_objects.append(archive)
 
@@ -436,16 +550,19 @@ class Content():
         # name is created by adding ".gcov" to the package name (if a gcov file
         # exists)
         self.set_gcov()
-        # Download and process main source
-        main_src = self.process_main_source(self.url)
-        # Store the detected prefix associated with this file
+        # Download main source and extra sources: archives
+        main_path, *archive_paths = self.get_files([self.url] + self.archives[::2])
+        main_src = Source(self.url, '', main_path, self.config.default_pattern, defer_prefix=True)
+        archives_src = self.process_archives(archive_paths)
+        # Extract all sources, which also detects their prefixes
+        self.extract_sources(main_src, archives_src)
+        # Store the detected prefix associated with each file
+        for archive in archives_src:
+            self.config.archive_details[archive.url + "prefix"] = archive.prefix
+            self.prefixes[archive.url] = archive.prefix
         self.prefixes[self.url] = main_src.prefix
         self.tarball_prefix = main_src.prefix
         # set global path with tarball_prefix
         self.path = os.path.join(self.base_path, self.tarball_prefix)
         # Now that the metadata has been collected print the header
         self.print_header()
-        # Download and process extra sources: archives
-        archives_src = self.process_archives()
-        # Extract all sources
-        self.extract_sources(main_src, archives_src)
@@ -17,15 +17,21 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import gzip
 import hashlib
+import io
+import lzma
 import os
 import re
 import shlex
 import subprocess
 import sys
 
+import zstandard as zstd
+
 dictionary_filename = os.path.dirname(__file__) + "/translate.dic"
-dictionary = [line.strip() for line in open(dictionary_filename, 'r')]
+# alternate package names from translate.dic, read on first use
+dictionary = None
 os_paths = None
 ERROR_FILE = 'pumpAutospec'
 ERROR_ENV = 'AUTOSPEC_UPDATE'
@@ -43,89 +49,127 @@ def _commit_result():
     call("git push", check=False, stderr=subprocess.DEVNULL)
 
 
-def _process_line(line, prev_line, current_patch, reported_patches, error):
+def _process_line(line, prev_line, current_patch, reported_patches, error, log_error):
     if m := re.match('^Patch #[0-9]+ .(?P<patch>.*).:', line):
         current_patch[0] = m.group('patch')
 
     if m := re.match('Hunk #[0-9]+ FAILED at [0-9]+', line):
         if current_patch[0] not in reported_patches:
-            _log_error("Patch " + current_patch[0] + " does not apply")
+            log_error("Patch " + current_patch[0] + " does not apply")
             reported_patches[current_patch[0]] = True
             return True
 
     if m := re.match(".*can't find file to patch at input line ", line):
         if current_patch[0] not in reported_patches:
-            _log_error("Patch " + current_patch[0] + " does not apply")
+            log_error("Patch " + current_patch[0] + " does not apply")
             reported_patches[current_patch[0]] = True
             return True
 
     if m := re.match('.*meson.build:[0-9]+:[0-9]+: ERROR: Unknown options: "(?P<option>.*)"', line):
-        _log_error("Unknown meson option: " + m.group('option'))
+        log_error("Unknown meson option: " + m.group('option'))
         return True
 
     if m := re.match('Error: package ‘(?P<module>.*)’ .* was found, but', line):
-        _log_error("R package " + m.group('module') + " not found")
+        log_error("R package " + m.group('module') + " not found")
         return True
 
     if m := re.match('.*CMake Error at .*/CMake', prev_line):
         if m := re.match('(?P<module>.*) not found', line):
-            _log_error("CMake module " + m.group('module') + "not found")
+            log_error("CMake module " + m.group('module') + "not found")
             return True
 
     if m := re.match(r'go: download.*connect: connection refused', line):
-        _log_error("Go online update")
+        log_error("Go online update")
         return True
 
     if 'Updating crates.io index' in line:
-        _log_error("Rust crates.io online update")
+        log_error("Rust crates.io online update")
         return True
 
     if "error: '__builtin_ctzs' needs isa option -mbmi" in line:
-        _log_error(" error: '__builtin_ctzs' needs isa option -mbmi")
+        log_error(" error: '__builtin_ctzs' needs isa option -mbmi")
         return True
 
     if "error:" in line and 'Bad exit status from' not in line:
         m = re.match('.*error:(?P<error>.*)', line)
         if m and not error:
-            _log_error("Compiler: " + m.group('error'))
+            log_error("Compiler: " + m.group('error'))
             return True
 
     if m := re.match(r'Could NOT find (?P<package>.*) .missing', line):
-        _log_error("CMake module " + m.group('package') + " not found")
+        log_error("CMake module " + m.group('package') + " not found")
         return True
     if m := re.match(r'Could not find a package configuration file provided by (?P<package>.*) with', line):
-        _log_error("CMake module " + m.group('package') + " not found")
+        log_error("CMake module " + m.group('package') + " not found")
         return True
     # Unable to find program 'gperf'
     if m := re.match(r"Failed to find program ‘(?P<module>.*)’", line):
-        _log_error("Failed to find " + m.group('module'))
+        log_error("Failed to find " + m.group('module'))
         return True
     if m := re.match(r"Failed to find ‘(?P<module>.*)’", line):
-        _log_error("Failed to find " + m.group('module'))
+        log_error("Failed to find " + m.group('module'))
         return True
 
     return False
 
 
-def _process_build_log(filename):
-    with open_auto(filename, "r") as lfile:
-        lines = lfile.readlines()
-
-    prev_line = ''
-    current_patch = ['']
-    reported_patches = {}
-    error = False
-    for line in lines:
-        if _process_line(line, prev_line, current_patch, reported_patches, error):
-            error = True
-        prev_line = line
-
-    if error:
+class BuildErrors(object):
+    """Collect the build errors _process_build_log reports, one log line at a time."""
+
+    def __init__(self):
+        """Set up an empty error list."""
+        self.reset()
+
+    def reset(self):
+        """Forget errors of earlier logs."""
+        self.errors = []
+        self.prev_line = ''
+        self.current_patch = ['']
+        self.reported_patches = {}
+
+    def parse_line(self, line):
+        """Check a single log line for errors."""
+        _process_line(line, self.prev_line, self.current_patch, self.reported_patches,
+                      bool(self.errors), self.errors.append)
+        self.prev_line = line
+
+    def finish(self):
+        """Nothing to do, errors are reported by print_build_failed."""
+        pass
+
+
+def _report_errors(errors):
+    for error in errors:
+        _log_error(error)
+    if errors:
         _commit_result()
 
 
-def call(command, logfile=None, check=True, **kwargs):
-    """Subprocess.call convenience wrapper."""
+def _process_build_log(filename):
+    errors = BuildErrors()
+    for line in stream_log(filename):
+        errors.parse_line(line)
+    _report_errors(errors.errors)
+
+
+def _watched_call(watch, **kwargs):
+    """Run a command, terminating it once watch() returns True."""
+    with subprocess.Popen(**kwargs) as proc:
+        while True:
+            try:
+                return proc.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                if watch():
+                    proc.terminate()
+                    return proc.wait()
+
+
+def call(command, logfile=None, check=True, watch=None, **kwargs):
+    """Subprocess.call convenience wrapper.
+
+    If watch is given, it is called about once a second while the command
+    runs and the command is terminated as soon as it returns True.
+    """
     returncode = 1
     full_args = {
         "args": shlex.split(command),
@@ -136,10 +180,12 @@ def call(command, logfile=None, check=True, **kwargs):
     if logfile:
         full_args["stdout"] = open(logfile, "w")
         full_args["stderr"] = subprocess.STDOUT
-        returncode = subprocess.call(**full_args)
-        full_args["stdout"].close()
+    if watch:
+        returncode = _watched_call(watch, **full_args)
     else:
         returncode = subprocess.call(**full_args)
+    if logfile:
+        full_args["stdout"].close()
 
     if check and returncode != 0:
         raise subprocess.CalledProcessError(returncode, full_args["args"], None)
@@ -156,10 +202,15 @@ def _file_write(self, s):
 
 def translate(package):
     """Convert terms to their alternate definition."""
-    for item in dictionary:
-        if item.startswith(package + "="):
-            return item.split("=")[1]
-    return package
+    global dictionary
+    if dictionary is None:
+        dictionary = {}
+        with open(dictionary_filename, 'r') as dictf:
+            for line in dictf:
+                item = line.strip().split("=")
+                if len(item) > 1:
+                    dictionary.setdefault(item[0], item[1])
+    return dictionary.get(package, package)
 
 
 def do_regex(patterns, re_str):
@@ -170,6 +221,95 @@ def do_regex(patterns, re_str):
             return match
 
 
+def _skip_class(pattern, i):
+    """Return the index just past the character class starting at pattern[i]."""
+    i += 1
+    if pattern[i:i + 1] == '^':
+        i += 1
+    if pattern[i:i + 1] == ']':
+        i += 1
+    while i < len(pattern) and pattern[i] != ']':
+        if pattern[i] == '\\':
+            i += 1
+        i += 1
+    return i + 1
+
+
+def _skip_group(pattern, i):
+    """Return the index just past the group starting at pattern[i]."""
+    depth = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '[':
+            i = _skip_class(pattern, i)
+            continue
+        if c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return i
+
+
+def required_literal(pattern):
+    """Return the longest literal string every match of pattern must contain.
+
+    Only the top level of the expression is inspected: groups, character
+    classes, anchors and optional atoms end the current literal run. An empty
+    string (which is contained in every line) is returned when no literal is
+    guaranteed, e.g. for top level alternations or inline flags.
+    """
+    if re.search(r'\(\?[aiLmsux]', pattern):
+        return ''
+    runs = []
+    run = ''
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '|':
+            return ''
+        if c == '\\':
+            nxt = pattern[i + 1:i + 2]
+            atom = nxt if nxt and not nxt.isalnum() else None
+            i += 2
+        elif c == '[':
+            atom = None
+            i = _skip_class(pattern, i)
+        elif c == '(':
+            atom = None
+            i = _skip_group(pattern, i)
+        elif c in '.^$':
+            atom = None
+            i += 1
+        else:
+            atom = c
+            i += 1
+        quant = pattern[i:i + 1]
+        if quant and quant in '*?+{':
+            if quant == '{':
+                i = pattern.find('}', i) + 1 or len(pattern)
+            else:
+                i += 1
+            if pattern[i:i + 1] == '?':
+                i += 1
+            # the atom is required once for '+', otherwise it may be absent
+            if quant == '+' and atom:
+                run += atom
+            atom = None
+        if atom is None:
+            runs.append(run)
+            run = ''
+        else:
+            run += atom
+    runs.append(run)
+    return max(runs, key=len)
+
+
 def get_contents(filename):
     """Get contents of filename."""
     with open(filename, "rb") as f:
@@ -177,11 +317,22 @@ def get_contents(filename):
     return None
 
 
+def get_digests(filename, digests):
+    """Get a dict of the hex digests of filename for the hashlib algorithms named in digests.
+
+    The file is read once, in chunks, whatever its size.
+    """
+    hashes = {name: hashlib.new(name) for name in digests}
+    with open(filename, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            for digest in hashes.values():
+                digest.update(chunk)
+    return {name: digest.hexdigest() for name, digest in hashes.items()}
+
+
 def get_sha1sum(filename):
     """Get sha1 sum of filename."""
-    sh = hashlib.sha1()
-    sh.update(get_contents(filename))
-    return sh.hexdigest()
+    return get_digests(filename, ("sha1",))["sha1"]
 
 
 def _supports_color():
@@ -210,12 +361,19 @@ def print_error(message):
     _print_message(message, 'ERROR', 'red')
 
 
-def print_build_failed():
-    """Print final fatal error, color coded for TTYs."""
+def print_build_failed(build_errors=None):
+    """Print final fatal error, color coded for TTYs.
+
+    build_errors is a BuildErrors that already parsed the build log, if not
+    given the build log is read again.
+    """
     _print_message('Build failed, aborting', 'FATAL', 'red')
     try:
         if os.environ.get(ERROR_ENV):
-            _process_build_log('results/build.log')
+            if build_errors is None:
+                _process_build_log('results/build.log')
+            else:
+                _report_errors(build_errors.errors)
     except Exception:
         pass
 
@@ -261,6 +419,18 @@ def write_out(filename, content, mode="w"):
         require_f.write(content)
 
 
+def fsync_file(filename):
+    """Flush the data of filename to disk, ignoring missing files."""
+    try:
+        fd = os.open(filename, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
 def open_auto(*args, **kwargs):
     """Open a file with UTF-8 encoding.
 
@@ -275,6 +445,65 @@ def open_auto(*args, **kwargs):
     return open(*args, encoding="utf-8", errors="surrogateescape", **kwargs)
 
 
+def open_log(filename):
+    """Open a log file for reading text, decompressing it if needed.
+
+    Files ending in .gz, .xz or .zst are decompressed on the fly, anything
+    else is opened with open_auto.
+    """
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt", encoding="utf-8", errors="surrogateescape")
+    if filename.endswith(".xz"):
+        return lzma.open(filename, "rt", encoding="utf-8", errors="surrogateescape")
+    if filename.endswith(".zst"):
+        reader = zstd.ZstdDecompressor().stream_reader(open(filename, "rb"), closefd=True)
+        return io.TextIOWrapper(reader, encoding="utf-8", errors="surrogateescape")
+    return open_auto(filename, "r")
+
+
+def stream_log(filename):
+    """Yield the lines of a log file one at a time.
+
+    Only the current line is held in memory, so memory use does not grow with
+    the size of the log.
+    """
+    with open_log(filename) as logf:
+        yield from logf
+
+
+class LogTail(object):
+    """Read the lines appended to a log file that is still being written."""
+
+    def __init__(self, filename):
+        """Follow filename, which does not need to exist yet."""
+        self.filename = filename
+        self.logf = None
+        self.partial = b""
+
+    def read_lines(self):
+        """Return the complete lines appended since the last call."""
+        try:
+            stat = os.stat(self.filename)
+        except FileNotFoundError:
+            return []
+        if self.logf and (os.fstat(self.logf.fileno()).st_ino != stat.st_ino or stat.st_size < self.logf.tell()):
+            # the log was replaced or truncated, start over
+            self.close()
+        if not self.logf:
+            self.logf = open(self.filename, "rb")
+        data = self.partial + self.logf.read()
+        lines = data.split(b"\n")
+        self.partial = lines.pop()
+        return [line.decode("utf-8", "surrogateescape") + "\n" for line in lines]
+
+    def close(self):
+        """Stop following the log."""
+        if self.logf:
+            self.logf.close()
+        self.logf = None
+        self.partial = b""
+
+
 def globlike_match(filename, match_name):
     """Compare the filename to the match_name in a way that simulates the shell glob '*'."""
     fsplit = filename.split('/')
@@ -0,0 +1,43 @@
+"""Time test result counting over a synthetic build log with a large test output."""
+import os
+import tempfile
+import timeit
+from unittest.mock import patch
+
+import count
+from test_count import pats
+
+LOG_LINES = 200000
+
+
+def write_log(path):
+    """Write a build log of pytest and gtest style lines, with the test_count fixtures."""
+    fixtures = [line for pat, _ in pats if 'meson' not in pat for line in pat.splitlines()]
+    with open(path, 'w') as logf:
+        logf.write('Executing(%check)\n+ make check\n')
+        for idx in range(LOG_LINES):
+            if idx % 3 == 0:
+                logf.write(f'tests/test_module{idx % 97}.py::test_case_{idx} PASSED{" " * 20}[ {idx % 100:2}%]\n')
+            elif idx % 3 == 1:
+                logf.write(f'[       OK ] Suite{idx % 13}.Case{idx} ({idx % 7} ms)\n')
+            else:
+                logf.write(fixtures[idx % len(fixtures)] + '\n')
+
+
+def guarded(path):
+    count.parse_log(path)
+
+
+def unguarded(path):
+    matchers = [('', search, handler) for _, search, handler in count.check_matchers]
+    with patch('count.check_matchers', matchers):
+        count.parse_log(path)
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmpd:
+        path = os.path.join(tmpd, 'build.log')
+        write_log(path)
+        for func in [unguarded, guarded]:
+            best = min(timeit.repeat(lambda: func(path), number=1, repeat=3))
+            print(f"{func.__name__:>10}: {best:.3f}s for {LOG_LINES} lines ({LOG_LINES / best:.0f} lines/s)")
@@ -0,0 +1,37 @@
+"""Time %files classification over the recorded file list in bench/filelist."""
+import os
+import timeit
+
+import build
+import config
+import files
+from files import FileManager
+
+ROUNDS = 20
+
+
+def load_filelist():
+    with open(os.path.join(os.path.dirname(__file__), 'filelist')) as flist:
+        return flist.read().splitlines()
+
+
+def pattern_loop(filenames):
+    fm = FileManager(config.Config(""), build.Build())
+    for filename in filenames:
+        for pat in files.file_patterns('qtbase', 'dev', 'dev'):
+            if fm.file_pat_match(filename, *pat):
+                break
+
+
+def classifier(filenames):
+    fm = FileManager(config.Config(""), build.Build())
+    file_classifier = fm.get_classifier('qtbase', 'dev', 'dev')
+    for filename in filenames:
+        fm.classify(filename, file_classifier)
+
+
+if __name__ == '__main__':
+    filenames = load_filelist()
+    for func in [pattern_loop, classifier]:
+        best = min(timeit.repeat(lambda: func(filenames), number=ROUNDS, repeat=3)) / ROUNDS
+        print(f"{func.__name__:>12}: {best * 1000:.1f}ms for {len(filenames)} files")
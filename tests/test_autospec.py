@@ -0,0 +1,49 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+# make autospec the autospec.py module rather than the package directory
+# of the same name when the tests run from the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'autospec'))
+
+import autospec
+import buildreq
+import config
+import license
+
+
+class TestAutospec(unittest.TestCase):
+
+    def setUp(self):
+        license.licenses = []
+        license.license_files = []
+        license.hashes = {}
+
+    def test_scan_source_many_licenses(self):
+        """
+        Test scan_source reads many distinct license files without starting
+        a process pool from its worker threads
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            conf = config.Config(tmpd)
+            conf.setup_patterns()
+            conf.config_opts['use_ninja'] = False
+            path = os.path.join(tmpd, 'pkg-1.0')
+            os.mkdir(path)
+            for idx in range(license.PARALLEL_DECODE_MIN):
+                with open(os.path.join(path, f'COPYING.{idx}'), 'w') as copyingf:
+                    copyingf.write(f'license text {idx}\n')
+            conf.license_hashes = {license.read_copying(os.path.join(path, 'COPYING.0'))[1]: 'MIT'}
+            content = MagicMock()
+            content.name = 'pkg'
+            with patch('license.ProcessPoolExecutor', side_effect=AssertionError('forked')), \
+                    patch('check.scan_for_tests'), patch('sys.stdout'):
+                autospec.scan_source(conf, buildreq.Requirements(''), content, [], path)
+
+        self.assertEqual(license.licenses, ['MIT'])
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
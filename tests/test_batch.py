@@ -0,0 +1,120 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# make autospec the autospec.py module rather than the package directory
+# of the same name when the tests run from the top of the repository
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'autospec'))
+
+import abireport
+import autospec
+import batch
+import build
+import license
+
+
+def fake_run(parser, args):
+    """
+    Stand-in for autospec.run, failing for the packages named fail
+    """
+    print("building", os.path.basename(os.getcwd()))
+    if os.path.basename(args.target) == "fail":
+        print("broken", file=sys.stderr)
+        sys.exit(1)
+
+
+def pool_run(parser, args):
+    """
+    Stand-in for autospec.run going through the analyzers that start their
+    own process pools
+    """
+    copyings = []
+    for idx in range(license.PARALLEL_DECODE_MIN):
+        copyings.append(os.path.join(args.target, f'COPYING{idx}'))
+        with open(copyings[-1], 'w') as copyingf:
+            copyingf.write(f'license text {idx}\n')
+    texts = license.read_copyings(copyings)
+    paths = [os.path.join(args.target, 'COPYING0')] * abireport.PARALLEL_SCAN_MIN
+    infos = abireport.scan_map(abireport.get_dependency_info, paths)
+    print(len([text for text in texts if text]), len(infos))
+
+
+class TestBatch(unittest.TestCase):
+
+    def test_read_jobs(self):
+        """
+        Test read_jobs parses one autospec command line per package
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            path = os.path.join(tmpd, 'list')
+            with open(path, 'w') as listf:
+                listf.write("# packages\n"
+                            "-t pkgs/foo https://example.com/foo-1.0.tar.gz\n"
+                            "\n"
+                            "--skip-git -t /abs/bar -n bar\n")
+            jobs = batch.read_jobs(autospec.make_parser(), path)
+
+        self.assertEqual([target for target, _ in jobs], [os.path.abspath('pkgs/foo'), '/abs/bar'])
+        self.assertEqual(jobs[0][1].url, 'https://example.com/foo-1.0.tar.gz')
+        self.assertTrue(jobs[0][1].git)
+        self.assertFalse(jobs[1][1].git)
+        self.assertEqual(jobs[1][1].name, 'bar')
+
+    def test_run_batch(self):
+        """
+        Test run_batch builds each package in its target directory and
+        reports the results in the order of the jobs
+        """
+        parser = autospec.make_parser()
+        with tempfile.TemporaryDirectory() as tmpd:
+            jobs = [(os.path.join(tmpd, name), parser.parse_args(['-t', os.path.join(tmpd, name)]))
+                    for name in ['one', 'fail', 'two']]
+            with patch('autospec.run', fake_run), patch('sys.stdout'):
+                results = batch.run_batch(jobs, 2, 1)
+            report = os.path.join(tmpd, 'report.json')
+            batch.write_report(results, report)
+            with open(report) as reportf:
+                self.assertEqual(json.load(reportf), results)
+            with open(os.path.join(tmpd, 'one', batch.LOG_NAME)) as logf:
+                self.assertEqual(logf.read(), "building one\n")
+            with open(os.path.join(tmpd, 'fail', batch.LOG_NAME)) as logf:
+                self.assertEqual(logf.read(), "building fail\nbroken\n")
+
+        self.assertEqual([(os.path.basename(r['target']), r['status'], r['code']) for r in results],
+                         [('one', 'ok', 0), ('fail', 'failed', 1), ('two', 'ok', 0)])
+
+    def test_run_batch_pools(self):
+        """
+        Test run_batch jobs can start the process pools of the analyzers
+        """
+        parser = autospec.make_parser()
+        with tempfile.TemporaryDirectory() as tmpd:
+            target = os.path.join(tmpd, 'big')
+            jobs = [(target, parser.parse_args(['-t', target]))]
+            with patch('autospec.run', pool_run), patch('abireport.os.cpu_count', return_value=2), \
+                    patch('sys.stdout'):
+                results = batch.run_batch(jobs, 1, 1)
+            with open(os.path.join(target, batch.LOG_NAME)) as logf:
+                log = logf.read()
+
+        self.assertEqual(results[0]['status'], 'ok', log)
+        self.assertEqual(log, f"{license.PARALLEL_DECODE_MIN} {abireport.PARALLEL_SCAN_MIN}\n")
+
+    def test_mock_slot(self):
+        """
+        Test mock_slot holds one of the mock_slots when batch mode sets them
+        """
+        with build.mock_slot():
+            pass
+        slots = batch.multiprocessing.get_context("fork").BoundedSemaphore(1)
+        with patch('build.mock_slots', slots):
+            with build.mock_slot():
+                self.assertFalse(slots.acquire(block=False))
+            self.assertTrue(slots.acquire(block=False))
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
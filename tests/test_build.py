@@ -1,4 +1,5 @@
 import unittest
+import unittest.mock
 import tempfile
 import os
 from unittest.mock import patch, mock_open, MagicMock
@@ -182,6 +183,35 @@ class TestBuildpattern(unittest.TestCase):
         self.assertIn('pypi(testpkg)', reqs.buildreqs)
         self.assertEqual(pkg.must_restart, 1)
 
+    def test_check_patterns_parity(self):
+        """
+        Test check_patterns gives the same buildreqs and restart count as
+        running every pattern of the tables one by one
+        """
+        conf = config.Config('')
+        conf.setup_patterns()
+        conf.config_opts['32bit'] = True
+        lines = ['line 1', 'checking for stdio.h... yes', 'which: no qmake',
+                 'checking for Apache test module support']
+        with open('tests/builderrors', 'r') as f:
+            for error in f.readlines():
+                if not error.startswith('#'):
+                    lines.append(error.strip('\n').split('|')[0])
+        for line in lines:
+            ref_reqs = buildreq.Requirements("")
+            ref = build.Build()
+            for pat in conf.pkgconfig_pats:
+                ref.simple_pattern_pkgconfig(line, *pat, True, ref_reqs)
+            for pat in conf.simple_pats:
+                ref.simple_pattern(line, *pat, ref_reqs)
+            for pat in conf.failed_pats:
+                ref.failed_pattern(line, conf, ref_reqs, *pat)
+            reqs = buildreq.Requirements("")
+            pkg = build.Build()
+            pkg.check_patterns(line, conf, reqs)
+            self.assertEqual(reqs.buildreqs, ref_reqs.buildreqs, line)
+            self.assertEqual(pkg.must_restart, ref.must_restart, line)
+
     def test_parse_buildroot_log_fail(self):
         """
         Test parse_buildroot_log with a test log indicating failure due to
@@ -432,6 +462,34 @@ class TestBuildpattern(unittest.TestCase):
         self.assertEqual(pkg.must_restart, 0)
         self.assertEqual(pkg.file_restart, 3)
 
+    def test_parse_build_results_consumers(self):
+        """
+        Test parse_build_results feeds every line to the log consumers
+        """
+        conf = config.Config('')
+        conf.setup_patterns()
+        reqs = buildreq.Requirements("")
+        tcontent = tarball.Content("", "", "", [], conf, "/")
+        call_backup = build.util.call
+        build.util.call = MagicMock(return_value=None)
+        pkg = build.Build()
+        fm = files.FileManager(conf, pkg)
+        consumer = MagicMock()
+        pkg.log_consumers.append(consumer)
+
+        content = 'line 1\nline 2\n'
+        m_open = mock_open(read_data=content)
+        with patch('build.util.open_auto', m_open, create=True):
+            pkg.parse_build_results('testname', 0, fm, conf, reqs, tcontent)
+
+        build.util.call = call_backup
+
+        self.assertEqual(consumer.mock_calls,
+                         [unittest.mock.call.reset(),
+                          unittest.mock.call.parse_line('line 1\n'),
+                          unittest.mock.call.parse_line('line 2\n'),
+                          unittest.mock.call.finish()])
+
     def test_parse_build_results_banned_files(self):
         """
         Test parse_build_results with a test log indicating banned files are missing
@@ -469,6 +527,29 @@ class TestBuildpattern(unittest.TestCase):
         # check no files were added
         self.assertEqual(pkg.must_restart, 0)
 
+    def test_early_restart_watch(self):
+        """
+        Test early_restart_watch stops on a new requirement without adding it
+        """
+        conf = config.Config('')
+        conf.setup_patterns()
+        reqs = buildreq.Requirements("")
+        reqs.add_buildreq('pkgconfig(known)')
+        pkg = build.Build()
+        with tempfile.TemporaryDirectory() as tmpd:
+            log = os.path.join(tmpd, 'build.log')
+            watch = pkg.early_restart_watch(log, conf, reqs)
+            self.assertFalse(watch())
+            with open(log, 'w') as logf:
+                logf.write("line 1\nNo package 'known' found\n")
+            self.assertFalse(watch())
+            with open(log, 'a') as logf:
+                logf.write("No package 'foo' found\n")
+            self.assertTrue(watch())
+
+        self.assertNotIn('pkgconfig(foo)', reqs.buildreqs)
+        self.assertEqual(pkg.must_restart, 0)
+
     def test_get_mock_cmd_without_consolehelper(self):
         """
         Test get_mock_cmd when /usr/bin/mock doesn't point to consolehelper
@@ -503,6 +584,82 @@ class TestBuildpattern(unittest.TestCase):
 
         self.assertEqual(mock_cmd, '/usr/bin/mock')
 
+    def test_package_reuse_srpm(self):
+        """
+        Test package only rebuilds the srpm when the spec or the sources
+        changed since the previous round
+        """
+        def mock_util_call(cmd, logfile=None, cwd=None, **kwargs):
+            commands.append(cmd)
+            results = os.path.join(cwd, 'results')
+            for log in ['root.log', 'build.log', os.path.basename(logfile)]:
+                with open(os.path.join(results, log), 'w') as logf:
+                    logf.write(cmd)
+            if '--buildsrpm' in cmd:
+                with open(os.path.join(results, 'pkg-1.0-1.src.rpm'), 'w') as rpmf:
+                    rpmf.write('srpm')
+            return 0
+
+        with tempfile.TemporaryDirectory() as tmpd:
+            conf = config.Config(tmpd)
+            content = MagicMock(version='1.0', release='1')
+            content.name = 'pkg'
+            filemanager = MagicMock(excludes=[], manual_excludes=[], has_banned=False)
+            for name, text in [('pkg.spec', 'Name: pkg'), ('pkg-1.0.tar.gz', 'source')]:
+                with open(os.path.join(tmpd, name), 'w') as f:
+                    f.write(text)
+            pkg = build.Build()
+            commands = []
+            with patch('build.util.call', mock_util_call), \
+                    patch('build.Build.parse_build_results'), \
+                    patch('build.Build.parse_buildroot_log'):
+                pkg.package(filemanager, 'clear', '', conf, None, content)
+                pkg.package(filemanager, 'clear', '', conf, None, content)
+                with open(os.path.join(tmpd, 'pkg.spec'), 'a') as f:
+                    f.write('\nBuildRequires: foo')
+                pkg.package(filemanager, 'clear', '', conf, None, content)
+            srpm_logs = os.path.isfile(os.path.join(tmpd, 'results', 'srpm-build.log'))
+
+        self.assertEqual(['--buildsrpm' in cmd for cmd in commands], [True, False, False, True, False])
+        self.assertTrue(srpm_logs)
+
+    def test_short_circuit(self):
+        """
+        Test short_circuit only reuses the previous %build when the sources
+        did not change and the spec only changed in packaging sections
+        """
+        conf = config.Config('')
+        conf.config_opts['avoid_rebuild'] = True
+        filemanager = MagicMock(excludes=['/a'], manual_excludes=[])
+        pkg = build.Build()
+        pkg.sources = 'sources'
+        pkg.install_reached = True
+        self.assertTrue(pkg.short_circuit(filemanager, conf, False, {'%files', 'tags'}, 'sources'))
+        self.assertTrue(pkg.short_circuit(filemanager, conf, False, set(), 'sources'))
+        self.assertFalse(pkg.short_circuit(filemanager, conf, False, {'%files', 'preamble'}, 'sources'))
+        self.assertFalse(pkg.short_circuit(filemanager, conf, False, {'%build'}, 'sources'))
+        self.assertFalse(pkg.short_circuit(filemanager, conf, False, {'%files'}, 'new sources'))
+        self.assertFalse(pkg.short_circuit(filemanager, conf, True, {'%files'}, 'sources'))
+        pkg.install_reached = False
+        self.assertFalse(pkg.short_circuit(filemanager, conf, False, {'%files'}, 'sources'))
+        conf.config_opts['avoid_rebuild'] = False
+        pkg.install_reached = True
+        self.assertFalse(pkg.short_circuit(filemanager, conf, False, {'%files'}, 'sources'))
+
+    def test_short_circuit_unknown_sections(self):
+        """
+        Test short_circuit without the spec changes, only for rounds
+        restarted because of the file list
+        """
+        conf = config.Config('')
+        conf.config_opts['avoid_rebuild'] = True
+        filemanager = MagicMock(excludes=['/a'], manual_excludes=['/a'])
+        pkg = build.Build()
+        pkg.file_restart = 1
+        self.assertTrue(pkg.short_circuit(filemanager, conf, False, None, None))
+        pkg.must_restart = 1
+        self.assertFalse(pkg.short_circuit(filemanager, conf, False, None, None))
+
 
 if __name__ == '__main__':
     unittest.main(buffer=True)
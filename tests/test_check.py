@@ -1,5 +1,7 @@
 import os
+import shutil
 import tempfile
+import time
 import unittest
 from unittest.mock import mock_open, patch
 
@@ -53,6 +55,27 @@ class TestTest(unittest.TestCase):
                                               'XFail : 0\n')
         self.assertIn(exp_call, m_open.mock_calls)
 
+    def test_check_regression_result(self):
+        """
+        Test check_regression with a result gathered while parsing the build
+        """
+        parse_log_backup = check.count.parse_log
+        check.count.parse_log = unittest.mock.MagicMock()
+        m_open = mock_open()
+        with patch('util.open', m_open, create=True):
+            check.check_regression('pkgdir', False, -1, ',120,100,20,0,0')
+
+        mock_parse_log = check.count.parse_log
+        check.count.parse_log = parse_log_backup
+
+        mock_parse_log.assert_not_called()
+        exp_call = unittest.mock.call().write('Total : 120\n'
+                                              'Pass : 100\n'
+                                              'Fail : 20\n'
+                                              'Skip : 0\n'
+                                              'XFail : 0\n')
+        self.assertIn(exp_call, m_open.mock_calls)
+
     def test_check_regression_multi(self):
         """
         Test check_regression with multiple results
@@ -83,6 +106,121 @@ class TestTest(unittest.TestCase):
                                               'XFail : 1\n')
         self.assertIn(exp_call, m_open.mock_calls)
 
+    def write_result_files(self, build_dir, tap_status='not ok'):
+        """
+        Write JUnit XML and TAP result files to build_dir
+        """
+        os.makedirs(os.path.join(build_dir, 'pkg-1.0', 'builddir', 'meson-logs'))
+        os.makedirs(os.path.join(build_dir, 'pkg-1.0', 't'))
+        with open(os.path.join(build_dir, 'pkg-1.0', 'builddir', 'meson-logs', 'testlog.junit.xml'), 'w') as junitf:
+            junitf.write('<?xml version="1.0" encoding="utf-8"?>\n'
+                         '<testsuites><testsuite name="pkg" tests="5">\n'
+                         '<testcase classname="pkg" name="passes"/>\n'
+                         '<testcase classname="pkg" name="fails"><failure message="boom"/></testcase>\n'
+                         '<testcase classname="pkg" name="errors"><error/><system-out>log</system-out></testcase>\n'
+                         '<testcase classname="pkg" name="skips"><skipped/></testcase>\n'
+                         '<testcase name="xfails"><skipped type="pytest.xfail"/></testcase>\n'
+                         '</testsuite></testsuites>\n')
+        with open(os.path.join(build_dir, 'pkg-1.0', 't', 'basic.tap'), 'w') as tapf:
+            tapf.write('1..5\n'
+                       'ok 1 - first\n'
+                       f'{tap_status} 2 - second\n'
+                       '    not ok 1 - subtest\n'
+                       'ok 3 # SKIP no network\n'
+                       'not ok 4 - known # TODO fix it\n'
+                       'ok 5\n'
+                       '# all done\n')
+        with open(os.path.join(build_dir, 'pkg-1.0', 'data.xml'), 'w') as dataf:
+            dataf.write('<testcase name="not a result"/>')
+
+    def test_read_test_cases(self):
+        """
+        Test read_test_cases reads the JUnit XML and TAP result files of a
+        build tree
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            self.write_result_files(tmpd)
+            cases = check.read_test_cases(tmpd)
+
+        self.assertEqual(cases, [('PASS', 'pkg.passes'),
+                                 ('FAIL', 'pkg.fails'),
+                                 ('FAIL', 'pkg.errors'),
+                                 ('SKIP', 'pkg.skips'),
+                                 ('XFAIL', 'xfails'),
+                                 ('PASS', 'basic: first'),
+                                 ('FAIL', 'basic: second'),
+                                 ('SKIP', 'basic: 3'),
+                                 ('XFAIL', 'basic: known'),
+                                 ('PASS', 'basic: 5')])
+        self.assertEqual(check.cases_result(cases), ',10,3,3,2,2')
+
+    def test_read_test_cases_bad_file(self):
+        """
+        Test read_test_cases skips result files that can't be parsed
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            with open(os.path.join(tmpd, 'TEST-truncated.xml'), 'w') as junitf:
+                junitf.write('<testsuite><testcase name="a"/>')
+            with patch('check.util.print_warning') as print_warning:
+                self.assertEqual(check.read_test_cases(tmpd), [])
+        print_warning.assert_called_once()
+
+    def test_check_regression_test_cases(self):
+        """
+        Test check_regression uses the result files of the build tree and
+        reports tests that failed after passing in the previous run
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            build_dir = os.path.join(tmpd, 'BUILD')
+            with patch('check.count.parse_log', return_value=',4,4,0,0,0\n'):
+                self.write_result_files(build_dir, tap_status='ok')
+                check.check_regression(tmpd, False, -1, None, build_dir)
+                shutil.rmtree(build_dir)
+                self.write_result_files(build_dir)
+                with patch('check.util.print_warning') as print_warning:
+                    check.check_regression(tmpd, False, -1, None, build_dir)
+
+            print_warning.assert_called_once_with('Test regression: basic: second')
+            with open(os.path.join(tmpd, 'testresults')) as resultsf:
+                self.assertEqual(resultsf.read(), 'Total : 10\n'
+                                                  'Pass : 3\n'
+                                                  'Fail : 3\n'
+                                                  'Skip : 2\n'
+                                                  'XFail : 2\n')
+            with open(os.path.join(tmpd, 'testcases')) as casesf:
+                self.assertIn('FAIL basic: second\n', casesf.read())
+
+    def test_check_regression_source_fixture(self):
+        """
+        Test check_regression ignores the result files shipped with the
+        source and keeps the build log counts when the result files written
+        by the build cover fewer tests
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            build_dir = os.path.join(tmpd, 'BUILD')
+            # file times are not as precise as time.time()
+            started = time.time() - 1
+            self.write_result_files(build_dir)
+            # the TAP file comes from the source tarball
+            tap_path = os.path.join(build_dir, 'pkg-1.0', 't', 'basic.tap')
+            os.utime(tap_path, (started - 3600, started - 3600))
+            self.assertEqual([path for path, _ in check.find_result_files(build_dir, started)],
+                             [os.path.join(build_dir, 'pkg-1.0', 'builddir', 'meson-logs', 'testlog.junit.xml')])
+
+            check.check_regression(tmpd, False, -1, ',12,12,0,0,0\n', build_dir, started)
+            with open(os.path.join(tmpd, 'testresults')) as resultsf:
+                self.assertEqual(resultsf.read(), 'Total : 12\nPass : 12\nFail : 0\nSkip : 0\nXFail : 0\n')
+            with open(os.path.join(tmpd, 'testcases')) as casesf:
+                self.assertNotIn('basic', casesf.read())
+
+            check.check_regression(tmpd, False, -1, ',3,3,0,0,0\n', build_dir, started)
+            with open(os.path.join(tmpd, 'testresults')) as resultsf:
+                self.assertEqual(resultsf.read(), 'Total : 5\n'
+                                                  'Pass : 1\n'
+                                                  'Fail : 2\n'
+                                                  'Skip : 1\n'
+                                                  'XFail : 1\n')
+
     def test_scan_for_tests_makecheck_in(self):
         """
         Test scan_for_tests with makecheck suite
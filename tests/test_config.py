@@ -1,4 +1,8 @@
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
+
 import config
 
 
@@ -83,6 +87,45 @@ class TestConfig(unittest.TestCase):
         new_lines = conf.validate_extras_content(lines, 'good_multi_glob')
         self.assertEqual(new_lines, ['/path1', lines[1].split('/'), '/path3'])
 
+    def test_setup_patterns_lazy(self):
+        """
+        Test setup_patterns only reads the pattern tables that are used, and
+        that the tables are empty before it is called
+        """
+        conf = config.Config("")
+        self.assertEqual(conf.cmake_modules, {})
+        conf.setup_patterns()
+        with patch('config.read_pattern_conf', wraps=config.read_pattern_conf) as read_pattern_conf:
+            self.assertIn('MIT', conf.license_hashes.values())
+            self.assertTrue(conf.ignored_commands)
+        self.assertEqual([call.args[0] for call in read_pattern_conf.call_args_list],
+                         ['license_hashes', 'ignored_commands'])
+        with self.assertRaises(AttributeError):
+            conf.not_a_table
+
+    def test_setup_patterns_path(self):
+        """
+        Test setup_patterns with a pattern directory overriding the patterns
+        of the repository, and that changed files are read again
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            with open(os.path.join(tmpd, 'failed_commands'), 'w') as patf:
+                patf.write('# comment\n-lGL, mesa-dev\nnew-command, new-package\n')
+            conf = config.Config("")
+            conf.setup_patterns()
+            self.assertEqual(conf.failed_commands['-lGL'], 'pkgconfig(gl)')
+            self.assertNotIn('new-command', conf.failed_commands)
+            conf.setup_patterns(tmpd)
+            self.assertEqual(conf.failed_commands['new-command'], 'new-package')
+            self.assertEqual(conf.failed_commands['-lGL'], 'mesa-dev')
+
+            with open(os.path.join(tmpd, 'failed_commands'), 'a') as patf:
+                patf.write('other-command, other-package\n')
+            os.utime(os.path.join(tmpd, 'failed_commands'), ns=(0, 0))
+            conf = config.Config("")
+            conf.setup_patterns(tmpd)
+            self.assertEqual(conf.failed_commands['other-command'], 'other-package')
+
 # Create dynamic tests
 create_dynamic_tests()
 
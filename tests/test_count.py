@@ -487,16 +487,36 @@ pats = [
      [6, 4, 1, 1, 0, 0, 0, 0, 0, 0]),
 ]
 
-backup_zero_test_data = count.zero_test_data
+class TestCount(unittest.TestCase):
 
-def mock_zero_test_data():
-    pass
+    def test_log_counter(self):
+        """
+        Test LogCounter gives the same result as parse_log and does not carry
+        results over between logs
+        """
+        content = '+ make check\n' + pats[-1][0]
+        m_open = mock_open(read_data=content)
+        with patch('count.util.open_auto', m_open, create=True):
+            expected = count.parse_log('log')
 
+        counter = count.LogCounter()
+        for _ in range(2):
+            counter.reset()
+            for line in content.splitlines(keepends=True):
+                counter.parse_line(line)
+            counter.finish()
+            self.assertEqual(counter.result, expected)
 
-class TestCount(unittest.TestCase):
-
-    def setUp(self):
-        count.zero_test_data()
+    def test_literal_guards(self):
+        """
+        Test the literal guard of each pattern does not hide a match
+        """
+        for pat in pats:
+            for line in pat[0].splitlines():
+                line = line.rstrip()
+                for literal, search, _ in count.check_matchers:
+                    if search(line):
+                        self.assertIn(literal, line)
 
 
 def test_generator(line, expected):
@@ -505,7 +525,7 @@ def test_generator(line, expected):
     """
     def test_parse_log(self):
         """
-        test parse_log
+        test LogCounter.parse_line
         expected = [total_tests,
                     total_pass,
                     total_fail,
@@ -518,22 +538,21 @@ def test_generator(line, expected):
                     counted_skip]
         """
         content = '+ make check\n' + line
-        m_open = mock_open(read_data=content)
-        with patch('count.util.open_auto', m_open, create=True):
-            count.zero_test_data = mock_zero_test_data
-            count.parse_log('log')
-            count.zero_test_data = backup_zero_test_data
+        counter = count.LogCounter()
+        for log_line in content.splitlines(keepends=True):
+            counter.parse_line(log_line)
+        counter.sanitize_counts()
 
-        actual = [count.total_tests,
-                  count.total_pass,
-                  count.total_fail,
-                  count.total_xfail,
-                  count.total_skip,
-                  count.counted_tests,
-                  count.counted_pass,
-                  count.counted_fail,
-                  count.counted_xfail,
-                  count.counted_skip]
+        actual = [counter.total_tests,
+                  counter.total_pass,
+                  counter.total_fail,
+                  counter.total_xfail,
+                  counter.total_skip,
+                  counter.counted_tests,
+                  counter.counted_pass,
+                  counter.counted_fail,
+                  counter.counted_xfail,
+                  counter.counted_skip]
 
         self.assertEqual(actual, expected)
 
@@ -1,4 +1,9 @@
 from enum import Enum, auto
+import hashlib
+import http.server
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch, mock_open, call
 
@@ -39,6 +44,44 @@ def test_opts(*opts):
         val.write(b'foobar')
 
 
+class RangeHandler(http.server.BaseHTTPRequestHandler):
+    """Serve CONTENT, honouring simple "bytes=N-" range requests."""
+
+    protocol_version = 'HTTP/1.1'
+    content = b'0123456789' * 1000
+    ranges = []
+
+    def do_GET(self):
+        if self.path == '/missing':
+            self.send_error(404)
+            return
+        start = 0
+        if self.headers['Range']:
+            start = int(self.headers['Range'][len('bytes='):].rstrip('-'))
+        self.ranges.append(start)
+        if start >= len(self.content):
+            self.send_response(416)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header('Content-Range', f'bytes {start}-{len(self.content) - 1}/{len(self.content)}')
+        self.send_header('Content-Length', str(len(self.content) - start))
+        self.end_headers()
+        self.wfile.write(self.content[start:])
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
 class TestDownload(unittest.TestCase):
 
     @patch('download.pycurl.Curl')
@@ -102,17 +145,20 @@ class TestDownload(unittest.TestCase):
         data = download.do_curl("foo", is_fatal=True)
         test_exit.assert_called_once_with(1)
 
+    @patch('download.os.replace')
     @patch('download.open', new_callable=mock_open)
     @patch('download.pycurl.Curl')
-    def test_download_get_success_dest(self, test_curl, test_open):
+    def test_download_get_success_dest(self, test_curl, test_open, test_replace):
         """
         Test successful GET request when dest is set.
         """
         instance = init_curl_instance(test_curl)
         instance.setopt.side_effect = test_opts
         data = download.do_curl("foo", "testdest")
-        test_open.assert_called_once_with('testdest', 'wb')
+        test_open.assert_called_once_with('testdest.tmp', 'wb')
         test_open().write.assert_called_once_with(b'foobar')
+        test_replace.assert_called_once_with('testdest.tmp', 'testdest')
+        self.assertEqual(data, 'testdest')
 
     @patch('download.os.path.exists')
     @patch('download.open', new_callable=mock_open)
@@ -156,8 +202,125 @@ class TestDownload(unittest.TestCase):
         test_open.side_effect = IOError
         test_path.return_value = True
         data = download.do_curl("foo", "testdest")
-        test_path.assert_called_once_with("testdest")
-        test_unlink.assert_called_once_with("testdest")
+        test_path.assert_called_once_with("testdest.tmp")
+        test_unlink.assert_called_once_with("testdest.tmp")
+
+
+    @patch('download.pycurl.Curl')
+    def test_download_digests(self, test_curl):
+        """
+        Test digests of dest are computed while it is written.
+        """
+        instance = init_curl_instance(test_curl)
+        instance.setopt.side_effect = test_opts
+        with tempfile.TemporaryDirectory() as tmpd:
+            dest = os.path.join(tmpd, 'testdest')
+            digests = download.do_curl("foo", dest, digests=("sha1", "sha256"))
+            with open(dest, 'rb') as destf:
+                self.assertEqual(destf.read(), b'foobar')
+        self.assertEqual(digests, {"sha1": hashlib.sha1(b'foobar').hexdigest(),
+                                   "sha256": hashlib.sha256(b'foobar').hexdigest()})
+
+    @patch('download.pycurl.Curl')
+    def test_download_get_failure_dest(self, test_curl):
+        """
+        Test a partial dest is removed after a failed GET request.
+        """
+        instance = init_curl_instance(test_curl)
+        instance.setopt.side_effect = test_opts
+        instance.perform.side_effect = pycurl.error
+        with tempfile.TemporaryDirectory() as tmpd:
+            dest = os.path.join(tmpd, 'testdest')
+            self.assertIsNone(download.do_curl("foo", dest))
+            self.assertFalse(os.path.exists(dest))
+            self.assertFalse(os.path.exists(dest + '.tmp'))
+
+    @patch('download.pycurl.Curl')
+    def test_download_get_failure_existing_dest(self, test_curl):
+        """
+        Test an existing dest is kept as is after a failed GET request.
+        """
+        instance = init_curl_instance(test_curl)
+        instance.setopt.side_effect = test_opts
+        instance.perform.side_effect = pycurl.error
+        with tempfile.TemporaryDirectory() as tmpd:
+            dest = os.path.join(tmpd, 'testdest')
+            with open(dest, 'wb') as destf:
+                destf.write(b'previous')
+            self.assertIsNone(download.do_curl("foo", dest))
+            with open(dest, 'rb') as destf:
+                self.assertEqual(destf.read(), b'previous')
+            self.assertEqual(os.listdir(tmpd), ['testdest'])
+
+
+    def test_download_session_resume(self):
+        """
+        Test resuming a partial download, and reusing handles of a session.
+        """
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f'http://127.0.0.1:{server.server_address[1]}/src.tar.gz'
+        session = download.DownloadSession()
+        content = RangeHandler.content
+        try:
+            with tempfile.TemporaryDirectory() as tmpd:
+                dest = os.path.join(tmpd, 'src.tar.gz')
+                with open(dest + '.part', 'wb') as part:
+                    part.write(content[:4000])
+                RangeHandler.ranges = []
+                digests = download.do_curl(url, dest, digests=("sha256",), session=session, resume=True)
+                self.assertEqual(RangeHandler.ranges, [4000])
+                self.assertEqual(digests, {"sha256": hashlib.sha256(content).hexdigest()})
+                self.assertFalse(os.path.exists(dest + '.part'))
+                with open(dest, 'rb') as destf:
+                    self.assertEqual(destf.read(), content)
+
+                # a stale partial file the server can't complete is downloaded again
+                with open(dest + '.part', 'wb') as part:
+                    part.write(content + b'stale')
+                RangeHandler.ranges = []
+                self.assertEqual(download.do_curl(url, dest, session=session, resume=True), dest)
+                self.assertEqual(RangeHandler.ranges, [len(content) + 5, 0])
+                with open(dest, 'rb') as destf:
+                    self.assertEqual(destf.read(), content)
+
+            self.assertEqual(len(session.handles[f'127.0.0.1:{server.server_address[1]}']), 1)
+        finally:
+            session.close()
+            server.shutdown()
+            server.server_close()
+
+
+    def test_fetch_many(self):
+        """
+        Test fetch_many returns the results of each request in order.
+        """
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        content = RangeHandler.content
+        try:
+            with tempfile.TemporaryDirectory() as tmpd:
+                dest = os.path.join(tmpd, 'src.tar.gz')
+                results = download.fetch_many([{'url': f'{base}/src.tar.gz', 'dest': dest, 'digests': ("sha1",)},
+                                               {'url': f'{base}/missing'},
+                                               {'url': f'{base}/license', 'post': b'hash=1'},
+                                               {'url': f'{base}/src.tar.gz'}],
+                                              session=download.DownloadSession(), max_host_connections=2)
+                self.assertEqual(results[0], {"sha1": hashlib.sha1(content).hexdigest()})
+                with open(dest, 'rb') as destf:
+                    self.assertEqual(destf.read(), content)
+            self.assertIsNone(results[1])
+            self.assertEqual(results[2].getvalue(), b'hash=1')
+            self.assertEqual(results[3].getvalue(), content)
+
+            with self.assertRaises(SystemExit):
+                download.fetch_many([{'url': f'{base}/missing', 'is_fatal': True}])
+        finally:
+            server.shutdown()
+            server.server_close()
 
 
 if __name__ == '__main__':
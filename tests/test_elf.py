@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import elf
+
+
+TESTDIR = os.path.join(os.getcwd(), "tests/testfiles/abireport")
+LIBRARY = os.path.join(TESTDIR, "libabitest.so.1")
+
+
+class TestElf(unittest.TestCase):
+
+    def test_dynamic_symbols(self):
+        """
+        Test dynamic_symbols classifies and versions symbols like nm -D
+        """
+        with elf.ElfFile(LIBRARY) as elf_file:
+            symbols = dict(elf_file.dynamic_symbols())
+            self.assertTrue(elf_file.is_shared_object)
+            self.assertFalse(elf_file.is_pie)
+
+        self.assertEqual(symbols['_ZN7abitest3addEii@@ABITEST_1'], 'T')
+        self.assertEqual(symbols['abitest_compat@ABITEST_1'], 'T')
+        self.assertEqual(symbols['abitest_compat@@ABITEST_2'], 'T')
+        self.assertEqual(symbols['abitest_data@@ABITEST_1'], 'D')
+        self.assertEqual(symbols['abitest_weak@@ABITEST_1'], 'W')
+        # version definitions are absolute symbols printed without version
+        self.assertEqual(symbols['ABITEST_1'], 'A')
+        self.assertEqual(len(symbols), 10)
+
+    def test_open_elf_invalid(self):
+        """
+        Test open_elf returns None for files that are not valid ELF files
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            truncated = os.path.join(tmpd, 'truncated.so')
+            with open(LIBRARY, 'rb') as libf, open(truncated, 'wb') as truncf:
+                truncf.write(libf.read(64))
+            empty = os.path.join(tmpd, 'empty.so')
+            open(empty, 'w').close()
+            shutil.copy(os.path.join(TESTDIR, 'abitest.c'), tmpd)
+
+            self.assertIsNone(elf.open_elf(empty))
+            self.assertIsNone(elf.open_elf(os.path.join(tmpd, 'abitest.c')))
+            self.assertIsNone(elf.open_elf(os.path.join(tmpd, 'missing')))
+            # the headers past the ELF header are missing
+            self.assertIsNone(elf.open_elf(truncated))
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+import extractcache
+
+
+def make_src(tmpd, sha1, name='pkg-1.0.tar.gz'):
+    src = Mock(sha1=sha1, path=os.path.join(tmpd, name), pattern=None,
+               type='tar', prefix='pkg-1.0', subdir=None, as_is=False)
+    return src
+
+
+def write_tree(path, size=10):
+    os.makedirs(os.path.join(path, 'pkg-1.0', 'src'), exist_ok=True)
+    with open(os.path.join(path, 'pkg-1.0', 'src', 'main.c'), 'w') as srcf:
+        srcf.write('x' * size)
+    os.symlink('src/main.c', os.path.join(path, 'pkg-1.0', 'main.c'))
+
+
+class TestExtractCache(unittest.TestCase):
+
+    def test_store_restore(self):
+        """
+        Test a stored tree is restored with its prefix, and not restored for
+        a different tarball name
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            cache = extractcache.ExtractCache(os.path.join(tmpd, 'cache'), 1024 ** 3)
+            staging = os.path.join(tmpd, 'staging')
+            write_tree(staging)
+            cache.store(make_src(tmpd, 'abc'), staging)
+
+            restored = os.path.join(tmpd, 'restored')
+            os.mkdir(restored)
+            src = make_src(tmpd, 'abc')
+            src.prefix = None
+            self.assertTrue(cache.restore(src, restored))
+            self.assertEqual(src.prefix, 'pkg-1.0')
+            with open(os.path.join(restored, 'pkg-1.0', 'src', 'main.c')) as srcf:
+                self.assertEqual(srcf.read(), 'x' * 10)
+            self.assertTrue(os.path.islink(os.path.join(restored, 'pkg-1.0', 'main.c')))
+
+            self.assertFalse(cache.restore(make_src(tmpd, 'abc', 'other.tar.gz'), restored))
+            self.assertFalse(cache.restore(make_src(tmpd, 'def'), restored))
+
+    def test_evict(self):
+        """
+        Test the least recently used entries are evicted once the cache is
+        over its size limit
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            cachedir = os.path.join(tmpd, 'cache')
+            staging = os.path.join(tmpd, 'staging')
+            write_tree(staging, size=8192)
+            size = extractcache.tree_size(staging)
+            cache = extractcache.ExtractCache(cachedir, 2 * size)
+            for idx, sha1 in enumerate(['a', 'b']):
+                cache.store(make_src(tmpd, sha1), staging)
+                os.utime(os.path.join(cachedir, sha1, 'meta.json'), (idx, idx))
+
+            # restoring 'a' makes 'b' the least recently used entry
+            restored = os.path.join(tmpd, 'restored')
+            self.assertTrue(cache.restore(make_src(tmpd, 'a'), restored))
+            cache.store(make_src(tmpd, 'c'), staging)
+            self.assertEqual(sorted(os.listdir(cachedir)), ['a', 'c'])
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
@@ -3,6 +3,7 @@ import config
 import files
 import tempfile
 import os
+import re
 from unittest.mock import call, MagicMock
 import build
 from files import FileManager
@@ -529,5 +530,42 @@ class TestFiles(unittest.TestCase):
                              set(["%doc /directory", "/file1", "/file2"]))
 
 
+    def test_classify_parity(self):
+        """
+        Test classify pushes the same files as trying file_pat_match with each
+        file pattern in turn, over files under the path of every pattern
+        """
+        # files named after each pattern's leading literal path, plain and
+        # under the /V3, /V4 and /VA install prefixes
+        names = ['', 'foo', 'libfoo.so', 'libfoo.so.1', 'libfoo.a', 'foo.h', '32foo.pc', 'foo.la', 'foo.m4',
+                 'foo.typelib', 'foo.rlib', 'foo.json', 'python3.12/foo.py', 'x86-64-v3/libfoo.so']
+        filenames = set()
+        for pat in files.file_patterns('qtbase', 'dev', 'dev'):
+            base = re.match(r'[^\\\[\](){}*+?|$]*', pat[0].lstrip('^').replace('\\.', '.')).group()
+            for name in names:
+                for prefix in ['', '/V3', '/V4', '/VA']:
+                    filenames.add(prefix + base + name)
+                    filenames.add(prefix + os.path.join(base, name))
+        filenames = sorted(filenames)
+
+        for opts in [{}, {'no_glob': True}, {'compat': True}]:
+            results = []
+            for use_classifier in [False, True]:
+                conf = config.Config("")
+                conf.config_opts.update(opts)
+                fm = FileManager(conf, build.Build())
+                fm.excludes = ['/usr/lib64/libfoo.a']
+                classifier = fm.get_classifier('qtbase', 'dev', 'dev')
+                for filename in filenames:
+                    if use_classifier:
+                        fm.classify(filename, classifier)
+                    else:
+                        for pat in files.file_patterns('qtbase', 'dev', 'dev'):
+                            if fm.file_pat_match(filename, *pat):
+                                break
+                results.append((fm.packages, fm.excludes))
+            self.assertEqual(results[0], results[1])
+
+
 if __name__ == '__main__':
     unittest.main(buffer=True)
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import config
+import git
+
+
+def git_files(path, *args):
+    """
+    Return the files git ls-files lists in path
+    """
+    return subprocess.run(['git', 'ls-files'] + list(args), cwd=path, check=True,
+                          capture_output=True, text=True).stdout.split()
+
+
+class TestGit(unittest.TestCase):
+
+    def write_files(self, path, names):
+        for name in names:
+            with open(os.path.join(path, name), 'w') as f:
+                f.write(name)
+
+    def test_commit_to_git(self):
+        """
+        Test commit_to_git stages the package files with a few git calls
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            conf = config.Config(tmpd)
+            conf.config_files.add('options.conf')
+            conf.config_files.add('missing_config')
+            self.write_files(tmpd, ['Makefile', 'upstream', 'pkg.spec', 'options.conf', 'release',
+                                    'fix.patch', 'pkg.tmpfiles', 'pkg-1.0.tar.gz.asc', 'broken_c++',
+                                    'pgo', 'build.log', 'notes.txt'])
+            subprocess.run(['git', 'init', '-q', '-b', 'main'], cwd=tmpd, check=True)
+            subprocess.run(['git', 'add', 'broken_c++', 'pgo'], cwd=tmpd, check=True)
+            subprocess.run(['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com',
+                            'commit', '-q', '-m', 'initial'], cwd=tmpd, check=True)
+            # a deprecated file with local changes is left alone
+            with open(os.path.join(tmpd, 'pgo'), 'a') as f:
+                f.write('changed')
+
+            with patch('git.call', wraps=git.call) as call:
+                git.commit_to_git(conf, 'pkg', 0)
+
+            self.assertEqual(sorted(git_files(tmpd)),
+                             ['.gitignore', 'Makefile', 'fix.patch', 'options.conf', 'pgo', 'pkg-1.0.tar.gz.asc',
+                              'pkg.spec', 'pkg.tmpfiles', 'release', 'upstream'])
+            self.assertFalse(os.path.exists(os.path.join(tmpd, 'broken_c++')))
+            self.assertLessEqual(call.call_count, 7)
+
+    def test_commit_to_git_no_spec(self):
+        """
+        Test commit_to_git fails without a spec file
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            conf = config.Config(tmpd)
+            self.write_files(tmpd, ['Makefile', 'upstream'])
+            with self.assertRaises(subprocess.CalledProcessError):
+                git.commit_to_git(conf, 'pkg', 0)
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
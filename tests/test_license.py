@@ -1,5 +1,6 @@
 from contextlib import redirect_stdout
 from io import BytesIO, StringIO
+import hashlib
 import os
 import tempfile
 import unittest
@@ -10,6 +11,7 @@ import pycurl
 import config
 import download
 import license
+import licensecache
 import util
 
 
@@ -91,6 +93,7 @@ class TestLicense(unittest.TestCase):
 
         self.assertEqual(license.licenses, [])
 
+    @patch('download.get_session', download.DownloadSession)
     def test_license_from_copying_hash_license_server_excep(self):
         """
         Test license_from_copying_hash with license server when pycurl raises
@@ -106,9 +109,13 @@ class TestLicense(unittest.TestCase):
             TIMEOUT = 0
             LOW_SPEED_LIMIT = 0
             LOW_SPEED_TIME = 0
+            SHARE = None
             def setopt(_, __, ___):
                 pass
 
+            def reset(_):
+                pass
+
             def perform(_):
                 raise pycurl.error('Test Exception')
 
@@ -116,6 +123,7 @@ class TestLicense(unittest.TestCase):
                 pass
 
         # set the mock curl
+        curl_backup = download.pycurl.Curl
         download.pycurl.Curl = MockCurl
 
         conf = config.Config("")
@@ -130,8 +138,9 @@ class TestLicense(unittest.TestCase):
         self.assertIn('Unable to fetch license.server.url: Test Exception', out.getvalue())
 
         # unset the manual mock
-        download.pycurl.Curl = pycurl.Curl
+        download.pycurl.Curl = curl_backup
 
+    @patch('download.get_session', download.DownloadSession)
     def test_license_from_copying_hash_license_server(self):
         """
         Test license_from_copying_hash with license server. This is heavily
@@ -157,9 +166,13 @@ class TestLicense(unittest.TestCase):
             TIMEOUT = 0
             LOW_SPEED_LIMIT = 0
             LOW_SPEED_TIME = 0
+            SHARE = None
             def setopt(_, __, ___):
                 pass
 
+            def reset(_):
+                pass
+
             def perform(_):
                 pass
 
@@ -170,6 +183,7 @@ class TestLicense(unittest.TestCase):
                 return 200
 
         # set the mock curl
+        curl_backup = download.pycurl.Curl
         download.pycurl.Curl = MockCurl
 
         conf = config.Config("")
@@ -187,7 +201,28 @@ class TestLicense(unittest.TestCase):
         download.BytesIO = BytesIO
 
         # unset the manual mock
-        download.pycurl.Curl = pycurl.Curl
+        download.pycurl.Curl = curl_backup
+
+    def test_license_from_copying_hash_license_cache(self):
+        """
+        Test license_from_copying_hash uses and fills the license cache so
+        the license server is only asked once about a license text
+        """
+        conf = config.Config("")
+        conf.license_fetch = 'license.server.url'
+        fetch_many = MagicMock(return_value=[BytesIO(b'GPL-3.0')])
+        with tempfile.TemporaryDirectory() as tmpd, \
+                patch('license.download.fetch_many', fetch_many), \
+                redirect_stdout(StringIO()) as out:
+            conf.license_cache = licensecache.LicenseCache(tmpd, 3600, 60)
+            license.license_from_copying_hash('tests/COPYING_TEST', '', conf, '')
+            license.licenses.clear()
+            license.license_from_copying_hash('tests/COPYING_TEST', '', conf, '')
+
+        fetch_many.assert_called_once()
+        self.assertEqual(fetch_many.call_args_list[0][0][0][0]['url'], 'license.server.url')
+        self.assertIn('GPL-3.0', license.licenses)
+        self.assertIn('License     :  GPL-3.0  (cached)', out.getvalue())
 
     def test_scan_for_licenses(self):
         """
@@ -210,6 +245,49 @@ class TestLicense(unittest.TestCase):
 
         self.assertIn('GPL-3.0', license.licenses)
 
+    def test_scan_for_licenses_prefetched(self):
+        """
+        Test scan_for_licenses applies the licenses found by
+        prefetch_licenses without reading the license files again
+        """
+        conf = config.Config("")
+        conf.setup_patterns()
+        with tempfile.TemporaryDirectory() as tmpd:
+            with open('tests/COPYING_TEST', 'rb') as copyingf, \
+                    open(os.path.join(tmpd, 'COPYING'), 'wb') as newcopyingf:
+                newcopyingf.write(copyingf.read())
+            prefetched = license.prefetch_licenses(tmpd, conf, '')
+            self.assertEqual(license.licenses, [])
+            with patch('license.find_copyings', side_effect=AssertionError('scanned')), \
+                    patch('license.read_copyings', side_effect=AssertionError('read')):
+                license.scan_for_licenses(tmpd, conf, '', prefetched=prefetched)
+
+        self.assertEqual(license.licenses, ['GPL-3.0'])
+
+    def test_read_copyings(self):
+        """
+        Test read_copyings decodes many license texts in parallel with the
+        same, ordered, results as reading them one by one
+        """
+        content = util.get_contents('tests/COPYING_TEST')
+        with tempfile.TemporaryDirectory() as tmpd:
+            copyings = []
+            for idx in range(2 * license.PARALLEL_DECODE_MIN):
+                copyings.append(os.path.join(tmpd, f'COPYING{idx}'))
+                with open(copyings[-1], 'wb') as copyingf:
+                    copyingf.write(content + str(idx % license.PARALLEL_DECODE_MIN).encode())
+            with open(os.path.join(tmpd, 'LICENSE.sh'), 'wb') as scriptf:
+                scriptf.write(b'#!/bin/sh\n')
+            copyings[3:3] = [os.path.join(tmpd, 'LICENSE.sh'), os.path.join(tmpd, 'missing')]
+
+            results = license.read_copyings(copyings)
+            self.assertEqual(results, [license.read_copying(copying) for copying in copyings])
+
+        self.assertEqual(results[3:5], [None, None])
+        self.assertEqual(results[0][1], hashlib.sha1(content + b'0').hexdigest())
+        self.assertEqual(results[0], results[license.PARALLEL_DECODE_MIN + 2])
+        self.assertEqual(results[0][0], content.decode('utf-8') + '0')
+
     def test_scan_for_licenses_none(self):
         """
         Test scan_for_licenses in temporary directory with no matching files.
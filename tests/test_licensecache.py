@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+
+import licensecache
+
+
+class TestLicenseCache(unittest.TestCase):
+
+    def test_put_get(self):
+        """
+        Test a stored response is returned for the same server only
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            cache = licensecache.LicenseCache(tmpd, 3600, 60)
+            self.assertIsNone(cache.get('abc', 'server'))
+            cache.put('abc', 'server', 'GPL-3.0')
+            self.assertEqual(cache.get('abc', 'server'), 'GPL-3.0')
+            self.assertIsNone(cache.get('abc', 'other.server'))
+            self.assertEqual(os.listdir(tmpd), ['abc.json'])
+
+    def test_expiry(self):
+        """
+        Test negative responses expire after negative_ttl and other responses
+        after ttl
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            cache = licensecache.LicenseCache(tmpd, 3600, 60)
+            cache.put('abc', 'server', 'GPL-3.0')
+            cache.put('def', 'server', '')
+            self.assertEqual(cache.get('def', 'server'), '')
+
+            cache.ttl = cache.negative_ttl = -1
+            self.assertIsNone(cache.get('abc', 'server'))
+            self.assertIsNone(cache.get('def', 'server'))
+
+            cache.ttl = 3600
+            self.assertEqual(cache.get('abc', 'server'), 'GPL-3.0')
+            self.assertIsNone(cache.get('def', 'server'))
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
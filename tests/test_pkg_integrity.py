@@ -24,7 +24,7 @@ QT_SHA256_PKG = "https://download.qt.io/official_releases/qt/5.12/5.12.4/submodu
 KEYID = "EC2392F2EDE74488680DA3CF5F2B4756ED873D23"
 
 
-def mock_download_do_curl(url, dst=None):
+def mock_download_do_curl(url, dst=None, **kwargs):
     bad_sigs = ["http://pkgconfig.freedesktop.org/releases/pkg-config-0.29.1.tar.gz.sig",
                 "http://www.ferzkopp.net/Software/SDL_gfx-2.0/SDL_gfx-2.0.25.tar.gz.sig",
                 "http://www.ferzkopp.net/Software/SDL_gfx-2.0/SDL_gfx-2.0.25.tar.gz.asc",
@@ -41,6 +41,11 @@ def mock_download_do_curl(url, dst=None):
         return None
 
 
+def mock_download_fetch_many(requests, **kwargs):
+    return [download.do_curl(request['url'], request.get('dest')) for request in requests]
+
+
+@patch('download.fetch_many', mock_download_fetch_many)
 @patch('download.do_curl', mock_download_do_curl)
 class TestCheckFn(unittest.TestCase):
 
@@ -68,6 +73,7 @@ class TestCheckFn(unittest.TestCase):
             self.assertTrue(result)
 
 
+@patch('download.fetch_many', mock_download_fetch_many)
 @patch('download.do_curl', mock_download_do_curl)
 class TestDomainBasedVerifiers(unittest.TestCase):
 
@@ -99,7 +105,22 @@ class TestDomainBasedVerifiers(unittest.TestCase):
         result = self.run_test_for_domain(pkg_integrity.QtIoVerifier, QT_SHA256_PKG)
         self.assertTrue(result)
 
+    @patch('pkg_integrity.Verifier.calc_sum')
+    @patch('pkg_integrity.GnomeOrgVerifier.fetch_shasum', _mock_fetch_shasum)
+    def test_gnome_org_known_digest(self, test_calc):
+        """Test a digest computed while downloading is used without reading the package."""
+        with tempfile.TemporaryDirectory() as tmpd:
+            package_path = os.path.join(tmpd, os.path.basename(GNOME_SHA256_PKG))
+            open(package_path, 'w').close()
+            digest = "4e228b1c0f36e810acd971fad1c7030014900d8427c308d63a560f3f1037fa3c"
+            verifier = pkg_integrity.GnomeOrgVerifier(**{'package_path': package_path,
+                                                         'url': GNOME_SHA256_PKG,
+                                                         'digests': {'sha256': digest}})
+            self.assertTrue(verifier.verify())
+        test_calc.assert_not_called()
+
 
+@patch('download.fetch_many', mock_download_fetch_many)
 @patch('download.do_curl', mock_download_do_curl)
 class TestGPGVerifier(unittest.TestCase):
 
@@ -328,7 +349,7 @@ class TestUtils(unittest.TestCase):
         false_name = '/false/name'
         self.assertTrue(pkg_integrity.get_keyid(false_name) is None)
 
-    def _mock_download_file(url, dst=None):
+    def _mock_download_file(url, dst=None, **kwargs):
         # make return codes match by url to ensure we are using the expected signature type
         if url in ("http://ftp.gnu.org/pub/gnu/gperf/gperf-3.0.4.tar.gz.sig",
                    "http://download.savannah.gnu.org/releases/quilt/quilt-0.65.tar.gz.asc",
@@ -336,6 +357,7 @@ class TestUtils(unittest.TestCase):
             return os.path.join(dst, os.path.basename(url))
         return None
 
+    @patch('download.fetch_many', mock_download_fetch_many)
     @patch('download.do_curl', _mock_download_file)
     def test_get_signature_url(self):
         url_from_gnu = "http://ftp.gnu.org/pub/gnu/gperf/gperf-3.0.4.tar.gz"
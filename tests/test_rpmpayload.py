@@ -0,0 +1,103 @@
+import gzip
+import lzma
+import os
+import stat
+import struct
+import tempfile
+import unittest
+
+import rpmpayload
+import zstandard as zstd
+
+
+def make_cpio(members):
+    """
+    Build a cpio newc archive of members, a list of (name, mode, inode,
+    nlink, data) tuples
+    """
+    archive = b''
+    for name, mode, inode, nlink, data in members + [('TRAILER!!!', 0, 0, 1, b'')]:
+        name = name.encode() + b'\0'
+        fields = [inode, mode, 0, 0, nlink, 0, len(data), 0, 0, 0, 0, len(name), 0]
+        header = b'070701' + b''.join(b'%08X' % field for field in fields)
+        archive += header + name + b'\0' * (-(len(header) + len(name)) % 4)
+        archive += data + b'\0' * (-len(data) % 4)
+    return archive
+
+
+def make_header(tags):
+    """
+    Build an rpm header structure holding the string tags
+    """
+    index = b''
+    store = b''
+    for tag, value in tags:
+        index += struct.pack('>iiii', tag, 6, len(store), 1)
+        store += value.encode() + b'\0'
+    return b'\x8e\xad\xe8\x01\0\0\0\0' + struct.pack('>II', len(tags), len(store)) + index + store
+
+
+def make_rpm(path, members, compressor='zstd'):
+    """
+    Write an rpm file at path with the members in its cpio payload
+    """
+    compress = {'gzip': gzip.compress,
+                'xz': lzma.compress,
+                'zstd': zstd.ZstdCompressor().compress}[compressor]
+    lead = b'\xed\xab\xee\xdb\x03\x00' + struct.pack('>hh', 0, 1) + b'test'.ljust(66, b'\0') \
+        + struct.pack('>hh', 1, 5) + b'\0' * 16
+    signature = make_header([(269, 'abc')])
+    signature += b'\0' * (-len(signature) % 8)
+    header = make_header([(1000, 'test'), (1124, 'cpio'), (1125, compressor)])
+    with open(path, 'wb') as rpmf:
+        rpmf.write(lead + signature + header + compress(make_cpio(members)))
+
+
+MEMBERS = [
+    ('./usr', stat.S_IFDIR | 0o755, 1, 2, b''),
+    ('./usr/share/doc/README', stat.S_IFREG | 0o644, 2, 1, b'read me'),
+    ('./usr/lib64/libtest.so', stat.S_IFLNK | 0o777, 3, 1, b'libtest.so.1'),
+    ('./usr/lib64/libtest.so.1', stat.S_IFREG | 0o755, 4, 2, b''),
+    ('./usr/lib64/libtest-link.so.1', stat.S_IFREG | 0o755, 4, 2, b'\x7fELF' + b'x' * 200),
+]
+
+
+class TestRpmPayload(unittest.TestCase):
+
+    def test_payload(self):
+        """
+        Test the payload members of rpms are read with each compressor
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            for compressor in ('gzip', 'xz', 'zstd'):
+                path = os.path.join(tmpd, f'test-{compressor}.rpm')
+                make_rpm(path, MEMBERS, compressor)
+                with rpmpayload.open_payload(path) as payload:
+                    members = []
+                    for entry in payload:
+                        # read part of the data only, the rest is skipped
+                        members.append((entry.name, entry.isreg(), entry.nlink, entry.read(4)))
+                self.assertEqual(members, [('./usr', False, 2, b''),
+                                           ('./usr/share/doc/README', True, 1, b'read'),
+                                           ('./usr/lib64/libtest.so', False, 1, b'libt'),
+                                           ('./usr/lib64/libtest.so.1', True, 2, b''),
+                                           ('./usr/lib64/libtest-link.so.1', True, 2, b'\x7fELF')])
+
+    def test_payload_truncated(self):
+        """
+        Test a truncated payload raises RpmError
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            path = os.path.join(tmpd, 'test.rpm')
+            make_rpm(path, MEMBERS, 'gzip')
+            with open(path, 'rb') as rpmf:
+                data = rpmf.read()
+            with open(path, 'wb') as rpmf:
+                rpmf.write(data[:-40])
+            with rpmpayload.open_payload(path) as payload:
+                with self.assertRaises(rpmpayload.RpmError):
+                    list(payload)
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 import unittest.mock
 import buildreq
@@ -452,6 +454,50 @@ class TestSpecfileWrite(unittest.TestCase):
         ]
         self.assertEqual(expect, self.WRITES)
 
+    def test_spec_sections(self):
+        """
+        test spec_sections splits the spec into its kinds of sections
+        """
+        sections = specfiles.spec_sections("Name     : pkg\n"
+                                           "Summary  : a package\n"
+                                           "BuildRequires : foo\n"
+                                           "%description\ntext\n"
+                                           "%prep\n%setup -q\n"
+                                           "%build\nmake %{?_smp_mflags}\n"
+                                           "%install\n%make_install\n"
+                                           "%files\n/usr/bin/pkg\n"
+                                           "%files dev\n/usr/include/pkg.h\n"
+                                           "%post\n%postun\n")
+        self.assertEqual(sections, {"preamble": "Name     : pkg\nBuildRequires : foo\n",
+                                    "tags": "Summary  : a package\n",
+                                    "%description": "%description\ntext\n",
+                                    "%prep": "%prep\n%setup -q\n",
+                                    "%build": "%build\nmake %{?_smp_mflags}\n",
+                                    "%install": "%install\n%make_install\n",
+                                    "%files": "%files\n/usr/bin/pkg\n%files dev\n/usr/include/pkg.h\n",
+                                    "%post": "%post\n",
+                                    "%postun": "%postun\n"})
+
+    def test_track_sections(self):
+        """
+        test Specfile.track_sections reports the sections changed since the
+        previous spec written
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            spec_path = os.path.join(tmpd, 'pkg.spec')
+            for text in ["Name: pkg\n%build\nmake\n%files\n/usr/bin/a\n",
+                         "Name: pkg\n%build\nmake\n%files\n/usr/bin/a\n/usr/bin/b\n%files dev\n",
+                         "Name: pkg\nBuildRequires: foo\n%build\nmake\n"]:
+                with open(spec_path, 'w') as specf:
+                    specf.write(text)
+                self.specfile.track_sections(spec_path)
+                if text.endswith("/usr/bin/a\n"):
+                    self.assertIsNone(self.specfile.changed_sections)
+                elif text.endswith("%files dev\n"):
+                    self.assertEqual(self.specfile.changed_sections, {"%files"})
+                else:
+                    self.assertEqual(self.specfile.changed_sections, {"preamble", "%files"})
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import srctree
+
+
+def make_tree(path):
+    """
+    Create a small source tree with nested, symlinked and pruned directories
+    """
+    for dirname in ['src/lib', 'src/tests/data', 'doc', 'LICENSES']:
+        os.makedirs(os.path.join(path, dirname))
+    for name in ['configure', 'README', 'src/Makefile', 'src/lib/a.c', 'src/tests/data/x',
+                 'doc/index.txt', 'LICENSES/MIT.txt']:
+        with open(os.path.join(path, name), 'w') as fp:
+            fp.write(name)
+    os.chmod(os.path.join(path, 'configure'), 0o755)
+    os.symlink('src/lib', os.path.join(path, 'lib'))
+    os.symlink('missing', os.path.join(path, 'broken'))
+
+
+class TestSrctree(unittest.TestCase):
+
+    def test_walk(self):
+        """
+        Test SourceTree.walk yields the same results as os.walk, top-down and
+        bottom-up, from the root or a subdirectory
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            make_tree(tmpd)
+            tree = srctree.SourceTree(tmpd)
+            with patch('srctree.os.walk', side_effect=AssertionError('walked')):
+                results = {(top, topdown): list(tree.walk(top, topdown=topdown))
+                           for top in [tmpd, os.path.join(tmpd, 'src')]
+                           for topdown in [True, False]}
+            for (top, topdown), result in results.items():
+                self.assertEqual(result, list(os.walk(top, topdown=topdown)))
+            # the symlinked directory is listed but not followed
+            self.assertIn('lib', results[(tmpd, True)][0][1])
+            self.assertNotIn(os.path.join(tmpd, 'lib'), [dirpath for dirpath, _, _ in results[(tmpd, True)]])
+
+    def test_walk_prune(self):
+        """
+        Test SourceTree.walk skips the directories removed from dirnames
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            make_tree(tmpd)
+            tree = srctree.SourceTree(tmpd)
+            seen = []
+            for dirpath, dirnames, _ in tree.walk(tmpd):
+                dirnames[:] = [d for d in dirnames if d != 'tests']
+                seen.append(os.path.relpath(dirpath, tmpd))
+            self.assertEqual(sorted(seen), ['.', 'LICENSES', 'doc', 'src', 'src/lib'])
+            # the index is not changed by pruning
+            self.assertEqual(len(list(tree.walk(tmpd))), 7)
+
+    def test_walk_outside(self):
+        """
+        Test walk falls back to os.walk without an index or outside of it
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            make_tree(tmpd)
+            tree = srctree.SourceTree(os.path.join(tmpd, 'src'))
+            self.assertEqual(list(srctree.walk(tmpd, tree)), list(os.walk(tmpd)))
+            self.assertEqual(list(srctree.walk(tmpd)), list(os.walk(tmpd)))
+
+    def test_files_stat(self):
+        """
+        Test the file listing, sizes and modes of the index
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            make_tree(tmpd)
+            tree = srctree.SourceTree(tmpd)
+            self.assertEqual(sorted(tree.files(tmpd + '/')), ['README', 'broken', 'configure'])
+            self.assertTrue(tree.is_executable(os.path.join(tmpd, 'configure')))
+            self.assertFalse(tree.is_executable(os.path.join(tmpd, 'README')))
+            self.assertFalse(tree.is_executable(os.path.join(tmpd, 'src')))
+            self.assertFalse(tree.is_executable(os.path.join(tmpd, 'broken')))
+            self.assertEqual(tree.size(os.path.join(tmpd, 'src/lib/a.c')), len('src/lib/a.c'))
+            with patch('srctree.os.stat', side_effect=AssertionError('stat again')):
+                self.assertEqual(tree.size(os.path.join(tmpd, 'src/lib/a.c')), len('src/lib/a.c'))
+
+
+if __name__ == '__main__':
+    unittest.main(buffer=True)
@@ -1,10 +1,15 @@
 import copy
+import io
 import os
+import tarfile
+import tempfile
 import unittest
+import zipfile
 from collections import OrderedDict
 from unittest.mock import MagicMock, Mock, patch
 import build
 import config
+import extractcache
 import files
 import tarball
 
@@ -214,6 +219,7 @@ class TestTarball(unittest.TestCase):
         self.assertEqual(self.content.gcov_file, 'test.gcov')
 
     @patch('tarball.Source.set_prefix', Mock())
+    @patch('tarball.Source.unpack', Mock())
     @patch('tarball.Source.extract', Mock())
     def test_extract_sources(self):
         """Test for Content extract_sources method."""
@@ -226,8 +232,126 @@ class TestTarball(unittest.TestCase):
         self.content.extract_sources(main_src, archives_src)
         # Sources with destination=':' should not be extracted, so method
         # should be called only 3 times.
+        self.assertEqual(tarball.Source.unpack.call_count, 3)
         self.assertEqual(tarball.Source.extract.call_count, 3)
 
+    def test_process_extract(self):
+        """Test Content.process extracts all sources and detects their prefixes."""
+        def add_file(tar, name, data):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+
+        with tempfile.TemporaryDirectory() as tmpd:
+            download_path = os.path.join(tmpd, 'download')
+            base_path = os.path.join(tmpd, 'base')
+            os.mkdir(download_path)
+            os.mkdir(base_path)
+            with tarfile.open(os.path.join(download_path, 'pkg-1.0.tar.gz'), 'w:gz') as tar:
+                add_file(tar, 'pkg-1.0/configure', b'main')
+                add_file(tar, 'pkg-1.0/src/main.c', b'main')
+            with tarfile.open(os.path.join(download_path, 'vendor-2.0.tar.xz'), 'w:xz') as tar:
+                add_file(tar, 'vendor/a.go', b'vendor')
+                add_file(tar, 'vendor.go', b'vendor')
+            with zipfile.ZipFile(os.path.join(download_path, 'extra-3.0.zip'), 'w') as zipf:
+                zipf.writestr('pkg-1.0/src/extra.c', 'extra')
+                zipf.writestr('pkg-1.0/configure', 'extra')
+
+            conf = config.Config(download_path)
+            content = tarball.Content('https://example.com/pkg-1.0.tar.gz', '', '',
+                                      ['https://example.com/vendor-2.0.tar.xz', 'vendor',
+                                       'https://example.com/extra-3.0.zip', 'extra',
+                                       'https://example.com/skip-4.0.tar', ':'],
+                                      conf, base_path)
+            conf.content = content
+            with open(os.path.join(download_path, 'skip-4.0.tar'), 'w') as skip:
+                skip.write('not extracted')
+            content.process(Mock())
+
+            self.assertEqual(content.tarball_prefix, 'pkg-1.0')
+            self.assertEqual(content.path, os.path.join(base_path, 'pkg-1.0'))
+            self.assertEqual(content.prefixes['https://example.com/vendor-2.0.tar.xz'], '')
+            self.assertEqual(conf.archive_details['https://example.com/extra-3.0.zipprefix'], 'pkg-1.0')
+            self.assertIsNone(content.prefixes['https://example.com/skip-4.0.tar'])
+            self.assertEqual(sorted(os.listdir(base_path)), ['pkg-1.0', 'vendor-2.0.tar'])
+            self.assertTrue(os.path.isfile(os.path.join(base_path, 'vendor-2.0.tar', 'vendor', 'a.go')))
+            self.assertTrue(os.path.isfile(os.path.join(base_path, 'pkg-1.0', 'src', 'main.c')))
+            self.assertTrue(os.path.isfile(os.path.join(base_path, 'pkg-1.0', 'src', 'extra.c')))
+            # later archives overwrite the same files as when extracted in order
+            with open(os.path.join(base_path, 'pkg-1.0', 'configure')) as configure:
+                self.assertEqual(configure.read(), 'extra')
+            with open(os.path.join(download_path, 'upstream')) as upstream:
+                self.assertEqual([line.split('/')[1] for line in upstream.read().splitlines()],
+                                 ['pkg-1.0.tar.gz', 'vendor-2.0.tar.xz', 'extra-3.0.zip', 'skip-4.0.tar'])
+
+
+    def test_process_extract_cache(self):
+        """Test Content.process restores sources from the extraction cache."""
+        with tempfile.TemporaryDirectory() as tmpd:
+            download_path = os.path.join(tmpd, 'download')
+            os.mkdir(download_path)
+            with tarfile.open(os.path.join(download_path, 'pkg-1.0.tar.gz'), 'w:gz') as tar:
+                for name in ['pkg-1.0/configure', 'pkg-1.0/README']:
+                    info = tarfile.TarInfo(name)
+                    info.size = 4
+                    tar.addfile(info, io.BytesIO(b'main'))
+
+            conf = config.Config(download_path)
+            conf.extract_cache = extractcache.ExtractCache(os.path.join(tmpd, 'cache'), 1024 ** 3)
+            extract_tar = Mock(side_effect=tarball.Source.extract_tar)
+            for run in range(2):
+                base_path = os.path.join(tmpd, f'base{run}')
+                os.mkdir(base_path)
+                content = tarball.Content('https://example.com/pkg-1.0.tar.gz', '', '', [], conf, base_path)
+                conf.content = content
+                with patch('tarball.Source.extract_tar', lambda src, path: extract_tar(src, path)):
+                    content.process(Mock())
+                # only the first run extracts the tarball
+                self.assertEqual(extract_tar.call_count, 1)
+                self.assertEqual(content.tarball_prefix, 'pkg-1.0')
+                self.assertEqual(os.listdir(base_path), ['pkg-1.0'])
+                with open(os.path.join(base_path, 'pkg-1.0', 'configure')) as configure:
+                    self.assertEqual(configure.read(), 'main')
+
+    def test_unpack_no_prefix(self):
+        """Test a tarball without a prefix is extracted once under its subdir, with and without the cache."""
+        with tempfile.TemporaryDirectory() as tmpd:
+            path = os.path.join(tmpd, 'multi.tar.gz')
+            with tarfile.open(path, 'w:gz') as tar:
+                for name in ['a/f', 'b/g']:
+                    info = tarfile.TarInfo(name)
+                    info.size = 4
+                    tar.addfile(info, io.BytesIO(b'data'))
+
+            cache = extractcache.ExtractCache(os.path.join(tmpd, 'cache'), 1024 ** 3)
+            for run, src_cache in enumerate([None, cache, cache]):
+                base_path = os.path.join(tmpd, f'base{run}')
+                os.mkdir(base_path)
+                src = tarball.Source('https://example.com/multi.tar.gz', '', path)
+                src.sha1 = 'abc'
+                self.assertEqual(src.prefix, '')
+                src.unpack(base_path, src_cache)
+                src.extract(base_path)
+                self.assertEqual(os.listdir(base_path), ['multi.tar'])
+                self.assertEqual(sorted(os.listdir(os.path.join(base_path, 'multi.tar'))), ['a', 'b'])
+                with open(os.path.join(base_path, 'multi.tar', 'a', 'f')) as f:
+                    self.assertEqual(f.read(), 'data')
+
+    def test_merge_tree_mixed(self):
+        """Test merge_tree replaces a directory with a file and a file with a directory."""
+        with tempfile.TemporaryDirectory() as tmpd:
+            src = os.path.join(tmpd, 'src')
+            dst = os.path.join(tmpd, 'dst')
+            for path in [os.path.join(src, 'both', 'new'), os.path.join(src, 'tofile'), os.path.join(src, 'todir', 'f'),
+                         os.path.join(dst, 'both', 'old'), os.path.join(dst, 'tofile', 'f'), os.path.join(dst, 'todir')]:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'w') as f:
+                    f.write(path)
+            tarball.merge_tree(src, dst)
+            self.assertEqual(sorted(os.listdir(os.path.join(dst, 'both'))), ['new', 'old'])
+            self.assertTrue(os.path.isfile(os.path.join(dst, 'tofile')))
+            self.assertEqual(os.listdir(os.path.join(dst, 'todir')), ['f'])
+
 
 # Create dynamic tests based on config file
 create_dynamic_tests()
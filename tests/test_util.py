@@ -1,5 +1,8 @@
+import gzip
+import hashlib
 import subprocess
 import os
+import sys
 import tempfile
 import unittest
 from unittest.mock import MagicMock, mock_open, patch
@@ -48,6 +51,22 @@ class TestUtil(unittest.TestCase):
         self.assertEqual(util.call('some command', check=False), 1)
         util.subprocess.call = call_backup
 
+    def test_call_watch(self):
+        """
+        Test call with a watch function that asks for the command to be
+        stopped
+        """
+        watch = MagicMock(return_value=True)
+        self.assertNotEqual(util.call(f'{sys.executable} -c "import time; time.sleep(30)"', check=False, watch=watch), 0)
+        watch.assert_called_once()
+
+    def test_call_watch_finished(self):
+        """
+        Test call with a watch function when the command ends by itself
+        """
+        watch = MagicMock(return_value=False)
+        self.assertEqual(util.call(f'{sys.executable} -c pass', watch=watch), 0)
+
     def test_translate(self):
         """
         Spot-test the translate function with a package defined in
@@ -55,6 +74,19 @@ class TestUtil(unittest.TestCase):
         """
         self.assertEqual(util.translate('dateutil-python'), 'pypi-python_dateutil')
 
+    def test_required_literal(self):
+        """
+        Test required_literal only returns text every match must contain
+        """
+        self.assertEqual(util.required_literal(r'checking for UDEV\.\.\. no'), 'checking for UDEV... no')
+        self.assertEqual(util.required_literal(r'[Cc]hecking for (.*?)\.\.\. [Nn]o'), 'hecking for ')
+        self.assertEqual(util.required_literal(r'Can\'t locate [a-z]+ in @INC \(you may'), ' in @INC (you may')
+        self.assertEqual(util.required_literal(r'(?:\/usr)?\/bin\/ld: cannot'), '/bin/ld: cannot')
+        self.assertEqual(util.required_literal(r'abcd?efg'), 'abc')
+        self.assertEqual(util.required_literal(r'abx+yz'), 'abx')
+        self.assertEqual(util.required_literal(r'ab|cd'), '')
+        self.assertEqual(util.required_literal(r'(?i)abc'), '')
+
     def test_binary_in_path(self):
         """
         Test binary_in_path
@@ -86,6 +118,76 @@ class TestUtil(unittest.TestCase):
         util.call = call_backup
         self.assertTrue(len(mock_call.mock_calls) == 3)
 
+    def test_stream_log(self):
+        """
+        Test stream_log yields the same lines for plain and compressed logs
+        """
+        content = "line 1\nline \xe2\n\nlast line"
+        expected = ["line 1\n", "line \xe2\n", "\n", "last line"]
+        with tempfile.TemporaryDirectory() as tmpd:
+            plain = os.path.join(tmpd, 'build.log')
+            with open(plain, 'w', encoding='utf-8') as logf:
+                logf.write(content)
+            with gzip.open(plain + '.gz', 'wt', encoding='utf-8') as logf:
+                logf.write(content)
+            with open(plain + '.zst', 'wb') as logf:
+                logf.write(util.zstd.ZstdCompressor().compress(content.encode('utf-8')))
+            empty = os.path.join(tmpd, 'empty.log')
+            open(empty, 'w').close()
+
+            self.assertEqual(list(util.stream_log(plain)), expected)
+            self.assertEqual(list(util.stream_log(plain + '.gz')), expected)
+            self.assertEqual(list(util.stream_log(plain + '.zst')), expected)
+            self.assertEqual(list(util.stream_log(empty)), [])
+
+    def test_get_digests(self):
+        """
+        Test get_digests computes every requested digest in one read
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            path = os.path.join(tmpd, 'file')
+            with open(path, 'wb') as f:
+                f.write(b'content' * 300000)
+            self.assertEqual(util.get_digests(path, ("sha1", "sha256")),
+                             {"sha1": hashlib.sha1(b'content' * 300000).hexdigest(),
+                              "sha256": hashlib.sha256(b'content' * 300000).hexdigest()})
+            self.assertEqual(util.get_sha1sum(path), hashlib.sha1(b'content' * 300000).hexdigest())
+
+    def test_fsync_file(self):
+        """
+        Test fsync_file flushes only the given file, and ignores missing files
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            path = os.path.join(tmpd, 'build.log')
+            with open(path, 'w') as f:
+                f.write('log')
+            with patch('util.os.fsync', wraps=os.fsync) as fsync:
+                util.fsync_file(path)
+                util.fsync_file(os.path.join(tmpd, 'missing.log'))
+            fsync.assert_called_once()
+
+    def test_log_tail(self):
+        """
+        Test LogTail only returns complete lines and restarts when the log is
+        replaced
+        """
+        with tempfile.TemporaryDirectory() as tmpd:
+            log = os.path.join(tmpd, 'build.log')
+            tail = util.LogTail(log)
+            self.assertEqual(tail.read_lines(), [])
+            with open(log, 'w') as logf:
+                logf.write('line 1\nline')
+            self.assertEqual(tail.read_lines(), ['line 1\n'])
+            with open(log, 'a') as logf:
+                logf.write(' 2\n')
+            self.assertEqual(tail.read_lines(), ['line 2\n'])
+            self.assertEqual(tail.read_lines(), [])
+            os.unlink(log)
+            with open(log, 'w') as logf:
+                logf.write('new\n')
+            self.assertEqual(tail.read_lines(), ['new\n'])
+            tail.close()
+
     def test_globlike_match(self):
         """
         Test globlike_match
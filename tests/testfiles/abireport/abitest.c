@@ -0,0 +1,6 @@
+int abitest_plain(void);
+
+int main(void)
+{
+    return abitest_plain();
+}
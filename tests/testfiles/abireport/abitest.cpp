@@ -0,0 +1,25 @@
+// Build the test fixtures with:
+//   g++ -shared -fPIC -s -O2 -Wl,-soname,libabitest.so.1 -Wl,--version-script=abitest.map \
+//       -Wl,--no-as-needed -o libabitest.so.1 abitest.cpp -lm
+//   gcc -no-pie -s -o abitest abitest.c -L. -l:libabitest.so.1
+//   gcc -pie -fPIE -s -o abitest-pie abitest.c -L. -l:libabitest.so.1
+namespace abitest {
+int version() { return 2; }
+int add(int a, int b) { return a + b; }
+class Widget {
+public:
+    static int count();
+};
+int Widget::count() { return 1; }
+}
+
+int abitest_data = 3;
+
+extern "C" {
+int abitest_old(void) { return 1; }
+int abitest_new(void) { return 2; }
+__asm__(".symver abitest_old,abitest_compat@ABITEST_1");
+__asm__(".symver abitest_new,abitest_compat@@ABITEST_2");
+int abitest_plain(void) { return 0; }
+__attribute__((weak)) int abitest_weak(void) { return 0; }
+}